@@ -3,43 +3,46 @@
 
 """
 This module initializes DSI
+
+DSI (the DSI class of the selected backend) and backend are loaded on first access (PEP 562),
+so importing the package or one of its plain modules (e.g. box) stays cheap.
+Use get_backend(name).DSI to select a backend explicitly.
 """
 
 # built-in modules
-from platform import system as __system
-
-# local modules
-from .exceptions import (
-    DisplayServerNotSupportedError as __DisplayServerNotSupportedError,
-    OSNotSupportedError as __OSNotSupportedError
-)
+from types import ModuleType
 
 __version__ = "0.0.dev11"
 __author__ = "Commandcracker"
 
-__os_name = __system().lower()
+# DSI and backend are resolved lazily by __getattr__
+# pylint: disable-next=undefined-all-variable
+__all__ = ["DSI", "backend", "get_backend"]
 
-if __os_name == "linux":
-    from .util import detect_linux_display_server as __detect_linux_display_server
-    from .util import LinuxDisplayServer as __LinuxDisplayServer
-    __linux_display_server = __detect_linux_display_server()
 
-    if __linux_display_server is __LinuxDisplayServer.X11:
-        from .linux import DSI
-    elif __linux_display_server is __LinuxDisplayServer.WAYLAND:
-        raise NotImplementedError("Wayland is not yet implemented.")
-    else:
-        raise __DisplayServerNotSupportedError(
-            "Your display server is not supported."
-        )
+def get_backend(name: str = "auto") -> ModuleType:
+    """
+    Returns the module of a backend, its DSI attribute is the DSI class of the backend.
+    The backend can be "auto" (selected by the platform and display server),
+    "xlib", "xcb", "wayland" or "windows", see backends.
+    """
+    # pylint: disable-next=import-outside-toplevel
+    from . import backends
+    return backends.get_backend(name)
 
-elif __os_name == "windows":
-    from .windows import DSI
 
-elif __os_name == "darwin":
-    raise NotImplementedError("MacOS is not yet implemented.")
+def __getattr__(name: str):
+    if name == "backend":
+        value = get_backend()
+    elif name == "DSI":
+        value = get_backend().DSI
+    else:
+        raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+
+    # cache it, so __getattr__ is not called again
+    globals()[name] = value
+    return value
 
-else:
-    raise __OSNotSupportedError("Your OS is not supported.")
 
-__all__ = ["DSI"]
+def __dir__() -> list:
+    return sorted(set(globals()) | set(__all__))
@@ -3,17 +3,27 @@
 
 """
 This is an example of DSI
+
+Subcommands:
+    serve    serves frames and input to local clients over a Unix socket, see server
+    list, active, find, capture, type, click
+             thin clients of a running server, see client
 """
 
+# built-in modules
+from argparse import ArgumentParser, Namespace
+from json import dumps
+from sys import exit as sys_exit, stderr, stdout
+
 # local modules
-from . import DSI
+from . import get_backend
 
 
-def main() -> None:
+def example() -> None:
     """
     This is an example of DSI
     """
-    with DSI() as dsi:
+    with get_backend().DSI() as dsi:
         window = dsi.get_active_window()
 
         print("Active window: ")
@@ -24,5 +34,169 @@ def main() -> None:
         print(f"\tGeometry: {window.geometry}")
 
 
+def serve(arguments: Namespace) -> None:
+    """
+    Runs the frame server until it is interrupted.
+    """
+    # pylint: disable-next=import-outside-toplevel
+    from .server import FrameServer
+
+    with get_backend(arguments.backend).DSI() as dsi:
+        server = FrameServer(dsi, arguments.socket)
+        with server:
+            print(f"Serving on {server.socket_path}")
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+
+
+def print_windows(windows: list[dict], as_json: bool) -> None:
+    """
+    Prints windows as JSON or one per line.
+    """
+    if as_json:
+        print(dumps(windows))
+        return
+    for window in windows:
+        print(
+            f"{window['id']}\t{window['pid']}\t"
+            f"{window['x']},{window['y']} {window['width']}x{window['height']}\t{window['name']}"
+        )
+
+
+def run_client(arguments: Namespace) -> None:
+    """
+    Runs a client subcommand against the server.
+    """
+    # pylint: disable-next=import-outside-toplevel
+    from .client import DSIClient
+
+    try:
+        client = DSIClient(arguments.socket)
+    except OSError as error:
+        print(
+            f"Can't connect to the server ({error}), "
+            "start it with: python -m display_server_interactions serve",
+            file=stderr
+        )
+        sys_exit(1)
+
+    with client:
+        try:
+            arguments.function(client, arguments)
+        except RuntimeError as error:
+            print(error, file=stderr)
+            sys_exit(1)
+
+
+def list_command(client, arguments: Namespace) -> None:
+    """
+    Prints all windows.
+    """
+    print_windows(client.windows(), arguments.json)
+
+
+def active_command(client, arguments: Namespace) -> None:
+    """
+    Prints the active window.
+    """
+    window = client.active()
+    if arguments.json:
+        print(dumps(window))
+    else:
+        print_windows([window], False)
+
+
+def find_command(client, arguments: Namespace) -> None:
+    """
+    Prints the windows with a name and/or pid, exits with 1 if there are none.
+    """
+    windows = client.find(arguments.name, arguments.pid)
+    print_windows(windows, arguments.json)
+    if not windows:
+        sys_exit(1)
+
+
+def capture_command(client, arguments: Namespace) -> None:
+    """
+    Captures a window into a file, or to stdout as PNG.
+    """
+    if arguments.output is None or arguments.output == "-":
+        stdout.buffer.write(client.capture(arguments.window))
+    else:
+        client.save(arguments.output, arguments.window)
+
+
+def type_command(client, arguments: Namespace) -> None:
+    """
+    Types a text into a window.
+    """
+    client.type(arguments.text, arguments.window)
+
+
+def click_command(client, arguments: Namespace) -> None:
+    """
+    Clicks into a window.
+    """
+    client.click(arguments.x, arguments.y, arguments.button, arguments.window)
+
+
+def main() -> None:
+    """
+    Runs a subcommand, the example without one.
+    """
+    parser = ArgumentParser(prog="python -m display_server_interactions")
+    subparsers = parser.add_subparsers(dest="command")
+
+    serve_parser = subparsers.add_parser("serve", help="serve frames over a Unix socket")
+    serve_parser.add_argument("--socket", help="the path of the socket")
+    serve_parser.add_argument("--backend", default="auto", help="the DSI backend")
+    serve_parser.set_defaults(run=serve)
+
+    commands = (
+        ("list", list_command, "list all windows"),
+        ("active", active_command, "show the active window"),
+        ("find", find_command, "find windows by name and/or pid"),
+        ("capture", capture_command, "capture a window"),
+        ("type", type_command, "type a text into a window"),
+        ("click", click_command, "click into a window"),
+    )
+    client_parsers = {}
+    for name, function, help_text in commands:
+        client_parser = client_parsers[name] = subparsers.add_parser(name, help=help_text)
+        client_parser.add_argument("--socket", help="the path of the socket of the server")
+        client_parser.set_defaults(run=run_client, function=function)
+
+    for name in ("list", "active", "find"):
+        client_parsers[name].add_argument("--json", action="store_true", help="print JSON")
+    client_parsers["find"].add_argument("--name", help="a part of the window name")
+    client_parsers["find"].add_argument("--pid", type=int, help="the pid of the window")
+    for name in ("capture", "type", "click"):
+        client_parsers[name].add_argument(
+            "--window",
+            type=lambda value: int(value, 0),
+            help="the window id, the active window by default"
+        )
+    client_parsers["capture"].add_argument(
+        "--output", "-o",
+        help="the image file, the format is taken from the extension (PNG to stdout by default)"
+    )
+    client_parsers["type"].add_argument("text")
+    client_parsers["click"].add_argument("x", type=int)
+    client_parsers["click"].add_argument("y", type=int)
+    client_parsers["click"].add_argument(
+        "--button",
+        default="left",
+        choices=("left", "right", "middle", "forward", "backward")
+    )
+
+    arguments = parser.parse_args()
+    if arguments.command is None:
+        example()
+    else:
+        arguments.run(arguments)
+
+
 if __name__ == "__main__":
     main()
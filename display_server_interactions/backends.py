@@ -0,0 +1,86 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+This module holds the registry of the DSI backends.
+A backend is a module with a DSI class that implements DSIBase,
+it is only imported when it is selected.
+"""
+
+# built-in modules
+from importlib import import_module
+from platform import system
+from types import ModuleType
+from typing import NamedTuple, Optional
+
+# local modules
+from .exceptions import DisplayServerNotSupportedError, OSNotSupportedError
+from .util import LinuxDisplayServer, detect_linux_display_server
+
+
+class Backend(NamedTuple):
+    """
+    A registered backend.
+    The module is imported relative to this package.
+    The backend is only selected by "auto" on the given platform
+    and, if display_server is not None, on the given Linux display server.
+    """
+    module: str
+    platform: str
+    display_server: Optional[LinuxDisplayServer] = None
+
+
+# name -> Backend, "auto" selects the first matching backend in this order
+backends = {}
+
+
+def register_backend(
+    name: str,
+    module: str,
+    platform: str,
+    display_server: Optional[LinuxDisplayServer] = None
+) -> None:
+    """
+    Registers a backend under a name.
+    """
+    backends[name] = Backend(module, platform, display_server)
+
+
+register_backend("xlib", ".linux", "linux", LinuxDisplayServer.X11)
+register_backend("xcb", ".xcb", "linux", LinuxDisplayServer.X11)
+register_backend("wayland", ".wayland", "linux", LinuxDisplayServer.WAYLAND)
+register_backend("windows", ".windows", "windows")
+
+
+def select_backend() -> str:
+    """
+    Returns the name of the backend for the current platform and display server.
+    """
+    platform = system().lower()
+    display_server = None
+    if platform == "linux":
+        display_server = detect_linux_display_server()
+
+    for name, backend in backends.items():
+        if backend.platform != platform:
+            continue
+        if backend.display_server is None or backend.display_server is display_server:
+            return name
+
+    if display_server is LinuxDisplayServer.UNKNOWN:
+        raise DisplayServerNotSupportedError("Your display server is not supported.")
+    if platform == "darwin":
+        raise NotImplementedError("MacOS is not yet implemented.")
+    raise OSNotSupportedError("Your OS is not supported.")
+
+
+def get_backend(name: str = "auto") -> ModuleType:
+    """
+    Imports and returns the module of a backend.
+    """
+    if name == "auto":
+        name = select_backend()
+    backend = backends.get(name)
+    if backend is None:
+        raise ValueError(f"Invalid backend '{name}'.")
+    return import_module(backend.module, __package__)
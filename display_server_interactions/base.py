@@ -9,15 +9,24 @@ This module holds the main DSI class
 # built-in modules
 from abc import ABCMeta, abstractmethod
 from platform import system
+from typing import AsyncIterator, Callable, Optional, Sequence, Union
 
 # local modules
 from .window import WindowBase
+from .monitor import Monitor
+from .image import Image
+from .box import Box
+from .stats import Instrumentation
+from .snapshot import Snapshot
+from .region import Region
 
 
 class DSIBase(metaclass=ABCMeta):
     """
     Main DSI class
     """
+    instrumentation: Optional[Instrumentation] = None
+
     @abstractmethod
     def get_active_window(self) -> WindowBase:
         """
@@ -26,9 +35,10 @@ class DSIBase(metaclass=ABCMeta):
         """
 
     @abstractmethod
-    def get_all_windows(self) -> list[WindowBase]:
+    def get_all_windows(self) -> Sequence[WindowBase]:
         """
-        Returns a list of all Windows.
+        Returns a sequence of all Windows,
+        usually a WindowList that creates the Window objects on access.
         """
 
     def get_window_by_pid(self, pid: int) -> WindowBase:
@@ -55,6 +65,165 @@ class DSIBase(metaclass=ABCMeta):
                 return window
         return None
 
+    def snapshot(self) -> Snapshot:
+        """
+        Returns a Snapshot with the name, pid, geometry, active and map state of all windows.
+        Diff two snapshots with snapshot.diff(newer) to get the windows
+        that appeared, disappeared, moved or were renamed.
+        """
+        return Snapshot.from_windows(self.get_all_windows(), self.get_active_window())
+
+    def on(self, event_type: str, callback: Optional[Callable] = None) -> Callable:
+        """
+        Subscribes a callback to window events of a type
+        (e.g. "focus", "configure" or "unmap", see events.EVENT_TYPES).
+        Without a callback it returns a decorator.
+        """
+        raise NotImplementedError("Window events are not supported by this backend.")
+
+    def off(self, event_type: str, callback: Callable) -> None:
+        """
+        Unsubscribes a callback from window events.
+        """
+        raise NotImplementedError("Window events are not supported by this backend.")
+
+    def events(self, *event_types: str) -> AsyncIterator:
+        """
+        Returns an async iterator over the window events of the given types (all types by default).
+        """
+        raise NotImplementedError("Window events are not supported by this backend.")
+
+    @abstractmethod
+    def get_monitors(self) -> list[Monitor]:
+        """
+        Returns a list of all monitors.
+        """
+
+    @abstractmethod
+    def get_screen_geometry(self) -> Box:
+        """
+        Returns the geometry of the whole screen, which contains all monitors.
+        """
+
+    @abstractmethod
+    def capture_screen(self, geometry: Box) -> Image:
+        """
+        Returns an Image of a region of the screen.
+        The geometry is in screen coordinates, like the geometry of the monitors.
+        """
+
+    def capture_windows(self, windows: Sequence[WindowBase]) -> list[Image]:
+        """
+        Returns an Image of every window.
+        """
+        return [window.get_image() for window in windows]
+
+    def _capture_windows(
+        self,
+        windows: Sequence[WindowBase],
+        geometries: Sequence[Optional[Box]],
+        regions: Sequence[Region],
+        capture_hidden: bool = False
+    ) -> list[Optional[Image]]:
+        """
+        Cuts the windows that are completely visible out of a single capture of the screen,
+        partially visible windows are captured one by one.
+        Windows that are not visible at all (unmapped, covered or off-screen) are skipped
+        (their Image is None), unless capture_hidden is True,
+        e.g. if the windows are captured from their composite pixmaps.
+        The geometries are in screen coordinates, None for destroyed windows.
+        """
+        images = [None] * len(windows)
+        visible = []
+        for index, (window, geometry, region) in enumerate(zip(windows, geometries, regions)):
+            if geometry is None or (not region and not capture_hidden):
+                continue
+            if region.contains(geometry):
+                visible.append(index)
+            else:
+                # captured before the screen, the copy keeps it from being overwritten
+                # if the screen capture reuses its shared memory
+                images[index] = window.get_image().copy()
+
+        if visible:
+            bounds = Region(geometries[index] for index in visible).bounds
+            screen = self.capture_screen(bounds)
+            for index in visible:
+                geometry = geometries[index]
+                images[index] = screen.crop(Box(
+                    geometry.x - bounds.x,
+                    geometry.y - bounds.y,
+                    geometry.width,
+                    geometry.height
+                ))
+        return images
+
+    def get_screen_image(
+        self,
+        monitor: Optional[Union[Monitor, int]] = None,
+        region: Optional[Box] = None
+    ) -> Image:
+        """
+        Returns an Image of a monitor or of the whole screen if no monitor is given.
+        The monitor can be a Monitor or its index in get_monitors().
+        With the region parameter you can specify a sub-region (relative to the monitor)
+        that will be captured.
+        To capture all monitors at once, capture the whole screen
+        and crop() the monitors out of the image.
+        """
+        if monitor is None:
+            geometry = self.get_screen_geometry()
+        elif isinstance(monitor, int):
+            geometry = self.get_monitors()[monitor].geometry
+        else:
+            geometry = monitor.geometry
+
+        if region is not None:
+            geometry = Box(
+                geometry.x + region.x,
+                geometry.y + region.y,
+                region.width,
+                region.height
+            )
+
+        return self.capture_screen(geometry)
+
+    # pylint: disable-next=redefined-builtin
+    def enable_stats(
+        self,
+        callback: Optional[Callable[[str], None]] = None,
+        format: str = "prometheus",
+        interval: float = 10.0
+    ) -> Instrumentation:
+        """
+        Enables the instrumentation of the capture path and returns it.
+        If a callback is given, it is called with the statistics in the given format
+        ("prometheus" or "openmetrics") at most every interval seconds,
+        e.g. get_logger().info from the linux module.
+        """
+        self.instrumentation = Instrumentation(callback, format, interval)
+        return self.instrumentation
+
+    def disable_stats(self) -> None:
+        """
+        Disables the instrumentation.
+        """
+        self.instrumentation = None
+
+    # pylint: disable-next=redefined-builtin
+    def stats(self, format: Optional[str] = None) -> Optional[Union[dict, str]]:
+        """
+        Returns the statistics that were recorded since enable_stats() as a dict.
+        With format "prometheus" or "openmetrics" they are returned as text instead.
+        Returns None if the instrumentation is not enabled,
+        i.e. before enable_stats() and after disable_stats().
+        """
+        if self.instrumentation is None:
+            return None
+        if format is None:
+            return self.instrumentation.to_dict()
+        return self.instrumentation.export(format)
+
     @property
     def platform(self) -> str:
         """
@@ -83,10 +252,16 @@ class DSIBase(metaclass=ABCMeta):
         """
         return self.platform == "darwin"
 
+    def close(self) -> None:
+        """
+        Releases the connections and resources of the DSI.
+        Windows of the DSI must not be used after this.
+        """
+
     # Allow dsi to be called with ’with’
 
     def __enter__(self):
         return self
 
     def __exit__(self, *_):
-        pass
+        self.close()
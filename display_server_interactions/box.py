@@ -11,6 +11,8 @@ class Box(tuple):
     A Box represents a rectangle with a position and size.
     """
 
+    __slots__ = ()
+
     def __init__(self, x: int, y: int, width: int, height: int):
         """This is just here for autocompletion"""
 
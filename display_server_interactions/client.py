@@ -0,0 +1,198 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+This module provides a thin client of the DSI server (python -m display_server_interactions serve).
+
+It only uses the standard library and doesn't load a backend,
+the server keeps the connection to the display server and its caches warm,
+so a request is answered in milliseconds.
+"""
+
+# built-in modules
+from json import dumps, loads
+from os import close as close_fd, environ, getuid, path, pread
+from socket import AF_UNIX, SO_PEERCRED, SOCK_SEQPACKET, SOL_SOCKET, recv_fds, socket
+from struct import Struct
+from typing import Optional, Sequence
+
+# the biggest message that is received, frames and images are not sent through the socket
+MAX_MESSAGE = 1 << 24
+
+# pid, uid, gid of SO_PEERCRED
+ucred_struct = Struct("iII")
+
+
+def default_socket_path() -> str:
+    """
+    Returns the path of the socket, in XDG_RUNTIME_DIR if it is set,
+    otherwise in a private directory in /tmp that the server creates.
+    """
+    runtime_dir = environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return path.join(runtime_dir, "dsi.sock")
+    return f"/tmp/dsi-{getuid()}/dsi.sock"
+
+
+def peer_uid(connection: socket) -> int:
+    """
+    Returns the uid of the process at the other end of a Unix socket.
+    """
+    return ucred_struct.unpack(
+        connection.getsockopt(SOL_SOCKET, SO_PEERCRED, ucred_struct.size)
+    )[1]
+
+
+def read_fd(fd: int, size: int) -> bytes:
+    """
+    Reads size bytes from the start of a file descriptor.
+    """
+    chunks = []
+    offset = 0
+    while offset < size:
+        chunk = pread(fd, size - offset, offset)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        offset += len(chunk)
+    return b"".join(chunks)
+
+
+class DSIClient:
+    """
+    A connection to the DSI server.
+    The methods raise RuntimeError with the message of the server if a request failed.
+    """
+
+    def __init__(self, socket_path: Optional[str] = None) -> None:
+        self.socket_path = socket_path or default_socket_path()
+        self.socket = socket(AF_UNIX, SOCK_SEQPACKET)
+        try:
+            self.socket.connect(self.socket_path)
+            # requests can contain input, so they are only sent to a server of the same user
+            if peer_uid(self.socket) != getuid():
+                raise PermissionError(f"{self.socket_path} belongs to another user.")
+        except OSError:
+            self.socket.close()
+            raise
+        self._next_id = 1
+
+    def request(self, cmd: str, **arguments) -> tuple:
+        """
+        Sends a request and returns the response and the attached file descriptors.
+        Events of subscriptions that arrive in the meantime are discarded,
+        use a separate client for subscriptions.
+        """
+        request_id = self._next_id
+        self._next_id += 1
+        self.socket.send(dumps({"id": request_id, "cmd": cmd, **arguments}).encode())
+        while True:
+            data, fds, _, _ = recv_fds(self.socket, MAX_MESSAGE, 4)
+            if not data:
+                raise ConnectionError("The server closed the connection.")
+            response = loads(data)
+            if response.get("id") == request_id and "event" not in response:
+                break
+            for fd in fds:
+                close_fd(fd)
+
+        if not response.get("ok"):
+            for fd in fds:
+                close_fd(fd)
+            raise RuntimeError(response.get("error"))
+        return response, fds
+
+    def windows(self) -> list[dict]:
+        """
+        Returns the id, name, pid, geometry, active and map state of all windows.
+        """
+        return self.request("windows")[0]["windows"]
+
+    def active(self) -> dict:
+        """
+        Returns the id, name, pid and geometry of the active window.
+        """
+        return self.request("active")[0]["window"]
+
+    def find(self, name: Optional[str] = None, pid: Optional[int] = None) -> list[dict]:
+        """
+        Returns the windows whose name contains the name and/or that have the pid.
+        """
+        return self.request("find", name=name, pid=pid)[0]["windows"]
+
+    # pylint: disable-next=redefined-builtin
+    def capture(
+        self,
+        window: Optional[int] = None,
+        geometry: Optional[Sequence[int]] = None,
+        format: str = "png"
+    ) -> bytes:
+        """
+        Returns an image of a window (the active window by default) encoded in the format.
+        """
+        response, fds = self.request(
+            "capture",
+            window=window,
+            geometry=geometry,
+            format=format
+        )
+        try:
+            return read_fd(fds[0], response["size"])
+        finally:
+            for fd in fds:
+                close_fd(fd)
+
+    # pylint: disable-next=redefined-builtin
+    def save(
+        self,
+        file_path: str,
+        window: Optional[int] = None,
+        geometry: Optional[Sequence[int]] = None,
+        format: Optional[str] = None
+    ) -> dict:
+        """
+        Lets the server capture a window and save it to a file,
+        the format is taken from the file extension if it is not given.
+        """
+        return self.request(
+            "capture",
+            window=window,
+            geometry=geometry,
+            path=path.abspath(file_path),
+            format=format
+        )[0]
+
+    def input(self, commands: list[dict], window: Optional[int] = None) -> int:
+        """
+        Sends a batch of input commands to a window (the active window by default),
+        see server. Returns the number of executed commands.
+        """
+        return self.request("input", window=window, commands=commands)[0]["done"]
+
+    def type(self, text: str, window: Optional[int] = None) -> None:
+        """
+        Sends the keystrokes of the text to a window.
+        """
+        self.input([{"type": "text", "text": text}], window)
+
+    # pylint: disable-next=invalid-name
+    def click(self, x: int, y: int, button: str = "left", window: Optional[int] = None) -> None:
+        """
+        Sends a mouse click to a window at the given coordinates.
+        """
+        self.input([{"type": "click", "x": x, "y": y, "button": button}], window)
+
+    def close(self) -> None:
+        """
+        Closes the connection.
+        """
+        self.socket.close()
+
+    def __enter__(self) -> "DSIClient":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f'DSIClient(socket_path="{self.socket_path}")'
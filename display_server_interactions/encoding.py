@@ -0,0 +1,295 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+This module encodes Images into PNG, QOI and JPEG.
+PNG and QOI are encoded directly from the BGRA data of the Image,
+JPEG needs Pillow or OpenCV.
+The alpha channel is dropped, because X11 does not fill it for most windows.
+"""
+
+# built-in modules
+from concurrent.futures import Future, ThreadPoolExecutor
+from io import BytesIO
+from os.path import splitext
+from struct import pack
+from typing import Callable, Optional, TYPE_CHECKING
+from zlib import compress, crc32
+
+if TYPE_CHECKING:
+    from .image import Image
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+QOI_OP_INDEX = 0x00
+QOI_OP_DIFF = 0x40
+QOI_OP_LUMA = 0x80
+QOI_OP_RUN = 0xc0
+QOI_OP_RGB = 0xfe
+QOI_END = b"\x00\x00\x00\x00\x00\x00\x00\x01"
+
+
+def to_rgb(image: "Image") -> bytearray:
+    """
+    Converts the BGRA data of an Image to packed RGB.
+    """
+    if not image.contiguous:
+        image = image.copy()
+    data = memoryview(image.data).cast("B")
+    rgb = bytearray(image.width * image.height * 3)
+    rgb[0::3] = data[2::4]
+    rgb[1::3] = data[1::4]
+    rgb[2::3] = data[0::4]
+    return rgb
+
+
+def png_chunk(chunk_type: bytes, data: bytes) -> bytes:
+    """
+    Returns a PNG chunk with its length and checksum.
+    """
+    return pack(">I", len(data)) + chunk_type + data + pack(">I", crc32(data, crc32(chunk_type)))
+
+
+def encode_png(image: "Image", level: int = 1) -> bytes:
+    """
+    Encodes an Image as an 8 bit RGB PNG.
+    The default compression level of 1 is much faster than the usual 6,
+    at the cost of slightly bigger files.
+    """
+    data = memoryview(image.data).cast("B")
+    stride = image.stride
+    row_size = image.width * 3
+
+    # every row starts with its filter type, 0 is no filter
+    raw = bytearray((row_size + 1) * image.height)
+    for row in range(image.height):
+        start = row * (row_size + 1) + 1
+        end = start + row_size
+        offset = row * stride
+        raw[start:end:3] = data[offset + 2:offset + image.width * 4:4]
+        raw[start + 1:end:3] = data[offset + 1:offset + image.width * 4:4]
+        raw[start + 2:end:3] = data[offset:offset + image.width * 4:4]
+
+    return b"".join((
+        PNG_SIGNATURE,
+        png_chunk(b"IHDR", pack(">IIBBBBB", image.width, image.height, 8, 2, 0, 0, 0)),
+        png_chunk(b"IDAT", compress(raw, level)),
+        png_chunk(b"IEND", b"")
+    ))
+
+
+def encode_qoi(image: "Image") -> bytes:
+    """
+    Encodes an Image as a QOI (https://qoiformat.org/) with 3 channels.
+    Uses the qoi package if it is installed.
+    """
+    try:
+        # pylint: disable-next=import-outside-toplevel
+        import qoi
+        # pylint: disable-next=import-outside-toplevel
+        import numpy
+    except ImportError:
+        return _encode_qoi(image)
+
+    rgb = numpy.frombuffer(to_rgb(image), dtype=numpy.uint8)
+    return qoi.encode(rgb.reshape(image.height, image.width, 3))
+
+
+# pylint: disable-next=too-many-locals, too-many-branches
+def _encode_qoi(image: "Image") -> bytes:
+    """
+    A pure Python QOI encoder.
+    """
+    if not image.contiguous:
+        image = image.copy()
+
+    out = bytearray(b"qoif")
+    out += pack(">IIBB", image.width, image.height, 3, 0)
+
+    index = [-1] * 64
+    previous = 0x000000
+    run = 0
+
+    # a pixel as integer is 0xAARRGGBB, the alpha channel is ignored
+    for pixel in memoryview(image.data).cast("B").cast("I"):
+        pixel &= 0xFFFFFF
+
+        if pixel == previous:
+            run += 1
+            if run == 62:
+                out.append(QOI_OP_RUN | (run - 1))
+                run = 0
+            continue
+
+        if run:
+            out.append(QOI_OP_RUN | (run - 1))
+            run = 0
+
+        red = pixel >> 16
+        green = (pixel >> 8) & 0xFF
+        blue = pixel & 0xFF
+        position = (red * 3 + green * 5 + blue * 7 + 255 * 11) % 64
+
+        if index[position] == pixel:
+            out.append(QOI_OP_INDEX | position)
+        else:
+            index[position] = pixel
+
+            diff_red = ((red - (previous >> 16) + 128) & 0xFF) - 128
+            diff_green = ((green - ((previous >> 8) & 0xFF) + 128) & 0xFF) - 128
+            diff_blue = ((blue - (previous & 0xFF) + 128) & 0xFF) - 128
+
+            if -2 <= diff_red <= 1 and -2 <= diff_green <= 1 and -2 <= diff_blue <= 1:
+                out.append(
+                    QOI_OP_DIFF
+                    | (diff_red + 2) << 4
+                    | (diff_green + 2) << 2
+                    | (diff_blue + 2)
+                )
+            else:
+                diff_red_green = diff_red - diff_green
+                diff_blue_green = diff_blue - diff_green
+                if (
+                    -32 <= diff_green <= 31
+                    and -8 <= diff_red_green <= 7
+                    and -8 <= diff_blue_green <= 7
+                ):
+                    out.append(QOI_OP_LUMA | (diff_green + 32))
+                    out.append((diff_red_green + 8) << 4 | (diff_blue_green + 8))
+                else:
+                    out.append(QOI_OP_RGB)
+                    out.append(red)
+                    out.append(green)
+                    out.append(blue)
+
+        previous = pixel
+
+    if run:
+        out.append(QOI_OP_RUN | (run - 1))
+
+    out += QOI_END
+    return bytes(out)
+
+
+def encode_jpeg(image: "Image", quality: int = 90) -> bytes:
+    """
+    Encodes an Image as a JPEG with Pillow or OpenCV.
+    """
+    try:
+        # pylint: disable-next=import-outside-toplevel
+        from PIL import Image as PILImage
+    except ImportError:
+        pass
+    else:
+        pil_image = PILImage.frombuffer(
+            "RGB",
+            (image.width, image.height),
+            image.data,
+            "raw",
+            "BGRX",
+            image.stride,
+            1
+        )
+        buffer = BytesIO()
+        pil_image.save(buffer, format="JPEG", quality=quality)
+        return buffer.getvalue()
+
+    try:
+        # pylint: disable=import-outside-toplevel
+        import cv2
+        import numpy
+        # pylint: enable=import-outside-toplevel
+    except ImportError as error:
+        raise ImportError("Pillow or OpenCV is required to encode JPEG.") from error
+
+    success, buffer = cv2.imencode(
+        ".jpg",
+        cv2.cvtColor(numpy.asarray(image), cv2.COLOR_BGRA2BGR),
+        [cv2.IMWRITE_JPEG_QUALITY, quality]
+    )
+    if not success:
+        raise RuntimeError("OpenCV failed to encode the image.")
+    return buffer.tobytes()
+
+
+encoders = {
+    "png": encode_png,
+    "qoi": encode_qoi,
+    "jpeg": encode_jpeg,
+    "jpg": encode_jpeg,
+}
+
+
+def get_encoder(image_format: str) -> Callable:
+    """
+    Returns the encoder function for a format.
+    """
+    encoder = encoders.get(image_format.lower())
+    if encoder is None:
+        raise ValueError(f"Invalid image format '{image_format}'.")
+    return encoder
+
+
+def encode(image: "Image", image_format: str = "png", **options) -> bytes:
+    """
+    Encodes an Image into the given format.
+    The options are passed to the encoder, e.g. level for PNG or quality for JPEG.
+    """
+    return get_encoder(image_format)(image, **options)
+
+
+def save(image: "Image", path: str, image_format: Optional[str] = None, **options) -> None:
+    """
+    Encodes an Image and writes it to a file.
+    If no format is given, it is taken from the file extension.
+    """
+    if image_format is None:
+        image_format = splitext(path)[1][1:]
+    data = encode(image, image_format, **options)
+    with open(path, "wb") as file:
+        file.write(data)
+
+
+class EncoderPool:
+    """
+    Encodes Images in background threads, so bursts of screenshots don't stall the capture.
+    zlib and the JPEG encoders release the GIL, so PNG and JPEG encode in parallel.
+    An Image must not be modified until its encoding is done.
+    """
+
+    def __init__(self, workers: Optional[int] = None) -> None:
+        self.workers = workers
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix="dsi-encoder"
+        )
+
+    def encode(self, image: "Image", image_format: str = "png", **options) -> Future:
+        """
+        Encodes an Image in the background.
+        Returns a Future of the encoded bytes.
+        """
+        return self.executor.submit(encode, image, image_format, **options)
+
+    # pylint: disable-next=line-too-long
+    def save(self, image: "Image", path: str, image_format: Optional[str] = None, **options) -> Future:
+        """
+        Encodes an Image and writes it to a file in the background.
+        Returns a Future that is done when the file is written.
+        """
+        return self.executor.submit(save, image, path, image_format, **options)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Shuts the pool down. If wait is True, waits for all pending encodings.
+        """
+        self.executor.shutdown(wait=wait)
+
+    def __enter__(self) -> "EncoderPool":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.shutdown()
+
+    def __repr__(self) -> str:
+        return f"EncoderPool(workers={self.workers})"
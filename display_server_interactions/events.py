@@ -0,0 +1,267 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+This module provides subscriptions to window events on X11.
+
+A dispatcher thread waits on the socket of its own X connection (and a wake-up pipe) with select(),
+so it reacts within milliseconds and uses no CPU while nothing happens.
+"""
+
+# built-in modules
+from asyncio import Queue, get_running_loop
+from ctypes import byref
+from os import close as close_fd, pipe, read, write
+from select import select
+from threading import Event, Lock, Thread, current_thread
+from typing import AsyncIterator, Callable, NamedTuple, Optional
+
+# local modules
+from .box import Box
+from .window import WindowBase
+from .x11 import (
+    Xlib,
+    XEvent,
+    EventTypes,
+    Masks,
+    get_logger,
+)
+from .linux import get_active_window_xid, get_all_windows
+
+# the event types that can be subscribed
+EVENT_TYPES = ("focus", "create", "destroy", "configure", "name", "map", "unmap", "visibility")
+
+# creation, destruction, (un)mapping and configuration of the children,
+# property changes and visibility changes of every window
+EVENT_MASK = (
+    Masks.SubstructureNotifyMask
+    | Masks.PropertyChangeMask
+    | Masks.VisibilityChangeMask
+)
+
+
+# pylint: disable-next=too-few-public-methods
+class VisibilityStates:
+    """
+    The state of a visibility event\n
+    /usr/include/X11/X.h
+    """
+    VisibilityUnobscured = 0
+    VisibilityPartiallyObscured = 1
+    VisibilityFullyObscured = 2
+
+
+class WindowEvent(NamedTuple):
+    """
+    An event of a window.
+    window is None for a focus event if no window is active.
+    geometry is only set for create and configure events, it is relative to the parent.
+    state is only set for visibility events, e.g. VisibilityStates.VisibilityFullyObscured.
+    Compositing window managers report every window as unobscured.
+    """
+    type: str
+    window: Optional[WindowBase]
+    geometry: Optional[Box] = None
+    state: Optional[int] = None
+
+
+class EventDispatcher:
+    """
+    Calls the subscribed callbacks with the WindowEvents of all windows.
+    The thread is started with the first subscription and stopped by stop().
+    The callbacks are called on the dispatcher thread, they should return quickly.
+    """
+
+    def __init__(self, factory: Callable[[int], WindowBase]) -> None:
+        # creates the Window of an XID
+        self.factory = factory
+        # event type -> callbacks
+        self.callbacks = {event_type: [] for event_type in EVENT_TYPES}
+        self.lock = Lock()
+        self.thread = None
+        self.ready = Event()
+        self._wake = None
+        self._error = None
+
+    def on(self, event_type: str, callback: Optional[Callable] = None) -> Callable:
+        """
+        Subscribes a callback to an event type
+        (e.g. "focus", "configure" or "unmap", see EVENT_TYPES).
+        The callback is called with a WindowEvent.
+        Without a callback it returns a decorator.
+        """
+        if event_type not in self.callbacks:
+            raise ValueError(f"Invalid event type '{event_type}'.")
+        if callback is None:
+            return lambda callback: self.on(event_type, callback)
+
+        with self.lock:
+            self.callbacks[event_type].append(callback)
+        try:
+            self.start()
+        except Exception:
+            # don't keep the callback of a failed subscription
+            with self.lock:
+                self.callbacks[event_type].remove(callback)
+            raise
+        return callback
+
+    def off(self, event_type: str, callback: Callable) -> None:
+        """
+        Unsubscribes a callback.
+        """
+        with self.lock:
+            self.callbacks[event_type].remove(callback)
+
+    async def events(self, *event_types: str) -> AsyncIterator[WindowEvent]:
+        """
+        An async iterator over the WindowEvents of the given types (all types by default).
+        """
+        loop = get_running_loop()
+        queue = Queue()
+
+        def callback(event: WindowEvent) -> None:
+            loop.call_soon_threadsafe(queue.put_nowait, event)
+
+        event_types = event_types or EVENT_TYPES
+        for event_type in event_types:
+            self.on(event_type, callback)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            for event_type in event_types:
+                self.off(event_type, callback)
+
+    def start(self) -> None:
+        """
+        Starts the dispatcher thread and waits until it listens to all windows.
+        """
+        with self.lock:
+            if self.thread is None:
+                self.ready.clear()
+                self._error = None
+                self._wake = pipe()
+                self.thread = Thread(target=self._run, name="dsi-events", daemon=True)
+                self.thread.start()
+        self.ready.wait()
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def stop(self) -> None:
+        """
+        Stops the dispatcher thread, the subscriptions are kept.
+        """
+        with self.lock:
+            thread = self.thread
+            self.thread = None
+        if thread is None:
+            return
+        write(self._wake[1], b"\0")
+        thread.join()
+        for fd in self._wake:
+            close_fd(fd)
+        self._wake = None
+
+    def _emit(self, event: WindowEvent) -> None:
+        with self.lock:
+            callbacks = tuple(self.callbacks[event.type])
+        for callback in callbacks:
+            try:
+                callback(event)
+            # pylint: disable-next=broad-except
+            except Exception:
+                get_logger().exception("Event callback %r failed.", callback)
+
+    def _run(self) -> None:
+        xlib = None
+        try:
+            # the connection is only used by this thread
+            xlib = Xlib()
+            self._listen(xlib)
+        # pylint: disable-next=broad-except
+        except Exception as error:
+            if self.ready.is_set():
+                get_logger().exception("Event dispatcher failed.")
+            else:
+                # raised by start()
+                self._error = error
+        finally:
+            if xlib is not None:
+                xlib.close()
+            # the thread ended on its own, the next subscription starts a new one
+            with self.lock:
+                if self.thread is current_thread():
+                    self.thread = None
+                    for fd in self._wake:
+                        close_fd(fd)
+                    self._wake = None
+            self.ready.set()
+
+    def _listen(self, xlib: Xlib) -> None:
+        display = xlib.display
+        name_atoms = {
+            xlib.XInternAtom(display, name, False)
+            for name in (b"_NET_WM_NAME", b"WM_NAME")
+        }
+        active_atom = xlib.XInternAtom(display, b"_NET_ACTIVE_WINDOW", False)
+
+        xlib.XSelectInput(display, xlib.root_window, EVENT_MASK)
+        for xid in get_all_windows(xlib).ids:
+            xlib.XSelectInput(display, xid, EVENT_MASK)
+        xlib.XFlush(display)
+        active = get_active_window_xid(xlib)
+        self.ready.set()
+
+        sockets = [xlib.XConnectionNumber(display), self._wake[0]]
+        event = XEvent()
+        while True:
+            # events that were read together with a reply are already queued
+            if not xlib.XPending(display):
+                readable, _, _ = select(sockets, [], [])
+                if self._wake[0] in readable:
+                    read(self._wake[0], 1)
+                    return
+                continue
+
+            xlib.XNextEvent(display, byref(event))
+
+            if event.type == EventTypes.CreateNotify:
+                created = event.xcreatewindow
+                xlib.XSelectInput(display, created.window, EVENT_MASK)
+                xlib.XFlush(display)
+                self._emit(WindowEvent(
+                    "create",
+                    self.factory(created.window),
+                    Box(created.x, created.y, created.width, created.height)
+                ))
+            elif event.type == EventTypes.DestroyNotify:
+                self._emit(WindowEvent("destroy", self.factory(event.xdestroywindow.window)))
+            elif event.type == EventTypes.ConfigureNotify:
+                configure = event.xconfigure
+                self._emit(WindowEvent(
+                    "configure",
+                    self.factory(configure.window),
+                    Box(configure.x, configure.y, configure.width, configure.height)
+                ))
+            elif event.type == EventTypes.MapNotify:
+                self._emit(WindowEvent("map", self.factory(event.xmap.window)))
+            elif event.type == EventTypes.UnmapNotify:
+                self._emit(WindowEvent("unmap", self.factory(event.xunmap.window)))
+            elif event.type == EventTypes.VisibilityNotify:
+                visibility = event.xvisibility
+                self._emit(WindowEvent(
+                    "visibility",
+                    self.factory(visibility.window),
+                    state=visibility.state
+                ))
+            elif event.type == EventTypes.PropertyNotify:
+                changed = event.xproperty
+                if changed.atom == active_atom and changed.window == xlib.root_window:
+                    xid = get_active_window_xid(xlib)
+                    if xid != active:
+                        active = xid
+                        self._emit(WindowEvent("focus", self.factory(xid) if xid else None))
+                elif changed.atom in name_atoms:
+                    self._emit(WindowEvent("name", self.factory(changed.window)))
@@ -0,0 +1,305 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+This module provides a raw frame dump format.
+Frames are appended to the file without any encoding, so bursts can be captured at full rate.
+
+File layout (little-endian):
+
+* A 64 byte header: magic, version, width, height, stride, record size and pixel format
+* Fixed size records, one per frame:
+  a 64 byte record header with the timestamp and the frame index,
+  followed by the BGRA frame data, padded to a multiple of 64 bytes
+
+Because every record has the same size, a frame can be found by its index in O(1)
+and by its timestamp with a binary search over the memory-mapped timestamps.
+A truncated file (e.g. after a crash) stays readable up to the last complete record.
+"""
+
+# built-in modules
+from bisect import bisect_right
+from mmap import mmap, ACCESS_READ
+from os import fstat
+from struct import Struct
+from time import time
+from typing import Iterator, Optional
+
+# local modules
+from .image import Image
+from .stream import Frame
+
+MAGIC = b"DSIDUMP\0"
+VERSION = 1
+HEADER_SIZE = 64
+RECORD_HEADER_SIZE = 64
+ALIGNMENT = 64
+PIXEL_FORMAT = b"BGRA"
+
+# magic, version, header size, width, height, stride, record size, pixel format
+header_struct = Struct("<8sHHIIII4s")
+# timestamp, index
+record_struct = Struct("<dQ")
+
+
+def align(size: int) -> int:
+    """
+    Rounds size up to a multiple of ALIGNMENT.
+    """
+    return -(-size // ALIGNMENT) * ALIGNMENT
+
+
+class FrameDumpError(Exception):
+    """Exception raised when a frame dump is invalid."""
+
+
+class FrameDumpWriter:
+    """
+    Appends frames to a raw frame dump.
+    All frames must have the size that was given when the writer was created.
+    """
+
+    def __init__(self, path: str, width: int, height: int) -> None:
+        self.path = path
+        self.width = width
+        self.height = height
+        self.stride = width * 4
+        self.frame_size = self.stride * height
+        self.record_size = RECORD_HEADER_SIZE + align(self.frame_size)
+        self.count = 0
+
+        self._record_header = bytearray(RECORD_HEADER_SIZE)
+        self._padding = bytes(self.record_size - RECORD_HEADER_SIZE - self.frame_size)
+
+        # pylint: disable-next=consider-using-with
+        self.file = open(path, "wb")
+        header = bytearray(HEADER_SIZE)
+        header_struct.pack_into(
+            header,
+            0,
+            MAGIC,
+            VERSION,
+            HEADER_SIZE,
+            width,
+            height,
+            self.stride,
+            self.record_size,
+            PIXEL_FORMAT
+        )
+        self.file.write(header)
+
+    def write(self, image: Image, timestamp: Optional[float] = None) -> int:
+        """
+        Appends an image and returns its frame index.
+        If no timestamp is given, the current time is used.
+        """
+        if image.width != self.width or image.height != self.height:
+            # pylint: disable-next=line-too-long
+            raise ValueError(f"Invalid image size {image.width}x{image.height}, expected {self.width}x{self.height}.")
+        if timestamp is None:
+            timestamp = time()
+        if not image.contiguous:
+            image = image.copy()
+
+        record_struct.pack_into(self._record_header, 0, timestamp, self.count)
+        self.file.write(self._record_header)
+        self.file.write(image.data)
+        self.file.write(self._padding)
+
+        self.count += 1
+        return self.count - 1
+
+    def write_frame(self, frame: Frame) -> int:
+        """
+        Appends a Frame of a CaptureStream and returns its index in the dump.
+        """
+        return self.write(frame.image, frame.timestamp)
+
+    def flush(self) -> None:
+        """
+        Flushes the written frames to the file.
+        """
+        self.file.flush()
+
+    def close(self) -> None:
+        """
+        Closes the file.
+        """
+        self.file.close()
+
+    def __enter__(self) -> "FrameDumpWriter":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        # pylint: disable-next=line-too-long
+        return f'FrameDumpWriter(path="{self.path}", width={self.width}, height={self.height}, count={self.count})'
+
+
+class _Timestamps:
+    """
+    A read-only sequence of the timestamps in a frame dump.
+    """
+
+    def __init__(self, reader: "FrameDumpReader") -> None:
+        self.reader = reader
+
+    def __len__(self) -> int:
+        return len(self.reader)
+
+    def __getitem__(self, index: int) -> float:
+        return self.reader.timestamp(index)
+
+
+class FrameDumpReader:
+    """
+    Reads a raw frame dump through a read-only memory map.
+    The returned Images are backed by the memory map and are not copied.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        # pylint: disable-next=consider-using-with
+        self.file = open(path, "rb")
+        size = fstat(self.file.fileno()).st_size
+        if size < HEADER_SIZE:
+            self.file.close()
+            raise FrameDumpError(f'"{path}" is not a frame dump.')
+
+        self.mmap = mmap(self.file.fileno(), 0, access=ACCESS_READ)
+        # created after the checks, close() can be called before
+        self._view = None
+        (
+            magic,
+            version,
+            self.header_size,
+            self.width,
+            self.height,
+            self.stride,
+            self.record_size,
+            pixel_format
+        ) = header_struct.unpack_from(self.mmap, 0)
+
+        if magic != MAGIC or pixel_format != PIXEL_FORMAT:
+            self.close()
+            raise FrameDumpError(f'"{path}" is not a frame dump.')
+        if version != VERSION:
+            self.close()
+            raise FrameDumpError(f"Unsupported frame dump version {version}.")
+
+        self.frame_size = self.stride * self.height
+        self.count = (size - self.header_size) // self.record_size
+        self._view = memoryview(self.mmap)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _offset(self, index: int) -> int:
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("frame index out of range")
+        return self.header_size + index * self.record_size
+
+    def timestamp(self, index: int) -> float:
+        """
+        Returns the timestamp of a frame.
+        """
+        return record_struct.unpack_from(self.mmap, self._offset(index))[0]
+
+    @property
+    def timestamps(self) -> _Timestamps:
+        """
+        Returns a read-only sequence of all timestamps.
+        """
+        return _Timestamps(self)
+
+    def image(self, index: int) -> Image:
+        """
+        Returns the image of a frame, backed by the memory map.
+        """
+        start = self._offset(index) + RECORD_HEADER_SIZE
+        return Image(
+            self._view[start:start + self.frame_size],
+            self.width,
+            self.height
+        )
+
+    def __getitem__(self, index: int) -> Frame:
+        if index < 0:
+            index += self.count
+        return Frame(index, self.timestamp(index), self.image(index))
+
+    def __iter__(self) -> Iterator[Frame]:
+        for index in range(self.count):
+            yield self[index]
+
+    def find(self, timestamp: float) -> int:
+        """
+        Returns the index of the last frame that was captured at or before the timestamp.
+        Returns None if all frames were captured after the timestamp.
+        """
+        index = bisect_right(self.timestamps, timestamp) - 1
+        if index < 0:
+            return None
+        return index
+
+    def at(self, timestamp: float) -> Frame:
+        """
+        Returns the frame that was visible at the timestamp.
+        Returns None if all frames were captured after the timestamp.
+        """
+        index = self.find(timestamp)
+        if index is None:
+            return None
+        return self[index]
+
+    def to_numpy(self):
+        """
+        Returns all frames as a numpy array with the shape (count, height, width, 4)
+        and the timestamps as a numpy array.
+        Both are views of a numpy.memmap, nothing is copied.
+        """
+        # pylint: disable-next=import-outside-toplevel
+        import numpy
+
+        data = numpy.memmap(self.path, dtype=numpy.uint8, mode="r")
+        records = data[self.header_size:self.header_size + self.count * self.record_size]
+        frames = numpy.lib.stride_tricks.as_strided(
+            records[RECORD_HEADER_SIZE:],
+            shape=(self.count, self.height, self.width, 4),
+            strides=(self.record_size, self.stride, 4, 1),
+            writeable=False
+        )
+        timestamps = numpy.lib.stride_tricks.as_strided(
+            records.view(numpy.float64),
+            shape=(self.count,),
+            strides=(self.record_size,),
+            writeable=False
+        )
+        return frames, timestamps
+
+    def close(self) -> None:
+        """
+        Closes the memory map and the file.
+        Images that are still referenced keep the memory map open.
+        """
+        try:
+            if self._view is not None:
+                self._view.release()
+            self.mmap.close()
+        except BufferError:
+            pass
+        self.file.close()
+
+    def __enter__(self) -> "FrameDumpReader":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        # pylint: disable-next=line-too-long
+        return f'FrameDumpReader(path="{self.path}", width={self.width}, height={self.height}, count={self.count})'
@@ -0,0 +1,468 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+This module provides a FrameHub that shares the captures of a window between many subscribers.
+
+Subscribers of the same (window, geometry, format) share one capture loop,
+every frame is captured (and encoded) once and handed to all of them by reference.
+"""
+
+# built-in modules
+from collections import deque
+from threading import Condition, Lock, Thread
+from time import perf_counter
+from typing import Hashable, Iterator, Optional, TYPE_CHECKING
+
+# local modules
+from . import encoding
+from .image import Image
+from .box import Box
+from .stream import CaptureStream
+
+if TYPE_CHECKING:
+    from .window import WindowBase
+
+# what a subscriber does with a new frame when its queue is full
+POLICIES = ("drop_oldest", "drop_newest")
+
+
+def window_key(window: "WindowBase") -> Hashable:
+    """
+    Returns the id of a window (XID or HWND) that identifies it across Window objects.
+    """
+    return getattr(window, "xid", getattr(window, "window", window))
+
+
+class FramePool:
+    """
+    Buffers for the frames of a capture loop.
+    A buffer is reused once every subscriber has released its frame.
+    """
+
+    def __init__(self) -> None:
+        self.lock = Lock()
+        self.buffers = []
+        self.allocated = 0
+
+    def acquire(self, size: int) -> bytearray:
+        """
+        Returns a buffer of the given size, a free one if there is one.
+        """
+        with self.lock:
+            while self.buffers:
+                buffer = self.buffers.pop()
+                if len(buffer) == size:
+                    return buffer
+            self.allocated += 1
+        return bytearray(size)
+
+    def put(self, buffer: bytearray) -> None:
+        """
+        Returns a buffer to the pool.
+        """
+        with self.lock:
+            self.buffers.append(buffer)
+
+
+class SharedFrame:
+    """
+    A frame that is shared by the subscribers of a FrameHub.
+    The image is not copied for each subscriber, so it must not be modified.
+    data is the encoded image if the subscription has a format other than "raw".
+    Call release() (or use the frame as a context manager) when done with the frame,
+    iterating a Subscription releases the previous frame automatically.
+    """
+
+    __slots__ = ("index", "timestamp", "image", "data", "_refs", "_lock", "_pool", "_buffer")
+
+    # pylint: disable-next=too-many-arguments
+    def __init__(
+        self,
+        index: int,
+        timestamp: float,
+        image: Image,
+        data: Optional[bytes],
+        pool: Optional[FramePool] = None,
+        buffer: Optional[bytearray] = None
+    ) -> None:
+        self.index = index
+        # the wall clock time (time.time()) at which the capture started
+        self.timestamp = timestamp
+        self.image = image
+        self.data = data
+        self._refs = 1
+        self._lock = Lock()
+        self._pool = pool
+        self._buffer = buffer
+
+    @property
+    def refs(self) -> int:
+        """
+        Returns the number of holders of the frame.
+        """
+        return self._refs
+
+    def retain(self) -> "SharedFrame":
+        """
+        Adds a holder of the frame.
+        """
+        with self._lock:
+            if self._refs <= 0:
+                raise RuntimeError(f"{self} has already been released.")
+            self._refs += 1
+        return self
+
+    def release(self) -> None:
+        """
+        Removes a holder of the frame, the buffer is reused after the last one.
+        """
+        with self._lock:
+            if self._refs <= 0:
+                return
+            self._refs -= 1
+            if self._refs:
+                return
+        if self._pool is not None:
+            self._pool.put(self._buffer)
+            self._buffer = None
+
+    def __enter__(self) -> "SharedFrame":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.release()
+
+    def __repr__(self) -> str:
+        return f"SharedFrame(index={self.index}, image={self.image}, refs={self._refs})"
+
+
+class Subscription:
+    """
+    A subscription to the frames of a FrameHub.
+    At most depth frames are queued, when the queue is full a frame is dropped
+    by the policy: "drop_oldest" keeps the newest frames, "drop_newest" the oldest.
+    """
+
+    # pylint: disable-next=too-many-arguments
+    def __init__(
+        self,
+        hub: "FrameHub",
+        key: tuple,
+        fps: float,
+        depth: int,
+        policy: str
+    ) -> None:
+        if fps <= 0:
+            raise ValueError(f"Invalid fps '{fps}'.")
+        if depth < 1:
+            raise ValueError(f"Invalid depth '{depth}'.")
+        if policy not in POLICIES:
+            raise ValueError(f"Invalid policy '{policy}'.")
+        self.hub = hub
+        self.key = key
+        self.fps = fps
+        self.depth = depth
+        self.policy = policy
+        self.received = 0
+        self.dropped = 0
+        self.skipped = 0
+        self._queue = deque()
+        self._condition = Condition()
+        self._last = None
+        self._current = None
+        self._closed = False
+        # the error of the capture loop if it failed
+        self.error = None
+
+    def _offer(self, frame: SharedFrame) -> None:
+        """
+        Queues a frame, called by the capture loop.
+        """
+        # deliver at most fps frames per second, with some slack for jitter
+        now = perf_counter()
+        if self._last is not None and now - self._last < 0.9 / self.fps:
+            self.skipped += 1
+            return
+
+        with self._condition:
+            if self._closed:
+                return
+            if len(self._queue) >= self.depth:
+                self.dropped += 1
+                if self.policy == "drop_newest":
+                    return
+                self._queue.popleft().release()
+            self._last = now
+            self._queue.append(frame.retain())
+            self._condition.notify()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[SharedFrame]:
+        """
+        Returns the next frame, the caller has to release it.
+        Returns None if the timeout passed or the subscription was closed.
+        Raises the error of the capture loop if it failed.
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._queue or self._closed, timeout):
+                return None
+            if not self._queue:
+                if self.error is not None:
+                    raise self.error
+                return None
+            self.received += 1
+            return self._queue.popleft()
+
+    def __iter__(self) -> Iterator[SharedFrame]:
+        try:
+            while True:
+                self._release_current()
+                frame = self.get()
+                if frame is None:
+                    return
+                self._current = frame
+                yield frame
+        finally:
+            self._release_current()
+
+    def _release_current(self) -> None:
+        if self._current is not None:
+            self._current.release()
+            self._current = None
+
+    @property
+    def closed(self) -> bool:
+        """
+        Returns True if the subscription has been closed.
+        """
+        return self._closed
+
+    def close(self) -> None:
+        """
+        Unsubscribes, the queued frames are released.
+        """
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            while self._queue:
+                self._queue.popleft().release()
+            self._condition.notify_all()
+        self.hub.unsubscribe(self)
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        # pylint: disable-next=line-too-long
+        return f'Subscription(fps={self.fps}, depth={self.depth}, policy="{self.policy}", received={self.received}, dropped={self.dropped})'
+
+
+class CaptureLoop:
+    """
+    Captures a window for all subscriptions of the same key.
+    The frame rate is the highest rate of the subscriptions.
+    """
+
+    # pylint: disable-next=too-many-arguments
+    def __init__(
+        self,
+        window: "WindowBase",
+        geometry: Optional[Box],
+        image_format: str,
+        options: dict,
+        on_error
+    ) -> None:
+        self.window = window
+        self.image_format = image_format
+        self.options = options
+        self.subscriptions = []
+        self.pool = FramePool()
+        self.stream = CaptureStream(window, 1.0, geometry)
+        self.error = None
+        self._on_error = on_error
+        self.thread = Thread(target=self._run, name="dsi-hub", daemon=True)
+
+    def update_fps(self) -> None:
+        """
+        Sets the rate of the capture to the highest rate of the subscriptions.
+        """
+        if self.subscriptions:
+            self.stream.fps = max(subscription.fps for subscription in self.subscriptions)
+
+    def _share(self, image: Image) -> tuple:
+        """
+        Returns the image to share and its buffer of the pool.
+        A contiguous image in its own bytearray (e.g. of XGetImage) is shared as it is,
+        other images are views into memory that the capture reuses for the next frame
+        (shared memory, a composite pixmap or a crop of those), so they are copied
+        into a buffer of the pool.
+        """
+        if isinstance(image.data, bytearray) and image.contiguous:
+            return image, None
+
+        row_size = image.width * 4
+        buffer = self.pool.acquire(row_size * image.height)
+        source = memoryview(image.data).cast("B")
+        if image.contiguous:
+            buffer[:] = source[:len(buffer)]
+        else:
+            for row in range(image.height):
+                start = row * image.stride
+                buffer[row * row_size:(row + 1) * row_size] = source[start:start + row_size]
+        return Image(buffer, image.width, image.height), buffer
+
+    def _run(self) -> None:
+        try:
+            for captured in self.stream:
+                image, buffer = self._share(captured.image)
+                data = None
+                if self.image_format != "raw":
+                    data = encoding.encode(image, self.image_format, **self.options)
+                frame = SharedFrame(
+                    captured.index,
+                    captured.timestamp,
+                    image,
+                    data,
+                    self.pool if buffer is not None else None,
+                    buffer
+                )
+                for subscription in tuple(self.subscriptions):
+                    subscription._offer(frame)  # pylint: disable=protected-access
+                # the loop's own reference
+                frame.release()
+        # pylint: disable-next=broad-except
+        except Exception as error:
+            self.error = error
+            self._on_error(self)
+
+    def stop(self) -> None:
+        """
+        Stops the capture, the iteration ends after the current frame.
+        """
+        self.stream.stop()
+
+
+class FrameHub:
+    """
+    Shares the captures of windows between many subscribers.
+    There is one capture loop per (window, geometry, format), it runs while it has subscribers.
+    The format can be "raw" (only the Image) or an image format of encoding (e.g. "png"),
+    then every frame is encoded once and the bytes are shared too.
+    """
+
+    def __init__(self) -> None:
+        self.lock = Lock()
+        # key -> CaptureLoop
+        self.loops = {}
+
+    # pylint: disable-next=too-many-arguments
+    def subscribe(
+        self,
+        window: "WindowBase",
+        geometry: Optional[Box] = None,
+        format: str = "raw",  # pylint: disable=redefined-builtin
+        fps: float = 30.0,
+        depth: int = 2,
+        policy: str = "drop_oldest",
+        **options
+    ) -> Subscription:
+        """
+        Subscribes to the frames of a window (or a region of it) and returns the Subscription.
+        The options are passed to the encoder, e.g. quality for JPEG,
+        subscriptions to the same format share the options of the first one.
+        """
+        format = format.lower()
+        if format != "raw":
+            encoding.get_encoder(format)
+        key = (window_key(window), geometry, format)
+        subscription = Subscription(self, key, fps, depth, policy)
+
+        with self.lock:
+            loop = self.loops.get(key)
+            start = loop is None
+            if start:
+                loop = self.loops[key] = CaptureLoop(
+                    window,
+                    geometry,
+                    format,
+                    options,
+                    self._failed
+                )
+            loop.subscriptions.append(subscription)
+            loop.update_fps()
+        if start:
+            loop.thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """
+        Removes a subscription, the capture loop stops after its last subscription.
+        Use Subscription.close() to also release the queued frames.
+        """
+        if not subscription.closed:
+            subscription.close()
+            return
+        with self.lock:
+            loop = self.loops.get(subscription.key)
+            if loop is None or subscription not in loop.subscriptions:
+                return
+            loop.subscriptions.remove(subscription)
+            loop.update_fps()
+            if loop.subscriptions:
+                return
+            del self.loops[subscription.key]
+        loop.stop()
+
+    def _failed(self, loop: CaptureLoop) -> None:
+        """
+        Closes the subscriptions of a loop that failed, e.g. because the window was closed.
+        """
+        with self.lock:
+            subscriptions = tuple(loop.subscriptions)
+        for subscription in subscriptions:
+            subscription.error = loop.error
+            subscription.close()
+
+    def stats(self) -> list[dict]:
+        """
+        Returns the statistics of every capture loop.
+        """
+        with self.lock:
+            loops = list(self.loops.items())
+        return [
+            {
+                "key": key,
+                "fps": loop.stream.fps,
+                "captured": loop.stream.captured,
+                "dropped": loop.stream.dropped,
+                "buffers": loop.pool.allocated,
+                "subscriptions": len(loop.subscriptions),
+            }
+            for key, loop in loops
+        ]
+
+    def close(self) -> None:
+        """
+        Closes all subscriptions and stops all capture loops.
+        """
+        with self.lock:
+            subscriptions = [
+                subscription
+                for loop in self.loops.values()
+                for subscription in loop.subscriptions
+            ]
+        for subscription in subscriptions:
+            subscription.close()
+
+    def __enter__(self) -> "FrameHub":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f"FrameHub(loops={len(self.loops)})"
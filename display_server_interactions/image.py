@@ -5,19 +5,33 @@
 The Image module contains a class to hold the raw data of an image.
 """
 
-from typing import Tuple
+from typing import Optional, Tuple
+
+# local modules
+from . import encoding
+from .box import Box
 
 
 class Image:
     """
     A class to that holds the raw data of an image.
     Use np.array(Image) to get a numpy array of the image.
+    The stride is the number of bytes per row,
+    it is bigger than width * 4 if the image is a view into a bigger image.
     """
 
-    def __init__(self, data, width, height):
+    def __init__(self, data, width, height, stride=None):
         self.data = data
         self.width = width
         self.height = height
+        self.stride = width * 4 if stride is None else stride
+
+    @property
+    def contiguous(self) -> bool:
+        """
+        Returns True if the rows of the image are stored without gaps.
+        """
+        return self.stride == self.width * 4
 
     @property
     def __array_interface__(self) -> dict:
@@ -31,6 +45,7 @@ class Image:
             "shape": (self.height, self.width, 4),
             "typestr": "|u1",
             "data": self.data,
+            "strides": None if self.contiguous else (self.stride, 4, 1),
         }
 
     def __repr__(self) -> str:
@@ -43,6 +58,62 @@ class Image:
         located at the specified coordinates
         and returns them as a 4-tuple integer.
         """
-        pixel_start_index = (y * self.width + x) * 4
+        pixel_start_index = y * self.stride + x * 4
         pixel_data = self.data[pixel_start_index:pixel_start_index + 4]
         return tuple(pixel_data)
+
+    def crop(self, geometry: Box) -> "Image":
+        """
+        Returns a view of a region of the image.
+        The view shares the data with the image, nothing is copied.
+        """
+        if (
+            geometry.x < 0
+            or geometry.y < 0
+            or geometry.width <= 0
+            or geometry.height <= 0
+            or geometry.x + geometry.width > self.width
+            or geometry.y + geometry.height > self.height
+        ):
+            raise ValueError(f"{geometry} is outside of {self}.")
+
+        start = geometry.y * self.stride + geometry.x * 4
+        end = start + (geometry.height - 1) * self.stride + geometry.width * 4
+        return Image(
+            memoryview(self.data).cast("B")[start:end],
+            geometry.width,
+            geometry.height,
+            self.stride
+        )
+
+    def copy(self) -> "Image":
+        """
+        Returns a contiguous copy of the image.
+        """
+        data = memoryview(self.data).cast("B")
+        if self.contiguous:
+            return Image(bytearray(data[:self.width * self.height * 4]), self.width, self.height)
+
+        row_size = self.width * 4
+        copy = bytearray(row_size * self.height)
+        for row in range(self.height):
+            start = row * self.stride
+            copy[row * row_size:(row + 1) * row_size] = data[start:start + row_size]
+        return Image(copy, self.width, self.height)
+
+    # pylint: disable-next=redefined-builtin
+    def encode(self, format: str = "png", **options) -> bytes:
+        """
+        Encodes the image into "png", "qoi" or "jpeg" and returns the bytes.
+        The options are passed to the encoder, e.g. level for PNG or quality for JPEG.
+        JPEG needs Pillow or OpenCV.
+        """
+        return encoding.encode(self, format, **options)
+
+    # pylint: disable-next=redefined-builtin
+    def save(self, path: str, format: Optional[str] = None, **options) -> None:
+        """
+        Saves the image to a file.
+        If no format is given, it is taken from the file extension.
+        """
+        encoding.save(self, path, format, **options)
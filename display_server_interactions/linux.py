@@ -6,398 +6,66 @@ All X11 specific DSI functions
 """
 
 # built-in modules
-from typing import Optional
-from logging import getLogger, CRITICAL, Logger
-from ctypes.util import find_library
-from ctypes import cdll
+from typing import AsyncIterator, Callable, Optional, Sequence
+from time import perf_counter_ns
+from functools import partial
+from array import array
 from ctypes import (
     POINTER,
     byref,
     cast,
+    string_at,
     c_char_p,
     c_int,
     c_long,
     c_ubyte,
     c_ulong,
     c_char,
-    Structure,
-    c_int32,
     c_uint,
-    c_void_p,
-    c_uint32,
-    _SimpleCData,
-    Union,
-    CFUNCTYPE
+    sizeof,
+    _SimpleCData
 )
 
 # local modules
 from .base import DSIBase
-from .window import WindowBase
+from .window import WindowBase, FrameExtents
 from .image import Image
 from .buttons import MouseButtons
 from .box import Box
+from .monitor import Monitor
+from .stats import Instrumentation
+from .tracing import TracingMixin, traced_by
+from .windowlist import WindowList
+from .snapshot import Snapshot
+from .region import Region
+from .x11 import (
+    EventTypes,
+    KeyMasks,
+    MapStates,
+    Masks,
+    NetFrameExtents,
+    XEvent,
+    XRandR,
+    XWindowAttributes,
+    Xlib
+)
+from .x11capture import ShmCapture, get_image
+from .x11connections import Connections
+# get_logger was defined in this module, it stays importable from here
+from .x11 import get_logger  # pylint: disable=unused-import
 
-# Setup Xlib Structures
-
-# pylint: disable=too-few-public-methods
-
-PLAINMASK = 0x00FFFFFF
-ZPIXMAP = 2
-
-
-class Display(Structure):
-    """
-    https://tronche.com/gui/x/xlib/display/opening.html#Display\n
-    /usr/include/X11/Xlib.h: 487
-    """
-
-
-class XImage(Structure):
-    """
-    https://tronche.com/gui/x/xlib/graphics/images.html#XImage\n
-    /usr/include/X11/Xlib.h: 360-394
-    """
-
-    _fields_ = [
-        ('width', c_int),
-        ('height', c_int),
-        ('xoffset', c_int),
-        ('format', c_int),
-        ('data', c_void_p),
-        ('byte_order', c_int),
-        ('bitmap_unit', c_int),
-        ('bitmap_bit_order', c_int),
-        ('bitmap_pad', c_int),
-        ('depth', c_int),
-        ('bytes_per_line', c_int),
-        ('bits_per_pixel', c_int),
-        ('red_mask', c_ulong),
-        ('green_mask', c_ulong),
-        ('blue_mask', c_ulong)
-    ]
-
-
-class XWindowAttributes(Structure):
-    """
-    https://tronche.com/gui/x/xlib/window-information/XGetWindowAttributes.html\n
-    /usr/include/X11/Xlib.h: 308-334
-    """
-
-    _fields_ = [
-        ("x", c_int32),
-        ("y", c_int32),
-        ("width", c_int32),
-        ("height", c_int32),
-        ("border_width", c_int32),
-        ("depth", c_int32),
-        ("visual", c_ulong),
-        ("root", c_ulong),
-        ("class", c_int32),
-        ("bit_gravity", c_int32),
-        ("win_gravity", c_int32),
-        ("backing_store", c_int32),
-        ("backing_planes", c_ulong),
-        ("backing_pixel", c_ulong),
-        ("save_under", c_int32),
-        ("colourmap", c_ulong),
-        ("mapinstalled", c_uint32),
-        ("map_state", c_uint32),
-        ("all_event_masks", c_ulong),
-        ("your_event_mask", c_ulong),
-        ("do_not_propagate_mask", c_ulong),
-        ("override_redirect", c_int32),
-        ("screen", c_ulong)
-    ]
-
-
-class XKeyEvent(Structure):
-    """
-    https://tronche.com/gui/x/xlib/events/keyboard-pointer/keyboard-pointer.html#XKeyEvent\n
-    /usr/include/X11/Xlib.h: 557-571
-    """
-
-    _fields_ = [
-        ('type', c_int),
-        ('serial', c_ulong),
-        ('send_event', c_int),
-        ('display', POINTER(Display)),
-        ('window', c_ulong),  # Window / XID
-        ('root', c_ulong),  # Window / XID
-        ('subwindow', c_ulong),  # Window / XID
-        ('time', c_ulong),  # Time
-        ('x', c_int),
-        ('y', c_int),
-        ('x_root', c_int),
-        ('y_root', c_int),
-        ('state', c_uint),
-        ('keycode', c_uint),
-        ('same_screen', c_int),
-    ]
-
-
-class XButtonEvent(Structure):
-    """
-    https://tronche.com/gui/x/xlib/events/keyboard-pointer/keyboard-pointer.html#XButtonEvent\n
-    /usr/include/X11/Xlib.h: 575-589
-    """
-
-    _fields_ = [
-        ('type', c_int),
-        ('serial', c_ulong),
-        ('send_event', c_int),
-        ('display', POINTER(Display)),
-        ('window', c_ulong),  # Window (XID)
-        ('root', c_ulong),  # Window (XID)
-        ('subwindow', c_ulong),  # Window (XID)
-        ('time', c_ulong),  # Time
-        ('x', c_int),
-        ('y', c_int),
-        ('x_root', c_int),
-        ('y_root', c_int),
-        ('state', c_uint),
-        ('button', c_uint),
-        ('same_screen', c_int),
-    ]
-
-
-class XEvent(Union):
-    """
-    https://tronche.com/gui/x/xlib/events/structures.html#XEvent\n
-    /usr/include/X11/Xlib.h: 973-1009
-    """
-    _fields_ = [
-        ('type', c_int),
-        ('xkey', XKeyEvent),
-        ('xbutton', XButtonEvent),
-        ('pad', c_long*24),
-    ]
-
-
-class XErrorEvent(Structure):
-    """
-    https://tronche.com/gui/x/xlib/event-handling/protocol-errors/default-handlers.html#XErrorEvent\n
-    /usr/include/X11/Xlib.h: 924-932
-    """
-
-    def __repr__(self) -> str:
-        # pylint: disable-next=line-too-long
-        return f"XErrorEvent(type={self.type}, serial={self.serial}, error_code={self.error_code}, request_code={self.request_code}, minor_code={self.minor_code})"
-
-    _fields_ = [
-        ("type", c_int),
-        ("display", POINTER(Display)),
-        ("serial", c_ulong),
-        ("error_code", c_ubyte),
-        ("request_code", c_ubyte),
-        ("minor_code", c_ubyte),
-        ("resourceid", c_void_p),
-    ]
-
-
-logger = getLogger(__name__)
-logger.setLevel(CRITICAL)
-
-
-@CFUNCTYPE(c_int, POINTER(Display), POINTER(XErrorEvent))
-def error_handler(_, event):
-    """
-    A C function that handles X11 errors.
-    """
-    logger.error("%s", event.contents)
-    return 0
-
-
-def get_logger() -> Logger:
-    """
-    Returns a logger that is responsible for logging XErrorEvents.
-    The logger is set to CRITICAL. So it will not log anything.
-    To make it log something, set the log level at least to ERROR.
-    You can archive this with "logger.setLevel(logging.ERROR)".
-    """
-    return logger
-
-# Setup Xlib Variables
-
-
-class Masks:
-    """
-    https://tronche.com/gui/x/xlib/events/mask.html\n
-    /usr/include/X11/X.h: 150-175
-    """
-    NoEventMask = 0
-    KeyPressMask = 1
-    KeyReleaseMask = 2
-    ButtonPressMask = 4
-    ButtonReleaseMask = 8
-    EnterWindowMask = 16
-    LeaveWindowMask = 32
-    PointerMotionMask = 64
-    PointerMotionHintMask = 128
-    Button1MotionMask = 256
-    Button2MotionMask = 512
-    Button3MotionMask = 1024
-    Button4MotionMask = 2048
-    Button5MotionMask = 4096
-    ButtonMotionMask = 8192
-    KeymapStateMask = 16384
-    ExposureMask = 32768
-    VisibilityChangeMask = 65536
-    StructureNotifyMask = 131072
-    ResizeRedirectMask = 262144
-    SubstructureNotifyMask = 524288
-    SubstructureRedirectMask = 1048576
-    FocusChangeMask = 2097152
-    PropertyChangeMask = 4194304
-    ColormapChangeMask = 8388608
-    OwnerGrabButtonMask = 16777216
-
-
-class EventTypes:
-    """
-    https://tronche.com/gui/x/xlib/events/types.html\n
-    /usr/include/X11/X.h: 181-215
-    """
-    KeyPress = 2
-    KeyRelease = 3
-    ButtonPress = 4
-    ButtonRelease = 5
-    MotionNotify = 6
-    EnterNotify = 7
-    LeaveNotify = 8
-    FocusIn = 9
-    FocusOut = 10
-    KeymapNotify = 11
-    Expose = 12
-    GraphicsExpose = 13
-    NoExpose = 14
-    VisibilityNotify = 15
-    CreateNotify = 16
-    DestroyNotify = 17
-    UnmapNotify = 18
-    MapNotify = 19
-    MapRequest = 20
-    ReparentNotify = 21
-    ConfigureNotify = 22
-    ConfigureRequest = 23
-    GravityNotify = 24
-    ResizeRequest = 25
-    CirculateNotify = 26
-    CirculateRequest = 27
-    PropertyNotify = 28
-    SelectionClear = 29
-    SelectionRequest = 30
-    SelectionNotify = 31
-    ColormapNotify = 32
-    ClientMessage = 33
-    MappingNotify = 34
-    GenericEvent = 35
-    LASTEvent = 36
-
-
-class KeyMasks:
-    """
-    https://tronche.com/gui/x/xlib/events/keyboard-pointer/keyboard-pointer.html\n
-    /usr/include/X11/X.h: 221-228
-    """
-    ShiftMask = 1
-    LockMask = 2
-    ControlMask = 4
-    Mod1Mask = 8
-    Mod2Mask = 16
-    Mod3Mask = 32
-    Mod4Mask = 64
-    Mod5Mask = 128
-
-
-class Xlib:
-    """
-    A class that provides access to Xlib functions.
-    """
-
-    def __init__(self):
-        # load libX11.so.6
-        x11 = find_library("X11")
-        if not x11:
-            raise FileNotFoundError("X11 library not found!")
-        self.xlib = cdll.LoadLibrary(x11)
-
-        self.xlib.XSetErrorHandler(error_handler)
-
-        # Setup Xlib functions
-        self.xlib.XGetImage.argtypes = [
-            POINTER(Display),
-            c_ulong,  # Drawable (XID)
-            c_int,
-            c_int,
-            c_uint,
-            c_uint,
-            c_ulong,
-            c_int,
-        ]
-        self.xlib.XGetImage.restype = POINTER(XImage)
-
-        self.xlib.XGetWindowAttributes.argtypes = [
-            POINTER(Display),
-            c_ulong,  # Window (XID)
-            POINTER(XWindowAttributes)
-        ]
-        self.xlib.XOpenDisplay.restype = POINTER(Display)
-        self.xlib.XGetWindowProperty.argtypes = [
-            POINTER(Display),
-            c_ulong,  # Window
-            c_ulong,  # Atom
-            c_long,
-            c_long,
-            c_int,
-            c_ulong,  # Atom
-            POINTER(c_ulong),  # Atom
-            POINTER(c_int),
-            POINTER(c_ulong),
-            POINTER(c_ulong),
-            POINTER(POINTER(c_ubyte))
-        ]
-        self.xlib.XInternAtom.argtypes = [POINTER(Display), c_char_p, c_int]
-        self.xlib.XFree.argtypes = [c_void_p]
-        self.xlib.XDestroyImage.argtypes = [POINTER(XImage)]
-        self.xlib.XWarpPointer.argtypes = [
-            POINTER(Display),
-            c_ulong,
-            c_ulong,
-            c_int,
-            c_int,
-            c_uint,
-            c_uint,
-            c_int,
-            c_int
-        ]
-        self.xlib.XFlush.argtypes = [POINTER(Display)]
-        self.xlib.XKeysymToKeycode.argtypes = [POINTER(Display), c_ulong]
-        self.xlib.XStringToKeysym.argtypes = [c_char_p]
-        self.xlib.XSendEvent.argtypes = [
-            POINTER(Display), c_ulong, c_int, c_long, c_void_p]
-        self.xlib.XQueryTree.argtypes = [
-            POINTER(Display),
-            c_ulong,
-            POINTER(c_ulong),
-            POINTER(c_ulong),
-            POINTER(POINTER(c_ulong)),
-            POINTER(c_uint)
-        ]
-
-        # main
-        self.display = self.xlib.XOpenDisplay(None)
-        self.root_window = self.xlib.XRootWindow(self.display, 0)
-
-    def __getattribute__(self, __name: str):
-        if __name in ["xlib", "display", "root_window"]:
-            return super().__getattribute__(__name)
-        return self.xlib.__getattribute__(__name)
 
+# runs methods of classes with an xlib attribute as operations of the Tracer
+traced = traced_by("xlib")
 
 def get_window_property(xlib: Xlib, window_xid: int, property_name: str, return_type: _SimpleCData):
     """
     https://tronche.com/gui/x/xlib/window-information/XGetWindowProperty.html
     """
+    stats = xlib.stats
+    if stats is not None:
+        start = perf_counter_ns()
+
     actual_type_return = c_ulong()
     actual_format_return = c_int()
     nitems_return = c_ulong()
@@ -433,6 +101,11 @@ def get_window_property(xlib: Xlib, window_xid: int, property_name: str, return_
     # don't forget to free the memory or you will be fucked
     xlib.XFree(prop_return)
 
+    if stats is not None:
+        stats.record("property", perf_counter_ns() - start)
+        # XInternAtom and XGetWindowProperty
+        stats.count("round_trips", 2)
+
     return data
 
 
@@ -441,11 +114,25 @@ class Window(WindowBase):
     An class for interacting with a window on X11.
     """
 
+    __slots__ = ("xid", "_xlib")
+
     def __init__(self, xid: int, xlib: Xlib) -> None:
         self.xid = xid
-        self.xlib = xlib
+        self._xlib = xlib
 
     @property
+    def xlib(self) -> Xlib:
+        """
+        Returns the X connection of the current thread,
+        so the window can be used from any thread.
+        """
+        connections = self._xlib.connections
+        if connections is None:
+            return self._xlib
+        return connections.xlib
+
+    @property
+    @traced
     def name(self) -> str:
         name = get_window_property(
             self.xlib,
@@ -458,17 +145,30 @@ class Window(WindowBase):
         return None
 
     @property
+    @traced
     def pid(self) -> int:
         return get_window_property(self.xlib, self.xid, "_NET_WM_PID", c_long)
 
     @property
+    @traced
     def active(self) -> bool:
         return self.xid == get_active_window_xid(self.xlib)
 
     @property
+    @traced
     def geometry(self) -> Box:
+        xlib = self.xlib
+        stats = xlib.stats
+        if stats is not None:
+            start = perf_counter_ns()
+
         gwa = XWindowAttributes()
-        self.xlib.XGetWindowAttributes(self.xlib.display, self.xid, byref(gwa))
+        xlib.XGetWindowAttributes(xlib.display, self.xid, byref(gwa))
+
+        if stats is not None:
+            stats.record("geometry", perf_counter_ns() - start)
+            stats.count("round_trips")
+
         return Box(
             x=gwa.x,
             y=gwa.y,
@@ -476,35 +176,101 @@ class Window(WindowBase):
             height=gwa.height
         )
 
-    def get_image(self, geometry: Optional[Box] = None) -> Image:
-        if geometry is None:
-            geometry = self.geometry
+    @property
+    @traced
+    def absolute_geometry(self) -> Box:
+        """
+        Returns the geometry of the window in screen coordinates,
+        geometry is relative to the parent, which is the frame under reparenting window managers.
+        With DSI.enable_geometry_cache() the value is cached until a window is moved or resized,
+        otherwise it is queried on every access.
+        """
+        connections = self._xlib.connections
+        if connections is None or connections.geometry_cache is None:
+            return get_absolute_geometry(self.xlib, self.xid)
+        return connections.geometry_cache.get(
+            (self.xid, "absolute_geometry"),
+            lambda: get_absolute_geometry(connections.xlib, self.xid)
+        )
 
-        ximage = self.xlib.XGetImage(
-            self.xlib.display,  # Display
-            self.xid,  # Drawable (Window XID)
-            geometry.x - self.geometry.x,  # x
-            geometry.y - self.geometry.y,  # y
-            geometry.width,  # width
-            geometry.height,  # height
-            PLAINMASK,  # plane_mask
-            ZPIXMAP  # format
+    @property
+    @traced
+    def frame_extents(self) -> Optional[FrameExtents]:
+        """
+        Returns the extents of the window manager's frame (_NET_FRAME_EXTENTS).
+        Returns None if the window has no frame.
+        With DSI.enable_geometry_cache() the value is cached until a window is moved or resized,
+        otherwise it is queried on every access.
+        """
+        connections = self._xlib.connections
+        if connections is None or connections.geometry_cache is None:
+            return get_frame_extents(self.xlib, self.xid)
+        return connections.geometry_cache.get(
+            (self.xid, "frame_extents"),
+            lambda: get_frame_extents(connections.xlib, self.xid)
         )
 
-        raw_data = cast(
-            ximage.contents.data,
-            POINTER(c_ubyte * geometry.height * geometry.width * 4)
+    @property
+    @traced
+    def visible_region(self) -> Region:
+        """
+        Returns the part of the window (in screen coordinates) that is on the screen
+        and not covered by other top-level windows, empty if the window is unmapped.
+        The stacking order is the order of XQueryTree, see xcb.get_layout().
+        Without libX11-xcb, other windows are not taken into account.
+        With DSI.enable_geometry_cache() the value is cached until a window is moved, restacked,
+        mapped or unmapped, otherwise it is queried on every access.
+        """
+        connections = self._xlib.connections
+        if connections is None:
+            return get_visible_region(self.xlib, None, self.xid)
+        if connections.geometry_cache is None:
+            return get_visible_region(connections.xlib, connections.xcb, self.xid)
+        return connections.geometry_cache.get(
+            (self.xid, "visible_region"),
+            lambda: get_visible_region(connections.xlib, connections.xcb, self.xid)
         )
 
-        data = bytearray(raw_data.contents)
+    @property
+    @traced
+    def mapped(self) -> bool:
+        xlib = self.xlib
+        gwa = XWindowAttributes()
+        xlib.XGetWindowAttributes(xlib.display, self.xid, byref(gwa))
+        if xlib.stats is not None:
+            xlib.stats.count("round_trips")
+        return gwa.map_state == MapStates.IsViewable
 
-        data = Image(data, geometry.width, geometry.height)
+    @traced
+    def get_image(self, geometry: Optional[Box] = None) -> Image:
+        stats = self.xlib.stats
+        if stats is not None:
+            with stats.time("get_image"):
+                return self._get_image(geometry)
+        return self._get_image(geometry)
+
+    def _get_image(self, geometry: Optional[Box] = None) -> Image:
+        connections = self._xlib.connections
+        composite = connections.composite if connections is not None else None
+        if composite is not None:
+            return composite.capture(self.xid, geometry)
 
-        # don't forget to free the memory or you will be fucked
-        self.xlib.XDestroyImage(ximage)
+        if geometry is None:
+            geometry = self.geometry
 
-        return data
+        window_geometry = self.geometry
+        return get_image(
+            self.xlib,
+            self.xid,
+            Box(
+                geometry.x - window_geometry.x,
+                geometry.y - window_geometry.y,
+                geometry.width,
+                geometry.height
+            )
+        )
 
+    @traced
     def send_chr(self, character: chr) -> None:
         """Send a character to the window
 
@@ -513,16 +279,17 @@ class Window(WindowBase):
         """
         # https://tronche.com/gui/x/xlib/event-handling/XSendEvent.html
 
+        xlib = self.xlib
         key = XEvent(type=EventTypes.KeyPress).xkey  # KeyPress
-        key.keycode = self.xlib.XKeysymToKeycode(
-            self.xlib.display,
-            self.xlib.XStringToKeysym(c_char_p(character.encode('utf-8')))
+        key.keycode = xlib.XKeysymToKeycode(
+            xlib.display,
+            xlib.XStringToKeysym(c_char_p(character.encode('utf-8')))
         )  # https://github.com/python-xlib/python-xlib/blob/master/Xlib/keysymdef/latin1.py
         key.window = key.root = self.xid
         key.state = KeyMasks.ShiftMask if character.isupper() else 0
 
-        self.xlib.XSendEvent(
-            self.xlib.display,  # Display *display
+        xlib.XSendEvent(
+            xlib.display,  # Display *display
             key.window,  # Window w
             True,  # Bool propagate
             Masks.KeyPressMask,  # long event_mask
@@ -530,8 +297,9 @@ class Window(WindowBase):
         )
 
         # flush display or events will run delayed cus thai'r only called on the next update
-        self.xlib.XFlush(self.xlib.display)
+        xlib.XFlush(xlib.display)
 
+    @traced
     def send_str(self, string: str) -> None:
         """Send a string to the window
 
@@ -541,13 +309,15 @@ class Window(WindowBase):
         for character in string:
             self.send_chr(character)
 
+    @traced
     def warp_pointer(self, x: int, y: int, geometry: Optional[Box] = None) -> None:
         if geometry is None:
             geometry = self.geometry
 
         # https://tronche.com/gui/x/xlib/input/XWarpPointer.html
-        self.xlib.XWarpPointer(
-            self.xlib.display,
+        xlib = self.xlib
+        xlib.XWarpPointer(
+            xlib.display,
             self.xid,  # src_w
             self.xid,  # dest_w
             geometry.x,
@@ -559,8 +329,9 @@ class Window(WindowBase):
         )
 
         # flush display or events will run delayed cus thai'r only called on the next update
-        self.xlib.XFlush(self.xlib.display)
+        xlib.XFlush(xlib.display)
 
+    @traced
     def send_mouse_click(self, x: int, y: int, button: MouseButtons = MouseButtons.LEFT) -> None:
         # pylint: disable=line-too-long
         """
@@ -568,6 +339,7 @@ class Window(WindowBase):
         Some applications may not respond to the click so it is recommended to also move the pointer with `warp_pointer`.
         """
         # pylint: enable=line-too-long
+        xlib = self.xlib
         event = XEvent(type=EventTypes.ButtonPress).xbutton
         event.window = event.root = self.xid
         event.button = button
@@ -576,8 +348,8 @@ class Window(WindowBase):
         event.x = x
         event.y = y
 
-        self.xlib.XSendEvent(
-            self.xlib.display,
+        xlib.XSendEvent(
+            xlib.display,
             event.window,
             True,
             Masks.ButtonPressMask,
@@ -585,12 +357,12 @@ class Window(WindowBase):
         )
 
         # flush display or events will run delayed cus thai'r only called on the next update
-        self.xlib.XFlush(self.xlib.display)
+        xlib.XFlush(xlib.display)
 
         event.type = EventTypes.ButtonRelease
 
-        self.xlib.XSendEvent(
-            self.xlib.display,
+        xlib.XSendEvent(
+            xlib.display,
             event.window,
             True,
             Masks.ButtonReleaseMask,
@@ -598,7 +370,64 @@ class Window(WindowBase):
         )
 
         # flush display or events will run delayed cus thai'r only called on the next update
-        self.xlib.XFlush(self.xlib.display)
+        xlib.XFlush(xlib.display)
+
+
+def get_absolute_geometry(xlib: Xlib, xid: int) -> Box:
+    """
+    https://tronche.com/gui/x/xlib/window-information/XTranslateCoordinates.html\n
+    Returns the geometry of a window (inside of its border) in screen coordinates.
+    """
+    stats = xlib.stats
+    if stats is not None:
+        start = perf_counter_ns()
+
+    gwa = XWindowAttributes()
+    xlib.XGetWindowAttributes(xlib.display, xid, byref(gwa))
+
+    x = c_int()
+    y = c_int()
+    child = c_ulong()
+    xlib.XTranslateCoordinates(
+        xlib.display,
+        xid,  # src_w
+        xlib.root_window,  # dest_w
+        0,  # src_x
+        0,  # src_y
+        byref(x),
+        byref(y),
+        byref(child)
+    )
+
+    if stats is not None:
+        stats.record("geometry", perf_counter_ns() - start)
+        stats.count("round_trips", 2)
+
+    return Box(x.value, y.value, gwa.width, gwa.height)
+
+
+def get_visible_region(xlib: Xlib, xcb, xid: int) -> Region:
+    """
+    Returns the visible Region of a window.
+    If xcb (the Xcb of the display) is None, other windows are not taken into account.
+    """
+    if xcb is not None:
+        # pylint: disable-next=import-outside-toplevel
+        from .xcb import get_layout
+        return get_layout(xcb, [xid])[1][0]
+
+    gwa = XWindowAttributes()
+    xlib.XGetWindowAttributes(xlib.display, xid, byref(gwa))
+    if gwa.map_state != MapStates.IsViewable:
+        return Region()
+    return Region([get_screen_geometry(xlib)]).intersect(get_absolute_geometry(xlib, xid))
+
+
+def get_frame_extents(xlib: Xlib, xid: int) -> Optional[FrameExtents]:
+    """
+    Returns the _NET_FRAME_EXTENTS of a window, None if the window has no frame.
+    """
+    return get_window_property(xlib, xid, "_NET_FRAME_EXTENTS", NetFrameExtents)
 
 
 def get_active_window_xid(xlib: Xlib) -> int:
@@ -613,7 +442,7 @@ def get_active_window_xid(xlib: Xlib) -> int:
     )
 
 
-def get_connected_xids(xlib: Xlib, window: int):
+def get_connected_xids(xlib: Xlib, window: int) -> array:
     """
     https://tronche.com/gui/x/xlib/window-information/XQueryTree.html\n
     Uses XQueryTree to get the XIDs of connected windows.
@@ -632,10 +461,13 @@ def get_connected_xids(xlib: Xlib, window: int):
         byref(nitems_return)  # unsigned int *nitems_return
     )
 
-    xids = []
+    if xlib.stats is not None:
+        xlib.stats.count("round_trips")
 
-    for xid in range(nitems_return.value):
-        xids.append(children_return[xid])
+    # copy the XIDs in one shot, array "L" has the size of c_ulong
+    xids = array("L")
+    if children_return:
+        xids.frombytes(string_at(children_return, nitems_return.value * sizeof(c_ulong)))
 
     # don't forget to free the memory or you will be fucked
     xlib.XFree(children_return)
@@ -643,44 +475,256 @@ def get_connected_xids(xlib: Xlib, window: int):
     return xids
 
 
-def get_all_windows(xlib: Xlib) -> list:
+def get_all_windows(xlib: Xlib) -> WindowList:
     """
-    Get all window XIDs. By recursively getting all connected windows.
+    Get all windows. By recursively getting all connected windows.
+    The Window objects are created when they are accessed.
     """
     final = get_connected_xids(xlib, xlib.root_window)
-    next_window = final.copy()
+    next_window = final
 
-    run = True
-    while run:
-        run = False
-        next_temp = []
+    while next_window:
+        next_temp = array("L")
         for xid in next_window:
-            xids = get_connected_xids(xlib, xid)
-            if len(xids) > 0:
-                run = True
-            next_temp += xids
+            next_temp += get_connected_xids(xlib, xid)
 
         next_window = next_temp
         final += next_window
 
-    final_windows = []
+    return WindowList(final, partial(Window, xlib=xlib))
 
-    for xid in final:
-        final_windows.append(Window(xid, xlib))
 
-    return final_windows
+def get_screen_geometry(xlib: Xlib) -> Box:
+    """
+    Returns the geometry of the root window.
+    """
+    gwa = XWindowAttributes()
+    xlib.XGetWindowAttributes(xlib.display, xlib.root_window, byref(gwa))
+    return Box(x=0, y=0, width=gwa.width, height=gwa.height)
+
+
+def get_monitors(xlib: Xlib, xrandr: Optional[XRandR]) -> list:
+    """
+    https://www.x.org/releases/current/doc/randrproto/randrproto.txt\n
+    Uses XRRGetMonitors to get the active monitors.
+    Without RandR the whole screen is returned as the only monitor.
+    """
+    count = c_int()
+    infos = None
+    if xrandr is not None:
+        infos = xrandr.XRRGetMonitors(
+            xlib.display,
+            xlib.root_window,
+            True,
+            byref(count)
+        )
+
+    if not infos:
+        return [Monitor("screen", True, get_screen_geometry(xlib))]
+
+    monitors = []
+    for index in range(count.value):
+        info = infos[index]
+
+        name = xlib.XGetAtomName(xlib.display, info.name)
+        if name:
+            monitor_name = string_at(name).decode("utf-8")
+            xlib.XFree(name)
+        else:
+            monitor_name = str(index)
 
+        monitors.append(Monitor(
+            monitor_name,
+            bool(info.primary),
+            Box(x=info.x, y=info.y, width=info.width, height=info.height)
+        ))
 
-class DSI(DSIBase):
+    # don't forget to free the memory or you will be fucked
+    xrandr.XRRFreeMonitors(infos)
+
+    return monitors
+
+
+class DSI(TracingMixin, DSIBase):
     """
     Main DSI class
+    Every thread that uses the DSI or its windows gets its own X connection.
     """
 
+    traced_attribute = "xlib"
+
     def __init__(self):
-        self.xlib = Xlib()
+        self.connections = Connections()
+        try:
+            self.xrandr = XRandR()
+        except FileNotFoundError:
+            self.xrandr = None
 
+    @property
+    def xlib(self) -> Xlib:
+        """
+        Returns the X connection of the current thread.
+        """
+        return self.connections.xlib
+
+    @property
+    def shm(self) -> ShmCapture:
+        """
+        Returns the ShmCapture of the current thread.
+        """
+        return self.connections.shm
+
+    @traced
     def get_active_window(self) -> WindowBase:
         return Window(get_active_window_xid(self.xlib), self.xlib)
 
-    def get_all_windows(self) -> list:
+    @traced
+    def get_all_windows(self) -> WindowList:
         return get_all_windows(self.xlib)
+
+    @traced
+    def snapshot(self) -> Snapshot:
+        """
+        Returns a Snapshot of all windows.
+        The properties are requested through the XCB connection of the display, all at once.
+        Without libX11-xcb the properties are read window by window.
+        """
+        xcb = self.connections.xcb
+        if xcb is None:
+            return super().snapshot()
+
+        # pylint: disable-next=import-outside-toplevel
+        from .xcb import get_snapshot
+
+        return get_snapshot(xcb, get_all_windows(self.xlib).ids)
+
+    @traced
+    def capture_windows(self, windows: Sequence[WindowBase]) -> list:
+        """
+        Returns an Image of every window, None for destroyed windows.
+        The visible windows are cut out of a single capture of the screen,
+        only partially covered windows are captured one by one.
+        Invisible windows are skipped (None), unless composite capture is enabled.
+        Without libX11-xcb every window is captured one by one.
+        """
+        xcb = self.connections.xcb
+        if xcb is None:
+            return super().capture_windows(windows)
+
+        # pylint: disable-next=import-outside-toplevel
+        from .xcb import get_layout
+
+        geometries, regions = get_layout(xcb, [window.xid for window in windows])
+        return self._capture_windows(
+            windows,
+            geometries,
+            regions,
+            capture_hidden=self.connections.composite is not None
+        )
+
+    def _dispatcher(self):
+        return self.connections.dispatcher
+
+    def on(self, event_type: str, callback: Optional[Callable] = None) -> Callable:
+        """
+        Subscribes a callback to window events of a type
+        (e.g. "focus", "configure" or "unmap", see events.EVENT_TYPES).
+        The callback is called with a WindowEvent on the dispatcher thread,
+        which listens to X events on its own connection.
+        Without a callback it returns a decorator.
+        """
+        return self._dispatcher().on(event_type, callback)
+
+    def off(self, event_type: str, callback: Callable) -> None:
+        """
+        Unsubscribes a callback.
+        """
+        self._dispatcher().off(event_type, callback)
+
+    def events(self, *event_types: str) -> AsyncIterator:
+        """
+        Returns an async iterator over the WindowEvents of the given types (all types by default).
+        """
+        return self._dispatcher().events(*event_types)
+
+    @traced
+    def get_monitors(self) -> list:
+        return get_monitors(self.xlib, self.xrandr)
+
+    def get_screen_geometry(self) -> Box:
+        return get_screen_geometry(self.xlib)
+
+    @traced
+    def capture_screen(self, geometry: Box) -> Image:
+        """
+        Returns an Image of a region of the screen.
+        If the MIT-SHM extension is available, the Image is backed by shared memory
+        that is reused by the next capture with the same size, nothing is copied.
+        Use Image.copy() to keep the Image.
+        """
+        return self.shm.capture(self.xlib.root_window, geometry)
+
+    # pylint: disable-next=redefined-builtin
+    def enable_stats(
+        self,
+        callback: Optional[Callable[[str], None]] = None,
+        format: str = "prometheus",
+        interval: float = 10.0
+    ) -> Instrumentation:
+        self.connections.stats = super().enable_stats(callback, format, interval)
+        return self.connections.stats
+
+    def disable_stats(self) -> None:
+        super().disable_stats()
+        self.connections.stats = None
+
+    def enable_composite(self) -> bool:
+        """
+        Captures windows from their XComposite pixmaps,
+        so covered and off-screen windows are captured correctly without raising them.
+        Returns False if the Composite extension is not available.
+        """
+        self.connections.composite_enabled = True
+        if self.connections.composite is None:
+            self.connections.composite_enabled = False
+            return False
+        return True
+
+    def disable_composite(self) -> None:
+        """
+        Captures windows from the screen again and frees their pixmaps.
+        """
+        self.connections.composite_enabled = False
+        self.connections.release_composite()
+
+    def enable_geometry_cache(self) -> None:
+        """
+        Caches the absolute geometries, frame extents and visible regions of windows,
+        until an event of the window manager invalidates them.
+        This starts the event dispatcher thread, which has its own X connection.
+        """
+        self.connections.enable_geometry_cache()
+
+    def disable_geometry_cache(self) -> None:
+        """
+        Queries the geometries on every access again.
+        """
+        self.connections.disable_geometry_cache()
+
+    def _libraries(self) -> list:
+        """
+        Returns the loaded libraries, that are shared by all threads.
+        The connections set the tracer of their own libraries.
+        """
+        return [
+            library
+            for library in (self.connections, self.xrandr)
+            if library is not None
+        ]
+
+    def close(self) -> None:
+        """
+        Stops the event dispatcher,
+        releases the shared memory and closes the X connections of all threads.
+        """
+        self.connections.close()
@@ -0,0 +1,22 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+This module provides a Monitor class that describes a monitor (output) of the screen.
+"""
+
+# built-in modules
+from typing import NamedTuple
+
+# local modules
+from .box import Box
+
+
+class Monitor(NamedTuple):
+    """
+    A monitor of the screen.
+    The geometry is in screen coordinates.
+    """
+    name: str
+    primary: bool
+    geometry: Box
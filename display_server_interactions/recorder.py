@@ -0,0 +1,365 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+This module records a window into a video file.
+Capturing, converting and encoding run as pipelined stages in their own threads,
+connected by bounded queues, so a slow encoder does not stall the capture.
+"""
+
+# built-in modules
+from fractions import Fraction
+from queue import Full, Queue
+from shutil import which
+from subprocess import DEVNULL, PIPE, Popen
+from threading import Thread
+from time import perf_counter, time
+from typing import Optional, TYPE_CHECKING
+
+# local modules
+from .image import Image
+from .box import Box
+from .stream import CaptureStream
+
+if TYPE_CHECKING:
+    from .window import WindowBase
+
+
+class StageStats:
+    """
+    Latency statistics of a single pipeline stage.
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float) -> None:
+        """
+        Adds the latency of one frame.
+        """
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    @property
+    def mean(self) -> float:
+        """
+        Returns the mean latency in seconds.
+        """
+        if self.count == 0:
+            return 0.0
+        return self.total / self.count
+
+    def __repr__(self) -> str:
+        return f"StageStats(count={self.count}, mean={self.mean:.6f}, max={self.max:.6f})"
+
+
+class RecordingStats:
+    """
+    Statistics of a recording.
+    "total" is the latency from the start of the capture until the frame was encoded.
+    Frames are dropped when the capture falls behind the frame rate
+    or when the conversion stage can't keep up.
+    """
+
+    def __init__(self) -> None:
+        self.capture = StageStats()
+        self.convert = StageStats()
+        self.encode = StageStats()
+        self.total = StageStats()
+        self.dropped = 0
+
+    @property
+    def frames(self) -> int:
+        """
+        Returns the number of encoded frames.
+        """
+        return self.encode.count
+
+    def __repr__(self) -> str:
+        # pylint: disable-next=line-too-long
+        return f"RecordingStats(frames={self.frames}, dropped={self.dropped}, capture={self.capture}, convert={self.convert}, encode={self.encode}, total={self.total})"
+
+
+class FFmpegEncoder:
+    """
+    Encodes frames by writing them to the stdin of a local ffmpeg process.
+    The color conversion is done by ffmpeg, so frames are passed on as they are.
+    """
+
+    # pylint: disable-next=too-many-arguments
+    def __init__(self, path: str, width: int, height: int, fps: float, codec: str) -> None:
+        ffmpeg = which("ffmpeg")
+        if not ffmpeg:
+            raise FileNotFoundError("ffmpeg not found!")
+
+        self.process = Popen(
+            [
+                ffmpeg,
+                "-y",
+                "-loglevel", "error",
+                "-f", "rawvideo",
+                "-pix_fmt", "bgra",
+                "-s", f"{width}x{height}",
+                "-r", str(fps),
+                "-i", "-",
+                "-c:v", codec,
+                "-pix_fmt", "yuv420p",
+                path
+            ],
+            stdin=PIPE,
+            stdout=DEVNULL
+        )
+
+    def convert(self, image: Image) -> memoryview:
+        """
+        Returns a view of the raw image data.
+        Only views into bigger images are copied, because ffmpeg needs contiguous rows.
+        """
+        if not image.contiguous:
+            image = image.copy()
+        return memoryview(image.data)
+
+    def encode(self, data: memoryview) -> None:
+        """
+        Writes a frame to ffmpeg.
+        """
+        self.process.stdin.write(data)
+
+    def close(self) -> None:
+        """
+        Closes stdin and waits for ffmpeg to finish.
+        """
+        self.process.stdin.close()
+        if self.process.wait() != 0:
+            raise RuntimeError(
+                f"ffmpeg exited with code {self.process.returncode}."
+            )
+
+
+class PyAVEncoder:
+    """
+    Encodes frames with PyAV.
+    The conversion to yuv420p runs in the conversion stage.
+    """
+
+    # pylint: disable-next=too-many-arguments
+    def __init__(self, path: str, width: int, height: int, fps: float, codec: str) -> None:
+        try:
+            # pylint: disable=import-outside-toplevel
+            import av
+            import numpy
+            # pylint: enable=import-outside-toplevel
+        except ImportError as error:
+            raise ImportError(
+                "PyAV and numpy are required for the 'pyav' backend."
+            ) from error
+
+        self.av = av
+        self.numpy = numpy
+        self.container = av.open(path, "w")
+        self.stream = self.container.add_stream(
+            codec,
+            rate=Fraction(fps).limit_denominator(1001)
+        )
+        self.stream.width = width
+        self.stream.height = height
+        self.stream.pix_fmt = "yuv420p"
+
+    def convert(self, image: Image):
+        """
+        Converts the image to a yuv420p VideoFrame.
+        """
+        frame = self.av.VideoFrame.from_ndarray(
+            self.numpy.ascontiguousarray(image),
+            format="bgra"
+        )
+        return frame.reformat(format="yuv420p")
+
+    def encode(self, frame) -> None:
+        """
+        Encodes a VideoFrame and writes the packets to the container.
+        """
+        for packet in self.stream.encode(frame):
+            self.container.mux(packet)
+
+    def close(self) -> None:
+        """
+        Flushes the encoder and closes the container.
+        """
+        for packet in self.stream.encode(None):
+            self.container.mux(packet)
+        self.container.close()
+
+
+encoders = {
+    "ffmpeg": FFmpegEncoder,
+    "pyav": PyAVEncoder,
+}
+
+
+class Recorder:
+    """
+    Records a window into a video file.
+    Use it as a context manager or call start() and stop().
+    """
+
+    # pylint: disable-next=too-many-arguments, too-many-instance-attributes
+    def __init__(
+        self,
+        window: "WindowBase",
+        path: str,
+        fps: float = 30.0,
+        codec: str = "libx264",
+        geometry: Optional[Box] = None,
+        backend: str = "ffmpeg",
+        queue_size: int = 8,
+        duration: Optional[float] = None
+    ) -> None:
+        if backend not in encoders:
+            raise ValueError(f"Invalid backend '{backend}'.")
+        self.window = window
+        self.path = path
+        self.fps = fps
+        self.codec = codec
+        self.geometry = geometry
+        self.backend = backend
+        self.duration = duration
+        self.stats = RecordingStats()
+
+        self._convert_queue = Queue(maxsize=queue_size)
+        self._encode_queue = Queue(maxsize=queue_size)
+        self._stream = None
+        self._encoder = None
+        self._threads = []
+        self._error = None
+
+    def start(self) -> "Recorder":
+        """
+        Starts the recording.
+        """
+        geometry = self.geometry
+        if geometry is None:
+            geometry = self.window.geometry
+
+        self._encoder = encoders[self.backend](
+            self.path,
+            geometry.width,
+            geometry.height,
+            self.fps,
+            self.codec
+        )
+        self._stream = CaptureStream(self.window, self.fps, geometry)
+
+        self._threads = [
+            Thread(target=self._capture, name="dsi-record-capture", daemon=True),
+            Thread(target=self._convert, name="dsi-record-convert", daemon=True),
+            Thread(target=self._encode, name="dsi-record-encode", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def _fail(self, error: Exception) -> None:
+        if self._error is None:
+            self._error = error
+        self._stream.stop()
+
+    def _capture(self) -> None:
+        end = None
+        if self.duration is not None:
+            end = perf_counter() + self.duration
+
+        try:
+            for frame in self._stream:
+                self.stats.capture.add(time() - frame.timestamp)
+                try:
+                    self._convert_queue.put_nowait(frame)
+                except Full:
+                    self.stats.dropped += 1
+                if end is not None and perf_counter() >= end:
+                    break
+        # pylint: disable-next=broad-except
+        except Exception as error:
+            self._fail(error)
+        finally:
+            self.stats.dropped += self._stream.dropped
+            self._convert_queue.put(None)
+
+    def _convert(self) -> None:
+        while True:
+            frame = self._convert_queue.get()
+            if frame is None:
+                break
+            if self._error is not None:
+                continue
+            try:
+                start = perf_counter()
+                data = self._encoder.convert(frame.image)
+                self.stats.convert.add(perf_counter() - start)
+                self._encode_queue.put((frame, data))
+            # pylint: disable-next=broad-except
+            except Exception as error:
+                self._fail(error)
+        self._encode_queue.put(None)
+
+    def _encode(self) -> None:
+        while True:
+            item = self._encode_queue.get()
+            if item is None:
+                break
+            if self._error is not None:
+                continue
+            frame, data = item
+            try:
+                start = perf_counter()
+                self._encoder.encode(data)
+                self.stats.encode.add(perf_counter() - start)
+                self.stats.total.add(time() - frame.timestamp)
+            # pylint: disable-next=broad-except
+            except Exception as error:
+                self._fail(error)
+
+    def wait(self) -> RecordingStats:
+        """
+        Waits until the recording has finished and returns the statistics.
+        Only returns on its own if a duration was given.
+        """
+        for thread in self._threads:
+            thread.join()
+
+        encoder, self._encoder = self._encoder, None
+        if encoder is not None:
+            try:
+                encoder.close()
+            # pylint: disable-next=broad-except
+            except Exception as error:
+                if self._error is None:
+                    self._error = error
+
+        if self._error is not None:
+            raise self._error
+        return self.stats
+
+    def stop(self) -> RecordingStats:
+        """
+        Stops the recording, waits for the queued frames to be encoded
+        and returns the statistics.
+        """
+        if self._stream is not None:
+            self._stream.stop()
+        return self.wait()
+
+    def __enter__(self) -> "Recorder":
+        if self._stream is None:
+            self.start()
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.stop()
+
+    def __repr__(self) -> str:
+        return f'Recorder(path="{self.path}", fps={self.fps}, codec="{self.codec}")'
@@ -0,0 +1,115 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+This module provides a Region class that represents an area made of rectangles,
+e.g. the part of a window that is not covered by other windows.
+"""
+
+# built-in modules
+from typing import Iterable, Iterator, Optional
+
+# local modules
+from .box import Box
+
+
+def intersection(first: Box, second: Box) -> Optional[Box]:
+    """
+    Returns the intersection of two boxes, None if they don't overlap.
+    """
+    left = max(first.x, second.x)
+    top = max(first.y, second.y)
+    right = min(first.x + first.width, second.x + second.width)
+    bottom = min(first.y + first.height, second.y + second.height)
+    if right <= left or bottom <= top:
+        return None
+    return Box(left, top, right - left, bottom - top)
+
+
+class Region:
+    """
+    An area made of boxes that don't overlap.
+    """
+
+    __slots__ = ("boxes",)
+
+    def __init__(self, boxes: Iterable[Box] = ()) -> None:
+        # only boxes that don't overlap, use union() to add overlapping boxes
+        self.boxes = [box for box in boxes if box.width > 0 and box.height > 0]
+
+    def intersect(self, box: Box) -> "Region":
+        """
+        Returns the part of the region that is inside of the box.
+        """
+        return Region(
+            overlap
+            for overlap in (intersection(own, box) for own in self.boxes)
+            if overlap is not None
+        )
+
+    def subtract(self, box: Box) -> "Region":
+        """
+        Returns the part of the region that is outside of the box.
+        """
+        boxes = []
+        for own in self.boxes:
+            overlap = intersection(own, box)
+            if overlap is None:
+                boxes.append(own)
+                continue
+            # the parts above and below the overlap span the whole width,
+            # the parts left and right of it only the height of the overlap
+            own_bottom = own.y + own.height
+            overlap_right = overlap.x + overlap.width
+            overlap_bottom = overlap.y + overlap.height
+            boxes += [
+                Box(own.x, own.y, own.width, overlap.y - own.y),
+                Box(own.x, overlap_bottom, own.width, own_bottom - overlap_bottom),
+                Box(own.x, overlap.y, overlap.x - own.x, overlap.height),
+                Box(overlap_right, overlap.y, own.x + own.width - overlap_right, overlap.height),
+            ]
+        return Region(boxes)
+
+    def union(self, box: Box) -> "Region":
+        """
+        Returns the region with the box added.
+        """
+        return Region(self.subtract(box).boxes + [box])
+
+    @property
+    def area(self) -> int:
+        """
+        Returns the number of pixels in the region.
+        """
+        return sum(box.width * box.height for box in self.boxes)
+
+    @property
+    def bounds(self) -> Optional[Box]:
+        """
+        Returns the smallest box that contains the region, None if the region is empty.
+        """
+        if not self.boxes:
+            return None
+        left = min(box.x for box in self.boxes)
+        top = min(box.y for box in self.boxes)
+        right = max(box.x + box.width for box in self.boxes)
+        bottom = max(box.y + box.height for box in self.boxes)
+        return Box(left, top, right - left, bottom - top)
+
+    def contains(self, box: Box) -> bool:
+        """
+        Returns True if the whole box is inside of the region.
+        """
+        return self.intersect(box).area == box.width * box.height
+
+    def __bool__(self) -> bool:
+        return bool(self.boxes)
+
+    def __iter__(self) -> Iterator[Box]:
+        return iter(self.boxes)
+
+    def __len__(self) -> int:
+        return len(self.boxes)
+
+    def __repr__(self) -> str:
+        return f"Region(boxes={self.boxes})"
@@ -0,0 +1,378 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+This module provides an instant replay buffer, that keeps the last seconds of a window
+compressed in memory, so the frames before an event (e.g. a failed check) can be dumped.
+
+Every keyframe_interval frames a keyframe is stored, the frames in between are stored
+as the XOR of the frame and the previous frame, which is mostly zeros for a typical window
+and compresses well. The frames are compressed with LZ4 or Zstandard if they are installed
+(pip install lz4 / zstandard) and with zlib otherwise, on a worker thread,
+so the capture is not slowed down. The XOR uses numpy if it is installed.
+"""
+
+# built-in modules
+from collections import deque
+from queue import Full, Queue
+from threading import Lock, Thread
+from typing import Callable, Iterator, NamedTuple, Optional, TYPE_CHECKING
+import zlib
+
+# local modules
+from .image import Image
+from .box import Box
+from .stream import CaptureStream, Frame
+
+if TYPE_CHECKING:
+    from .window import WindowBase
+
+# the codecs in the order they are preferred
+CODECS = ("lz4", "zstd", "zlib")
+
+
+def get_codec(name: Optional[str] = None) -> tuple[str, Callable, Callable]:
+    """
+    Returns (name, compress, decompress) of a codec, the fastest installed codec by default.
+    """
+    if name is None:
+        for codec in CODECS:
+            try:
+                return get_codec(codec)
+            except ImportError:
+                continue
+
+    if name == "lz4":
+        try:
+            # pylint: disable-next=import-outside-toplevel
+            import lz4.frame
+        except ImportError as error:
+            raise ImportError("lz4 is required for the 'lz4' codec.") from error
+        return name, lz4.frame.compress, lz4.frame.decompress
+
+    if name == "zstd":
+        try:
+            # pylint: disable-next=import-outside-toplevel
+            import zstandard
+        except ImportError as error:
+            raise ImportError("zstandard is required for the 'zstd' codec.") from error
+        # level 1 is the fastest, the contexts are not thread-safe, so every call gets its own
+        return (
+            name,
+            lambda data: zstandard.ZstdCompressor(level=1).compress(data),
+            lambda data: zstandard.ZstdDecompressor().decompress(data)
+        )
+
+    if name == "zlib":
+        return name, lambda data: zlib.compress(data, 1), zlib.decompress
+
+    raise ValueError(f"Invalid codec '{name}'.")
+
+
+def xor_int(data: bytes, previous: bytes) -> bytes:
+    """
+    Returns the XOR of two byte strings of the same length with Python integers.
+    The conversions cost tens of milliseconds per 1080p frame, this is the fallback without numpy.
+    """
+    return (
+        int.from_bytes(data, "little") ^ int.from_bytes(previous, "little")
+    ).to_bytes(len(data), "little")
+
+
+def xor_numpy(data: bytes, previous: bytes) -> bytes:
+    """
+    Returns the XOR of two byte strings of the same length with numpy, without copying the inputs.
+    """
+    # pylint: disable-next=import-outside-toplevel
+    import numpy
+
+    return numpy.bitwise_xor(
+        numpy.frombuffer(data, numpy.uint8),
+        numpy.frombuffer(previous, numpy.uint8)
+    ).tobytes()
+
+
+def get_xor() -> Callable:
+    """
+    Returns xor_numpy if numpy is installed, xor_int otherwise.
+    """
+    try:
+        # pylint: disable-next=import-outside-toplevel,unused-import
+        import numpy
+    except ImportError:
+        return xor_int
+    return xor_numpy
+
+
+class StoredFrame(NamedTuple):
+    """
+    A compressed frame of a ReplayBuffer.
+    data is the compressed frame for keyframes and the compressed XOR with the previous frame
+    for the others.
+    """
+    index: int
+    timestamp: float
+    width: int
+    height: int
+    keyframe: bool
+    data: bytes
+
+
+class ReplayBuffer:
+    """
+    Keeps the last seconds of frames compressed in memory, in at most memory bytes.
+    The frames are stored in groups that start with a keyframe,
+    the oldest group is dropped when the newer groups cover the seconds
+    or when the memory limit is reached.
+    If the newest group alone exceeds the memory, it is restarted with a keyframe,
+    so the stored frames never take more than memory bytes.
+    Feed it with add() or let it capture a window with start().
+    """
+
+    # pylint: disable-next=too-many-arguments
+    def __init__(
+        self,
+        seconds: float = 30.0,
+        memory: int = 256 * 1024 * 1024,
+        keyframe_interval: int = 60,
+        codec: Optional[str] = None,
+        queue_size: int = 16
+    ) -> None:
+        if seconds <= 0:
+            raise ValueError(f"Invalid seconds '{seconds}'.")
+        if keyframe_interval < 1:
+            raise ValueError(f"Invalid keyframe_interval '{keyframe_interval}'.")
+        self.seconds = seconds
+        self.memory = memory
+        self.keyframe_interval = keyframe_interval
+        self.codec, self._compress, self._decompress = get_codec(codec)
+        self._xor = get_xor()
+
+        # groups of StoredFrames, every group starts with a keyframe
+        self.groups = deque()
+        self.lock = Lock()
+        # the compressed size of the stored frames
+        self.size = 0
+        self.dropped = 0
+
+        self._queue = Queue(maxsize=queue_size)
+        self._previous = None
+        self._count = 0
+        # the index of the newest keyframe
+        self._keyframe = 0
+        self._worker = Thread(target=self._compress_frames, name="dsi-replay", daemon=True)
+        self._worker.start()
+        self._stream = None
+        self._capture_thread = None
+
+    def add(self, frame: Frame) -> bool:
+        """
+        Queues a frame for compression, the image is copied.
+        Returns False if the frame was dropped, because the worker can't keep up.
+        """
+        image = frame.image
+        try:
+            # captures reuse their memory, so the image is copied
+            self._queue.put_nowait((frame.timestamp, image.width, image.height, image.copy().data))
+        except Full:
+            self.dropped += 1
+            return False
+        return True
+
+    def _compress_frames(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                break
+            timestamp, width, height, data = item
+
+            previous = self._previous
+            keyframe = (
+                previous is None
+                or self._count - self._keyframe >= self.keyframe_interval
+                or len(previous) != len(data)
+            )
+            compressed = self._compress(data if keyframe else self._xor(data, previous))
+            stored = StoredFrame(self._count, timestamp, width, height, keyframe, compressed)
+            if keyframe:
+                self._keyframe = self._count
+            self._previous = data
+            self._count += 1
+
+            with self.lock:
+                if keyframe:
+                    self.groups.append([])
+                self.groups[-1].append(stored)
+                self.size += len(compressed)
+                self._evict(timestamp)
+
+                if self.size > self.memory and not keyframe:
+                    # the current group alone is bigger than the memory, it is replaced
+                    # by a new group that starts with a keyframe of this frame,
+                    # the lock is held, so the size never exceeds the memory outside of it
+                    self._keyframe = stored.index
+                    stored = stored._replace(keyframe=True, data=self._compress(data))
+                    self.groups.clear()
+                    self.groups.append([stored])
+                    self.size = len(stored.data)
+
+                if self.size > self.memory:
+                    # a single keyframe is bigger than the memory
+                    self.groups.clear()
+                    self.size = 0
+                    self.dropped += 1
+                    self._previous = None
+            self._queue.task_done()
+
+    def _evict(self, newest: float) -> None:
+        """
+        Drops the oldest groups that are not needed, the lock is held.
+        """
+        while len(self.groups) > 1:
+            # the next group alone covers the seconds or the memory is full
+            if self.groups[1][0].timestamp > newest - self.seconds and self.size <= self.memory:
+                break
+            for stored in self.groups.popleft():
+                self.size -= len(stored.data)
+
+    def _groups(self, seconds: Optional[float]) -> list:
+        """
+        Returns a copy of the groups that contain the frames of the last seconds.
+        """
+        with self.lock:
+            groups = [list(group) for group in self.groups]
+        if seconds is None or not groups:
+            return groups
+        start = groups[-1][-1].timestamp - seconds
+        while len(groups) > 1 and groups[1][0].timestamp <= start:
+            groups.pop(0)
+        return groups
+
+    def frames(self, seconds: Optional[float] = None) -> Iterator[Frame]:
+        """
+        Decodes the stored frames (of the last seconds) one by one, oldest first.
+        The frame index is the index of the frame since the buffer was created.
+        """
+        start = None
+        groups = self._groups(seconds)
+        if seconds is not None and groups:
+            start = groups[-1][-1].timestamp - seconds
+
+        for group in groups:
+            data = None
+            for stored in group:
+                if stored.keyframe:
+                    data = self._decompress(stored.data)
+                else:
+                    data = self._xor(self._decompress(stored.data), data)
+                if start is not None and stored.timestamp < start:
+                    continue
+                image = Image(data, stored.width, stored.height)
+                yield Frame(stored.index, stored.timestamp, image)
+
+    def dump(self, path: str, seconds: Optional[float] = None) -> int:
+        """
+        Writes the stored frames (of the last seconds) into a raw frame dump (see framedump).
+        A dump has one size, frames with another size than the newest frame are left out.
+        Returns the number of written frames.
+        """
+        # pylint: disable-next=import-outside-toplevel
+        from .framedump import FrameDumpWriter
+
+        groups = self._groups(seconds)
+        if not groups:
+            return 0
+        newest = groups[-1][-1]
+
+        written = 0
+        with FrameDumpWriter(path, newest.width, newest.height) as writer:
+            for frame in self.frames(seconds):
+                if (frame.image.width, frame.image.height) == (newest.width, newest.height):
+                    writer.write(frame.image, frame.timestamp)
+                    written += 1
+        return written
+
+    def start(
+        self,
+        window: "WindowBase",
+        fps: float = 30.0,
+        geometry: Optional[Box] = None
+    ) -> "ReplayBuffer":
+        """
+        Starts capturing a window into the buffer on a thread.
+        """
+        if self._capture_thread is not None:
+            raise RuntimeError(f"{self} is already capturing.")
+        self._stream = CaptureStream(window, fps, geometry)
+        self._capture_thread = Thread(target=self._capture, name="dsi-replay-capture", daemon=True)
+        self._capture_thread.start()
+        return self
+
+    def _capture(self) -> None:
+        for frame in self._stream:
+            self.add(frame)
+
+    def stop(self) -> None:
+        """
+        Stops capturing the window and waits until the queued frames are compressed.
+        """
+        if self._capture_thread is not None:
+            self._stream.stop()
+            self._capture_thread.join()
+            self.dropped += self._stream.dropped
+            self._capture_thread = None
+        self._queue.join()
+
+    def close(self) -> None:
+        """
+        Stops capturing and the worker thread, the stored frames stay available.
+        """
+        self.stop()
+        if self._worker.is_alive():
+            self._queue.put(None)
+            self._worker.join()
+
+    @property
+    def frame_count(self) -> int:
+        """
+        Returns the number of stored frames.
+        """
+        with self.lock:
+            return sum(len(group) for group in self.groups)
+
+    @property
+    def duration(self) -> float:
+        """
+        Returns the seconds between the oldest and the newest stored frame.
+        """
+        with self.lock:
+            if not self.groups:
+                return 0.0
+            return self.groups[-1][-1].timestamp - self.groups[0][0].timestamp
+
+    @property
+    def ratio(self) -> float:
+        """
+        Returns the compression ratio of the stored frames.
+        """
+        with self.lock:
+            raw_size = sum(
+                stored.width * stored.height * 4
+                for group in self.groups
+                for stored in group
+            )
+            size = self.size
+        if not size:
+            return 0.0
+        return raw_size / size
+
+    def __enter__(self) -> "ReplayBuffer":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        # pylint: disable-next=line-too-long
+        return f'ReplayBuffer(codec="{self.codec}", frames={self.frame_count}, duration={self.duration:.1f}, size={self.size})'
@@ -0,0 +1,372 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+This module provides a scheduler that captures many windows,
+each at its own frame rate, under a global budget.
+"""
+
+# built-in modules
+from collections import deque
+from time import perf_counter, sleep, time
+from typing import Iterator, NamedTuple, Optional, TYPE_CHECKING
+
+# local modules
+from .box import Box
+from .stream import Frame
+
+if TYPE_CHECKING:
+    from .window import WindowBase
+
+# weight of a new measurement in the moving averages of the capture cost
+COST_SMOOTHING = 0.2
+# number of captures that the achieved frame rate is measured over
+FPS_WINDOW = 32
+
+
+class ScheduledFrame(NamedTuple):
+    """
+    A frame captured by a CaptureScheduler.
+    The lateness is the time in seconds by which the capture missed its deadline, 0 if it didn't.
+    """
+    window: "WindowBase"
+    frame: Frame
+    lateness: float
+
+
+class ScheduledWindow:
+    """
+    A window of a CaptureScheduler with its target frame rate, priority and statistics.
+    """
+
+    __slots__ = (
+        "window",
+        "fps",
+        "priority",
+        "geometry",
+        "release",
+        "cost",
+        "size",
+        "captured",
+        "dropped",
+        "skipped",
+        "total_lateness",
+        "max_lateness",
+        "_timestamps",
+    )
+
+    def __init__(
+        self,
+        window: "WindowBase",
+        fps: float,
+        priority: int,
+        geometry: Optional[Box],
+        release: float
+    ) -> None:
+        if fps <= 0:
+            raise ValueError(f"Invalid fps '{fps}'.")
+        self.window = window
+        self.fps = fps
+        self.priority = priority
+        self.geometry = geometry
+        # the time (perf_counter()) from which the next frame may be captured
+        self.release = release
+        # moving averages of the seconds and bytes of a capture, None until the first capture
+        self.cost = None
+        self.size = None
+        self.captured = 0
+        self.dropped = 0
+        self.skipped = 0
+        self.total_lateness = 0.0
+        self.max_lateness = 0.0
+        self._timestamps = deque(maxlen=FPS_WINDOW)
+
+    @property
+    def period(self) -> float:
+        """
+        Returns the seconds between two frames.
+        """
+        return 1 / self.fps
+
+    @property
+    def deadline(self) -> float:
+        """
+        Returns the time (perf_counter()) by which the next frame should be captured.
+        """
+        return self.release + self.period
+
+    @property
+    def achieved_fps(self) -> float:
+        """
+        Returns the frame rate of the last captures.
+        """
+        timestamps = self._timestamps
+        if len(timestamps) < 2 or timestamps[-1] == timestamps[0]:
+            return 0.0
+        return (len(timestamps) - 1) / (timestamps[-1] - timestamps[0])
+
+    @property
+    def mean_lateness(self) -> float:
+        """
+        Returns the average lateness of the captures in seconds.
+        """
+        if not self.captured:
+            return 0.0
+        return self.total_lateness / self.captured
+
+    def record(self, start: float, end: float, size: int) -> float:
+        """
+        Records a capture and returns its lateness.
+        """
+        duration = end - start
+        if self.cost is None:
+            self.cost = duration
+            self.size = size
+        else:
+            self.cost += COST_SMOOTHING * (duration - self.cost)
+            self.size += COST_SMOOTHING * (size - self.size)
+
+        lateness = max(0.0, end - self.deadline)
+        self.captured += 1
+        self.total_lateness += lateness
+        self.max_lateness = max(self.max_lateness, lateness)
+        self._timestamps.append(end)
+        return lateness
+
+    def advance(self, now: float) -> None:
+        """
+        Moves the release time to the next frame, frames that can't be captured in time anymore
+        are skipped and counted as dropped.
+        """
+        self.release += self.period
+        if now - self.release >= self.period:
+            missed = int((now - self.release) / self.period)
+            self.dropped += missed
+            self.release += missed * self.period
+
+    def to_dict(self) -> dict:
+        """
+        Returns the statistics of the window.
+        """
+        return {
+            "fps": self.fps,
+            "achieved_fps": self.achieved_fps,
+            "priority": self.priority,
+            "captured": self.captured,
+            "dropped": self.dropped,
+            "skipped": self.skipped,
+            "mean_lateness": self.mean_lateness,
+            "max_lateness": self.max_lateness,
+            "cost": self.cost,
+            "size": self.size,
+        }
+
+    def __repr__(self) -> str:
+        # pylint: disable-next=line-too-long
+        return f"ScheduledWindow(fps={self.fps}, achieved_fps={self.achieved_fps:.1f}, priority={self.priority}, captured={self.captured}, dropped={self.dropped})"
+
+
+class Budget:
+    """
+    A token bucket that limits a rate, e.g. bytes per second.
+    It holds at most one second of the rate, so idle time can't be saved up.
+    A full bucket pays for any amount, the tokens can go negative (a debt that is paid off
+    before the next capture), so a frame that costs more than one second of the rate
+    is still captured, at a lower frame rate.
+    """
+
+    __slots__ = ("rate", "tokens", "updated")
+
+    def __init__(self, rate: float) -> None:
+        if rate <= 0:
+            raise ValueError(f"Invalid rate '{rate}'.")
+        self.rate = rate
+        self.tokens = rate
+        self.updated = perf_counter()
+
+    def refill(self, now: float) -> None:
+        """
+        Adds the tokens of the time since the last refill.
+        """
+        self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """
+        Returns the seconds until the amount is available or the bucket is full.
+        """
+        return max(0.0, (min(amount, self.rate) - self.tokens) / self.rate)
+
+
+class CaptureScheduler:
+    """
+    Captures many windows, each at its own target frame rate.
+    The window with the earliest deadline is captured first (EDF scheduling).
+    With a budget (bytes per second of image data and/or the fraction of the time
+    spent capturing), captures are delayed until the budget allows them.
+    When frames are due for several windows but the budget can't pay for all of them,
+    the window with the highest priority goes first, so low priority windows are starved first.
+    The budget uses the measured cost of the previous captures of each window.
+    Windows that are not visible (unmapped, covered or off-screen) are skipped
+    and counted as skipped, unless skip_hidden is False.
+    Iterate over the scheduler to get ScheduledFrames.
+    """
+
+    def __init__(
+        self,
+        bytes_per_second: Optional[float] = None,
+        cpu: Optional[float] = None,
+        skip_hidden: bool = True
+    ) -> None:
+        # budgets of the image data and of the capture time (seconds per second)
+        self.bytes_budget = None if bytes_per_second is None else Budget(bytes_per_second)
+        self.cpu_budget = None if cpu is None else Budget(cpu)
+        # don't capture windows that are not visible, see WindowBase.visible_region
+        self.skip_hidden = skip_hidden
+        self.windows = []
+        self._stopped = False
+
+    def add(
+        self,
+        window: "WindowBase",
+        fps: float = 30.0,
+        priority: int = 0,
+        geometry: Optional[Box] = None
+    ) -> ScheduledWindow:
+        """
+        Adds a window with a target frame rate and a priority (higher goes first).
+        Returns the ScheduledWindow that holds the statistics of the window.
+        """
+        scheduled = ScheduledWindow(window, fps, priority, geometry, perf_counter())
+        self.windows.append(scheduled)
+        return scheduled
+
+    def remove(self, scheduled: ScheduledWindow) -> None:
+        """
+        Removes a window.
+        """
+        self.windows.remove(scheduled)
+
+    def _budgets(self) -> list:
+        return [budget for budget in (self.bytes_budget, self.cpu_budget) if budget is not None]
+
+    def _affordable(self, due: list) -> bool:
+        """
+        Returns True if the budgets can pay for the captures of all due windows now.
+        A single window can always be paid for by a full budget.
+        """
+        for budget, amount in (
+            (self.bytes_budget, sum(scheduled.size or 0 for scheduled in due)),
+            (self.cpu_budget, sum(scheduled.cost or 0 for scheduled in due)),
+        ):
+            if budget is None or amount <= budget.tokens:
+                continue
+            if len(due) == 1 and budget.tokens >= budget.rate:
+                continue
+            return False
+        return True
+
+    def _wait_time(self, scheduled: ScheduledWindow) -> float:
+        """
+        Returns the seconds until the budgets allow a capture of the window.
+        """
+        if scheduled.cost is None:
+            # the cost is unknown until the first capture
+            return 0.0
+        wait = 0.0
+        if self.bytes_budget is not None:
+            wait = self.bytes_budget.wait_time(scheduled.size)
+        if self.cpu_budget is not None:
+            wait = max(wait, self.cpu_budget.wait_time(scheduled.cost))
+        return wait
+
+    def next(self) -> Optional[ScheduledWindow]:
+        """
+        Waits until a window is due and the budget allows its capture, and returns it.
+        Returns None if the scheduler has no windows or was stopped.
+        """
+        while not self._stopped and self.windows:
+            now = perf_counter()
+            for budget in self._budgets():
+                budget.refill(now)
+
+            due = [scheduled for scheduled in self.windows if scheduled.release <= now]
+            if not due:
+                sleep(min(scheduled.release for scheduled in self.windows) - now)
+                continue
+
+            if self._affordable(due):
+                # earliest deadline first, higher priority on equal deadlines
+                return min(due, key=lambda scheduled: (scheduled.deadline, -scheduled.priority))
+
+            # over budget, the budget goes to the most important window
+            # that is due by the time the budget allows a capture
+            horizon = now + min(self._wait_time(scheduled) for scheduled in due)
+            chosen = min(
+                (scheduled for scheduled in self.windows if scheduled.release <= horizon),
+                key=lambda scheduled: (-scheduled.priority, scheduled.deadline)
+            )
+            wait = max(chosen.release - now, self._wait_time(chosen))
+            if wait > 0:
+                sleep(wait)
+                continue
+            return chosen
+        return None
+
+    def capture(self, scheduled: ScheduledWindow) -> Optional[ScheduledFrame]:
+        """
+        Captures a window, charges the budgets and moves the window to its next frame.
+        Returns None if the window is skipped because it is not visible.
+        """
+        start = perf_counter()
+        if self.skip_hidden and not scheduled.window.visible_region:
+            scheduled.skipped += 1
+            scheduled.advance(start)
+            return None
+
+        timestamp = time()
+        image = scheduled.window.get_image(scheduled.geometry)
+        end = perf_counter()
+
+        size = image.stride * image.height
+        if self.bytes_budget is not None:
+            self.bytes_budget.tokens -= size
+        if self.cpu_budget is not None:
+            self.cpu_budget.tokens -= end - start
+
+        index = scheduled.captured
+        lateness = scheduled.record(start, end, size)
+        scheduled.advance(end)
+        return ScheduledFrame(scheduled.window, Frame(index, timestamp, image), lateness)
+
+    def __iter__(self) -> Iterator[ScheduledFrame]:
+        while True:
+            scheduled = self.next()
+            if scheduled is None:
+                return
+            frame = self.capture(scheduled)
+            if frame is not None and not self._stopped:
+                yield frame
+
+    def stats(self) -> list[dict]:
+        """
+        Returns the statistics of every window, in the order they were added.
+        """
+        return [scheduled.to_dict() for scheduled in self.windows]
+
+    @property
+    def stopped(self) -> bool:
+        """
+        Returns True if the scheduler has been stopped.
+        """
+        return self._stopped
+
+    def stop(self) -> None:
+        """
+        Stops the scheduler.
+        The iteration ends after the frame that is currently being captured.
+        """
+        self._stopped = True
+
+    def __repr__(self) -> str:
+        return f"CaptureScheduler(windows={len(self.windows)})"
@@ -0,0 +1,582 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+This module provides a local frame server, that shares the captures of DSI
+with other processes on the same host (python -m display_server_interactions serve).
+
+The server listens on a Unix socket of type SOCK_SEQPACKET,
+every message is one JSON object, so clients in any language can read them without framing.
+Frames are not sent through the socket, they are written into memfd shared memory slots,
+the file descriptor of a slot is passed once with SCM_RIGHTS and the client maps it.
+
+Requests (client -> server), every request can have an "id" that is copied into its response:
+
+- {"cmd": "windows"} -> {"ok": true, "windows": [{"id", "name", "pid", "x", "y", ...}, ...]}
+- {"cmd": "active"} -> {"ok": true, "window": {"id", "name", "pid", "x", "y", "width", "height"}}
+- {"cmd": "find", "name": substring or null, "pid": pid or null} -> like windows
+- {"cmd": "capture", "window": id or null, "geometry": null, "path": path or null, "format": null}
+  -> {"ok": true, "width", "height", "path"} if the server saved it to the path,
+  otherwise {"ok": true, "width", "height", "size"} with a memfd that holds the encoded image
+- {"cmd": "subscribe", "window": id or null (active), "geometry": [x, y, width, height] or null,
+  "fps": 30, "slots": 3} -> {"ok": true, "subscription": id}
+- {"cmd": "release", "subscription": id, "slot": index}, gives a slot back to the server
+- {"cmd": "unsubscribe", "subscription": id} -> {"ok": true}
+- {"cmd": "input", "window": id or null, "commands": [
+  {"type": "text", "text": "abc"}, {"type": "move", "x": 10, "y": 10},
+  {"type": "click", "x": 10, "y": 10, "button": "left"}]} -> {"ok": true, "done": 3}
+
+Events (server -> client):
+
+- {"event": "frame", "subscription": id, "index", "timestamp", "width", "height", "stride", "size",
+  "slot": index, "new": bool}, if new is true the file descriptor of the slot is attached,
+  the frame is in the first size bytes of the slot, release the slot after reading it.
+- {"event": "closed", "subscription": id, "error": message or null}
+
+Failed requests are answered with {"ok": false, "error": message}.
+"""
+
+# built-in modules
+from json import dumps, loads
+from mmap import mmap
+from os import (
+    MFD_CLOEXEC,
+    close as close_fd,
+    environ,
+    ftruncate,
+    getuid,
+    lstat,
+    memfd_create,
+    mkdir,
+    path,
+    umask,
+    unlink,
+    write as write_fd,
+)
+from stat import S_ISDIR, S_IMODE
+from socket import AF_UNIX, SHUT_RDWR, SOCK_SEQPACKET, socket, send_fds
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock, Thread
+from typing import Optional, TYPE_CHECKING
+
+# local modules
+from .box import Box
+from .buttons import MouseButtons
+from .client import default_socket_path, peer_uid
+from .hub import FrameHub, window_key
+from .windowlist import WindowList
+
+if TYPE_CHECKING:
+    from .base import DSIBase
+    from .window import WindowBase
+
+# the biggest request that is accepted
+MAX_MESSAGE = 1 << 20
+# threads that handle the requests, each keeps its connection to the display server open
+WORKERS = 4
+
+
+def get_window(dsi: "DSIBase", window_id: Optional[int]) -> "WindowBase":
+    """
+    Returns the window of an id (XID or HWND), the active window if the id is None.
+    """
+    if window_id is None:
+        return dsi.get_active_window()
+    windows = dsi.get_all_windows()
+    if isinstance(windows, WindowList):
+        if window_id in windows:
+            return windows.factory(window_id)
+    else:
+        for window in windows:
+            if window_key(window) == window_id:
+                return window
+    raise LookupError(f"No window with the id {window_id}.")
+
+
+def private_directory(directory: str) -> None:
+    """
+    Creates a directory that only the current user can access,
+    or checks that an existing directory is one, so no other user can put a socket into it.
+    """
+    try:
+        mkdir(directory, 0o700)
+    except FileExistsError:
+        pass
+    status = lstat(directory)
+    if not S_ISDIR(status.st_mode) or status.st_uid != getuid() or S_IMODE(status.st_mode) & 0o077:
+        raise PermissionError(f"{directory} is not a private directory of the current user.")
+
+
+def window_info(window: "WindowBase") -> dict:
+    """
+    Returns the id, name, pid and geometry of a window.
+    """
+    geometry = window.geometry
+    return {
+        "id": window_key(window),
+        "name": window.name,
+        "pid": window.pid,
+        "x": geometry.x,
+        "y": geometry.y,
+        "width": geometry.width,
+        "height": geometry.height,
+    }
+
+
+def memfd_with(data: bytes) -> int:
+    """
+    Returns a memfd that contains the data, the caller closes it.
+    """
+    fd = memfd_create("dsi-data", MFD_CLOEXEC)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[write_fd(fd, view):]
+    except OSError:
+        close_fd(fd)
+        raise
+    return fd
+
+
+class Slot:
+    """
+    A memfd shared memory buffer that holds one frame.
+    """
+
+    __slots__ = ("fd", "memory", "size", "busy")
+
+    def __init__(self, size: int) -> None:
+        self.fd = memfd_create("dsi-frame", MFD_CLOEXEC)
+        ftruncate(self.fd, size)
+        self.memory = mmap(self.fd, size)
+        self.size = size
+        self.busy = False
+
+    def close(self) -> None:
+        """
+        Closes the file descriptor and unmaps the memory.
+        """
+        if self.fd is not None:
+            close_fd(self.fd)
+            self.fd = None
+        self.memory.close()
+
+
+class SlotRing:
+    """
+    The shared memory slots of a subscription.
+    A slot is busy from the moment a frame is written into it until the client releases it.
+    If all slots are busy the frame is dropped.
+    """
+
+    def __init__(self, count: int) -> None:
+        if count < 1:
+            raise ValueError(f"Invalid slot count '{count}'.")
+        self.lock = Lock()
+        self.slots = [None] * count
+
+    def acquire(self, size: int) -> Optional[tuple]:
+        """
+        Returns (index, slot, new) of a free slot of the size, None if all slots are busy.
+        new is True if the slot was (re)allocated, its file descriptor has to be sent.
+        """
+        with self.lock:
+            for index, slot in enumerate(self.slots):
+                if slot is not None and slot.busy:
+                    continue
+                new = slot is None or slot.size != size
+                if new:
+                    if slot is not None:
+                        slot.close()
+                    slot = self.slots[index] = Slot(size)
+                slot.busy = True
+                return index, slot, new
+        return None
+
+    def release(self, index: int) -> None:
+        """
+        Marks a slot as free.
+        """
+        with self.lock:
+            slot = self.slots[index]
+            if slot is not None:
+                slot.busy = False
+
+    def close(self) -> None:
+        """
+        Closes all slots.
+        """
+        with self.lock:
+            for slot in self.slots:
+                if slot is not None:
+                    slot.close()
+            self.slots = [None] * len(self.slots)
+
+
+class ClientConnection:
+    """
+    A connected client of the FrameServer, its requests are handled by its own thread,
+    the frames of every subscription are sent by a thread of the subscription.
+    """
+
+    def __init__(self, server: "FrameServer", connection: socket) -> None:
+        self.server = server
+        self.connection = connection
+        self.send_lock = Lock()
+        # subscription id -> (Subscription, SlotRing)
+        self.subscriptions = {}
+        self.next_subscription = 1
+        self.closed = False
+        self.commands = {
+            "windows": self.windows,
+            "active": self.active,
+            "find": self.find,
+            "capture": self.capture,
+            "subscribe": self.subscribe,
+            "release": self.release,
+            "unsubscribe": self.unsubscribe,
+            "input": self.input,
+        }
+
+    def send(self, message: dict, fds: tuple = ()) -> None:
+        """
+        Sends a message, with file descriptors if given.
+        """
+        data = dumps(message, separators=(",", ":")).encode()
+        with self.send_lock:
+            if fds:
+                send_fds(self.connection, [data], list(fds))
+            else:
+                self.connection.send(data)
+
+    def run(self) -> None:
+        """
+        Handles the requests until the client disconnects.
+        """
+        try:
+            while True:
+                data = self.connection.recv(MAX_MESSAGE)
+                if not data:
+                    break
+                # handled by a long-lived worker, so the connection to the display server
+                # and its caches stay warm, the requests of a client are handled in order
+                self.server.executor.submit(self.handle, data).result()
+        except OSError:
+            pass
+        finally:
+            self.close()
+
+    def handle(self, data: bytes) -> None:
+        """
+        Handles a request and sends the response.
+        """
+        request_id = None
+        try:
+            request = loads(data)
+            request_id = request.get("id")
+            command = self.commands.get(request.get("cmd"))
+            if command is None:
+                raise ValueError(f"Invalid command '{request.get('cmd')}'.")
+            response = command(request)
+        # pylint: disable-next=broad-except
+        except Exception as error:
+            response = {"ok": False, "error": str(error)}
+        if response is None:
+            return
+        response["id"] = request_id
+        self.send(response)
+
+    def windows(self, _: dict) -> dict:
+        """
+        Returns the metadata of all windows.
+        """
+        return {"ok": True, "windows": list(self.server.dsi.snapshot().rows())}
+
+    def active(self, _: dict) -> dict:
+        """
+        Returns the metadata of the active window.
+        """
+        return {"ok": True, "window": window_info(self.server.dsi.get_active_window())}
+
+    def find(self, request: dict) -> dict:
+        """
+        Returns the metadata of the windows whose name contains "name" and/or have the "pid".
+        """
+        name = request.get("name")
+        pid = request.get("pid")
+        return {
+            "ok": True,
+            "windows": [
+                row
+                for row in self.server.dsi.snapshot().rows()
+                if (name is None or (row["name"] is not None and name in row["name"]))
+                and (pid is None or row["pid"] == pid)
+            ],
+        }
+
+    def capture(self, request: dict) -> Optional[dict]:
+        """
+        Captures a window (the active window by default).
+        With "path" the image is saved by the server, the format is taken from the extension.
+        Otherwise it is encoded ("format", png by default) into a memfd that is attached.
+        """
+        window = get_window(self.server.dsi, request.get("window"))
+        geometry = request.get("geometry")
+        if geometry is not None:
+            geometry = Box(*geometry)
+        image = window.get_image(geometry)
+
+        if request.get("path") is not None:
+            image.save(request["path"], request.get("format"))
+            return {
+                "ok": True,
+                "path": request["path"],
+                "width": image.width,
+                "height": image.height,
+            }
+
+        data = image.encode(request.get("format") or "png")
+        fd = memfd_with(data)
+        try:
+            self.send(
+                {
+                    "ok": True,
+                    "width": image.width,
+                    "height": image.height,
+                    "size": len(data),
+                    "id": request.get("id"),
+                },
+                (fd,)
+            )
+        finally:
+            close_fd(fd)
+        return None
+
+    def subscribe(self, request: dict) -> None:
+        """
+        Subscribes to the frames of a window and starts sending them.
+        """
+        window = get_window(self.server.dsi, request.get("window"))
+        geometry = request.get("geometry")
+        if geometry is not None:
+            geometry = Box(*geometry)
+        slots = SlotRing(request.get("slots", 3))
+        subscription = self.server.hub.subscribe(
+            window,
+            geometry,
+            fps=request.get("fps", 30.0),
+            depth=1
+        )
+
+        subscription_id = self.next_subscription
+        self.next_subscription += 1
+        self.subscriptions[subscription_id] = (subscription, slots)
+        # answered here, so the response arrives before the first frame
+        self.send({"ok": True, "subscription": subscription_id, "id": request.get("id")})
+        Thread(
+            target=self._send_frames,
+            args=(subscription_id, subscription, slots),
+            name="dsi-serve-frames",
+            daemon=True
+        ).start()
+
+    def _send_frames(self, subscription_id: int, subscription, slots: SlotRing) -> None:
+        error = None
+        try:
+            for frame in subscription:
+                image = frame.image
+                size = image.stride * image.height
+                acquired = slots.acquire(size)
+                if acquired is None:
+                    # the client still holds all slots
+                    subscription.dropped += 1
+                    continue
+                index, slot, new = acquired
+                slot.memory[:size] = image.data
+                self.send(
+                    {
+                        "event": "frame",
+                        "subscription": subscription_id,
+                        "index": frame.index,
+                        "timestamp": frame.timestamp,
+                        "width": image.width,
+                        "height": image.height,
+                        "stride": image.stride,
+                        "size": size,
+                        "slot": index,
+                        "new": new,
+                    },
+                    (slot.fd,) if new else ()
+                )
+        # pylint: disable-next=broad-except
+        except Exception as error_:
+            error = error_
+        finally:
+            subscription.close()
+            slots.close()
+            if not self.closed:
+                try:
+                    self.send({
+                        "event": "closed",
+                        "subscription": subscription_id,
+                        "error": None if error is None else str(error),
+                    })
+                except OSError:
+                    pass
+
+    def release(self, request: dict) -> None:
+        """
+        Gives a slot back, it is not answered.
+        """
+        _, slots = self.subscriptions[request["subscription"]]
+        slots.release(request["slot"])
+
+    def unsubscribe(self, request: dict) -> dict:
+        """
+        Stops a subscription.
+        """
+        subscription, _ = self.subscriptions.pop(request["subscription"])
+        # the sending thread closes the slots
+        subscription.close()
+        return {"ok": True}
+
+    def input(self, request: dict) -> dict:
+        """
+        Sends a batch of input commands to a window, in order.
+        Stops at the first failed command, done is the number of executed commands.
+        """
+        window = get_window(self.server.dsi, request.get("window"))
+        done = 0
+        for command in request.get("commands", ()):
+            kind = command.get("type")
+            try:
+                if kind == "text":
+                    window.send_str(command["text"])
+                elif kind == "move":
+                    window.warp_pointer(command["x"], command["y"])
+                elif kind == "click":
+                    button = getattr(MouseButtons, command.get("button", "left").upper())
+                    window.send_mouse_click(command["x"], command["y"], button)
+                else:
+                    raise ValueError(f"Invalid input type '{kind}'.")
+            # pylint: disable-next=broad-except
+            except Exception as error:
+                return {"ok": False, "error": str(error), "done": done}
+            done += 1
+        return {"ok": True, "done": done}
+
+    def close(self) -> None:
+        """
+        Stops all subscriptions and closes the connection.
+        """
+        self.closed = True
+        for subscription, _ in list(self.subscriptions.values()):
+            subscription.close()
+        self.subscriptions.clear()
+        self.connection.close()
+        self.server.forget(self)
+
+
+class FrameServer:
+    """
+    Serves the windows of a DSI to local clients over a Unix socket, see the module docstring.
+    Subscriptions of all clients to the same window and geometry share one capture (FrameHub).
+    """
+
+    def __init__(self, dsi: "DSIBase", socket_path: Optional[str] = None) -> None:
+        self.dsi = dsi
+        self.socket_path = socket_path or default_socket_path()
+        self.hub = FrameHub()
+        self.executor = ThreadPoolExecutor(WORKERS, "dsi-serve-worker")
+        self.clients = []
+        self.lock = Lock()
+        self.socket = None
+
+    def bind(self) -> None:
+        """
+        Creates the socket, only the current user can connect to it.
+        The default socket is created in a private directory (see client.default_socket_path).
+        A socket that was left behind by a server that is not running anymore is replaced.
+        """
+        if self.socket_path == default_socket_path() and not environ.get("XDG_RUNTIME_DIR"):
+            private_directory(path.dirname(self.socket_path))
+
+        if path.exists(self.socket_path):
+            probe = socket(AF_UNIX, SOCK_SEQPACKET)
+            try:
+                probe.connect(self.socket_path)
+            except OSError:
+                unlink(self.socket_path)
+            else:
+                raise RuntimeError(f"A server is already listening on {self.socket_path}.")
+            finally:
+                probe.close()
+
+        self.socket = socket(AF_UNIX, SOCK_SEQPACKET)
+        # the socket gives access to the screen and the input,
+        # it is created with the mode 0600, so nobody else can connect in between
+        previous_umask = umask(0o177)
+        try:
+            self.socket.bind(self.socket_path)
+        finally:
+            umask(previous_umask)
+        self.socket.listen()
+
+    def serve_forever(self) -> None:
+        """
+        Accepts clients until close() is called.
+        """
+        if self.socket is None:
+            self.bind()
+        while True:
+            try:
+                connection, _ = self.socket.accept()
+            except OSError:
+                # the socket was closed
+                return
+            if peer_uid(connection) != getuid():
+                connection.close()
+                continue
+            client = ClientConnection(self, connection)
+            with self.lock:
+                self.clients.append(client)
+            Thread(target=client.run, name="dsi-serve-client", daemon=True).start()
+
+    def forget(self, client: ClientConnection) -> None:
+        """
+        Removes a disconnected client.
+        """
+        with self.lock:
+            if client in self.clients:
+                self.clients.remove(client)
+
+    def close(self) -> None:
+        """
+        Disconnects all clients and removes the socket.
+        """
+        if self.socket is not None:
+            # wakes up accept()
+            try:
+                self.socket.shutdown(SHUT_RDWR)
+            except OSError:
+                pass
+            self.socket.close()
+            self.socket = None
+            if path.exists(self.socket_path):
+                unlink(self.socket_path)
+        with self.lock:
+            clients = list(self.clients)
+        for client in clients:
+            client.close()
+        self.hub.close()
+        self.executor.shutdown(wait=False)
+
+    def __enter__(self) -> "FrameServer":
+        self.bind()
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f'FrameServer(socket_path="{self.socket_path}", clients={len(self.clients)})'
@@ -0,0 +1,196 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+This module provides the System V shared memory segments and the MIT-SHM capture logic,
+that the Xlib and the XCB backend share.
+The backends only provide the calls that attach a segment and capture into it.
+"""
+
+# built-in modules
+from abc import ABCMeta, abstractmethod
+from ctypes import CDLL, cdll, c_int, c_ubyte, c_ulong, c_void_p
+from ctypes.util import find_library
+from threading import Lock, local
+from time import perf_counter_ns
+from typing import Callable, Optional
+from weakref import WeakSet, finalize
+
+# local modules
+from .image import Image
+from .box import Box
+from .stats import Instrumentation
+
+# /usr/include/x86_64-linux-gnu/bits/ipc.h
+IPC_PRIVATE = 0
+IPC_CREAT = 0o1000
+IPC_RMID = 0
+
+_libc = []
+
+
+def get_libc() -> CDLL:
+    """
+    Returns libc with the System V shared memory functions declared.
+    """
+    if not _libc:
+        libc = cdll.LoadLibrary(find_library("c"))
+        libc.shmget.argtypes = [c_int, c_ulong, c_int]
+        libc.shmat.argtypes = [c_int, c_void_p, c_int]
+        libc.shmat.restype = c_void_p
+        libc.shmdt.argtypes = [c_void_p]
+        libc.shmctl.argtypes = [c_int, c_int, c_void_p]
+        _libc.append(libc)
+    return _libc[0]
+
+
+def release_segment(address: int, detach: Callable, args: tuple) -> None:
+    """
+    Detaches a shared memory segment from the X server and from this process.
+    """
+    detach(*args)
+    get_libc().shmdt(address)
+
+
+class ShmSegmentBase:
+    """
+    A shared memory segment, that the X server writes captured images into.
+    Subclasses attach it to the X server and call _attached() afterwards.
+    The segment is released when it and all Images that use it are garbage collected.
+    """
+
+    def __init__(self, width: int, height: int, stride: int) -> None:
+        self.width = width
+        self.height = height
+        self.stride = stride
+        self.size = stride * height
+
+        libc = get_libc()
+        shmid = libc.shmget(IPC_PRIVATE, self.size, IPC_CREAT | 0o600)
+        if shmid < 0:
+            raise OSError("shmget failed.")
+
+        address = libc.shmat(shmid, None, 0)
+        if address in (None, c_void_p(-1).value):
+            libc.shmctl(shmid, IPC_RMID, None)
+            raise OSError("shmat failed.")
+
+        self.shmid = shmid
+        self.address = address
+        self._finalizer = None
+
+    def _attached(self, detach: Callable, *args) -> None:
+        """
+        Called after the X server attached the segment,
+        detach(*args) detaches it from the X server when the segment is released.
+        """
+        # the segment is destroyed as soon as it is detached everywhere
+        get_libc().shmctl(self.shmid, IPC_RMID, None)
+        self._finalizer = finalize(self, release_segment, self.address, detach, args)
+
+    def get_image(self) -> Image:
+        """
+        Returns an Image that is backed by the shared memory.
+        """
+        data = (c_ubyte * self.size).from_address(self.address)
+        # keep the segment alive as long as the data is used
+        data.segment = self
+        return Image(memoryview(data).cast("B"), self.width, self.height, self.stride)
+
+    def release(self) -> None:
+        """
+        Releases the segment.
+        Images that use the segment must not be used after this.
+        """
+        self._finalizer()
+
+
+class ShmCaptureBase(metaclass=ABCMeta):
+    """
+    Captures images through the MIT-SHM extension, the X server writes the images
+    directly into shared memory, instead of sending them through the socket.
+    Every thread captures into its own segment, so concurrent captures
+    don't overwrite each other's pixels.
+    Falls back to a plain GetImage if the extension is not available (e.g. on remote displays).
+    """
+
+    def __init__(self) -> None:
+        self.available = False
+        self._local = local()
+        # the segments of all threads, so release() can release them
+        self._segments = WeakSet()
+        self._lock = Lock()
+
+    @property
+    @abstractmethod
+    def stats(self) -> Optional[Instrumentation]:
+        """
+        Returns the Instrumentation of the connection, None if it is disabled.
+        """
+
+    @abstractmethod
+    def _create_segment(self, width: int, height: int) -> ShmSegmentBase:
+        """
+        Returns a new segment that is attached to the X server.
+        """
+
+    @abstractmethod
+    def _get_image_shm(self, drawable: int, geometry: Box, segment: ShmSegmentBase) -> bool:
+        """
+        Captures a region of a drawable into a segment, returns False if it failed.
+        """
+
+    @abstractmethod
+    def _get_image(self, drawable: int, geometry: Box) -> Image:
+        """
+        Returns an Image of a region of a drawable, without MIT-SHM.
+        """
+
+    @property
+    def segment(self) -> Optional[ShmSegmentBase]:
+        """
+        Returns the segment of the current thread, None if it has not captured yet.
+        """
+        return getattr(self._local, "segment", None)
+
+    def capture(self, drawable: int, geometry: Box) -> Image:
+        """
+        Returns an Image of a region of a drawable.
+        With MIT-SHM the Image is backed by shared memory,
+        that is reused by the next capture of the thread with the same size.
+        Use Image.copy() to keep the Image.
+        """
+        if not self.available:
+            return self._get_image(drawable, geometry)
+
+        stats = self.stats
+        if stats is not None:
+            start = perf_counter_ns()
+
+        segment = self.segment
+        if segment is None or (segment.width, segment.height) != (geometry.width, geometry.height):
+            segment = self._local.segment = self._create_segment(geometry.width, geometry.height)
+            with self._lock:
+                self._segments.add(segment)
+
+        if not self._get_image_shm(drawable, geometry, segment):
+            return self._get_image(drawable, geometry)
+
+        if stats is not None:
+            stats.record("transfer", perf_counter_ns() - start)
+            stats.count("round_trips")
+            stats.count("bytes", segment.size)
+
+        return segment.get_image()
+
+    def release(self) -> None:
+        """
+        Releases the shared memory segments of all threads.
+        Images of previous captures must not be used after this.
+        """
+        with self._lock:
+            segments = list(self._segments)
+            self._segments.clear()
+        for segment in segments:
+            segment.release()
+        self._local = local()
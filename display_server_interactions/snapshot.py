@@ -0,0 +1,178 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+This module provides a columnar snapshot of the metadata of all windows
+and a diff between two snapshots.
+"""
+
+# built-in modules
+from array import array
+from time import time
+from typing import Iterator, NamedTuple, Optional, Sequence, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .window import WindowBase
+
+# the columns of a snapshot, numeric columns are arrays, name is a list
+COLUMNS = ("id", "name", "pid", "x", "y", "width", "height", "active", "mapped")
+
+
+class SnapshotDiff(NamedTuple):
+    """
+    The window ids that changed between two snapshots.
+    """
+    appeared: list[int]
+    disappeared: list[int]
+    moved: list[int]
+    renamed: list[int]
+
+
+class Snapshot:
+    """
+    The metadata of all windows at one point in time, stored by column.
+    A pid of -1 means that the window has no pid.
+    Use pandas.DataFrame(snapshot.to_dict()) or snapshot.to_numpy() for analysis.
+    """
+
+    __slots__ = ("timestamp", "columns")
+
+    def __init__(self, columns: dict, timestamp: Optional[float] = None) -> None:
+        self.columns = columns
+        # the wall clock time (time.time()) of the snapshot
+        self.timestamp = time() if timestamp is None else timestamp
+
+    @classmethod
+    def from_rows(
+        cls,
+        ids: Sequence[int],
+        names: Sequence[Optional[str]],
+        pids: Sequence[Optional[int]],
+        geometries: Sequence[tuple],
+        active: Optional[int],
+        mapped: Sequence[bool]
+    ) -> "Snapshot":
+        """
+        Creates a snapshot from per-window values, geometries are (x, y, width, height).
+        """
+        return cls({
+            "id": array("Q", ids),
+            "name": list(names),
+            "pid": array("q", (-1 if pid is None else pid for pid in pids)),
+            "x": array("l", (geometry[0] for geometry in geometries)),
+            "y": array("l", (geometry[1] for geometry in geometries)),
+            "width": array("l", (geometry[2] for geometry in geometries)),
+            "height": array("l", (geometry[3] for geometry in geometries)),
+            "active": array("b", (window_id == active for window_id in ids)),
+            "mapped": array("b", mapped),
+        })
+
+    @classmethod
+    def from_windows(
+        cls,
+        windows: Sequence["WindowBase"],
+        active: Optional["WindowBase"] = None
+    ) -> "Snapshot":
+        """
+        Creates a snapshot by reading the properties of every window one by one.
+        """
+        ids = [getattr(window, "xid", getattr(window, "window", None)) for window in windows]
+        active_id = None
+        if active is not None:
+            active_id = getattr(active, "xid", getattr(active, "window", None))
+        return cls.from_rows(
+            ids,
+            [window.name for window in windows],
+            [window.pid for window in windows],
+            [window.geometry for window in windows],
+            active_id,
+            [window.mapped for window in windows]
+        )
+
+    def __len__(self) -> int:
+        return len(self.columns["id"])
+
+    def __getitem__(self, column: str):
+        return self.columns[column]
+
+    def rows(self) -> Iterator[dict]:
+        """
+        Returns an iterator over the windows as dicts.
+        """
+        for values in zip(*(self.columns[column] for column in COLUMNS)):
+            yield dict(zip(COLUMNS, values))
+
+    def to_dict(self) -> dict:
+        """
+        Returns the columns as lists.
+        """
+        return {column: list(values) for column, values in self.columns.items()}
+
+    def to_numpy(self):
+        """
+        Returns a numpy record array with one record per window.
+        """
+        # pylint: disable-next=import-outside-toplevel
+        import numpy
+
+        names = self.columns["name"]
+        width = max((len(name) for name in names if name), default=1)
+        return numpy.rec.fromarrays(
+            [
+                numpy.array(["" if name is None else name for name in names], f"U{width}")
+                if column == "name"
+                else numpy.frombuffer(self.columns[column], self.columns[column].typecode)
+                for column in COLUMNS
+            ],
+            names=list(COLUMNS)
+        )
+
+    def diff(self, other: "Snapshot") -> SnapshotDiff:
+        """
+        Returns the changes from this snapshot to a newer snapshot.
+        """
+        return diff(self, other)
+
+    def __repr__(self) -> str:
+        return f"Snapshot(windows={len(self)}, timestamp={self.timestamp})"
+
+
+def diff(old: Snapshot, new: Snapshot) -> SnapshotDiff:
+    """
+    Returns the windows that appeared, disappeared, moved (position or size changed)
+    or were renamed between two snapshots.
+    """
+    def index(snapshot: Snapshot) -> dict:
+        columns = snapshot.columns
+        return {
+            window_id: (name, (x, y, width, height))
+            for window_id, name, x, y, width, height in zip(
+                columns["id"],
+                columns["name"],
+                columns["x"],
+                columns["y"],
+                columns["width"],
+                columns["height"]
+            )
+        }
+
+    old_windows = index(old)
+    new_windows = index(new)
+
+    moved = []
+    renamed = []
+    for window_id, (name, geometry) in new_windows.items():
+        previous = old_windows.get(window_id)
+        if previous is None:
+            continue
+        if previous[1] != geometry:
+            moved.append(window_id)
+        if previous[0] != name:
+            renamed.append(window_id)
+
+    return SnapshotDiff(
+        appeared=[window_id for window_id in new_windows if window_id not in old_windows],
+        disappeared=[window_id for window_id in old_windows if window_id not in new_windows],
+        moved=moved,
+        renamed=renamed
+    )
@@ -0,0 +1,307 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+This module provides opt-in instrumentation of the capture path:
+counters and HDR-style histograms of the time spent in each stage.
+
+Every thread records into its own shard, so recording needs no locks.
+The shards are only merged when the statistics are read.
+"""
+
+# built-in modules
+from contextlib import contextmanager
+from threading import Lock, local
+from time import monotonic, perf_counter_ns
+from typing import Callable, Iterator, Optional
+
+# number of sub-buckets per power of two is 2 ** SIGNIFICANT_BITS,
+# which keeps the relative error of a bucket below 2 ** -SIGNIFICANT_BITS
+SIGNIFICANT_BITS = 3
+SUB_BUCKETS = 1 << SIGNIFICANT_BITS
+
+# upper bounds (in seconds) of the exported buckets, 10µs to ~10s
+EXPORT_BOUNDS = tuple(0.00001 * 2 ** exponent for exponent in range(21))
+
+
+def bucket_index(value: int) -> int:
+    """
+    Returns the index of the histogram bucket of a non-negative integer value.
+    Values below 2 * SUB_BUCKETS have their own bucket,
+    bigger values share a bucket with up to 12.5% bigger values.
+    """
+    if value < SUB_BUCKETS:
+        return value
+    exponent = value.bit_length() - SIGNIFICANT_BITS - 1
+    return exponent * SUB_BUCKETS + (value >> exponent)
+
+
+def bucket_bounds(index: int) -> tuple[int, int]:
+    """
+    Returns the lowest and the highest value of a bucket.
+    """
+    if index < 2 * SUB_BUCKETS:
+        return index, index
+    exponent = index // SUB_BUCKETS - 1
+    lowest = (index % SUB_BUCKETS + SUB_BUCKETS) << exponent
+    return lowest, lowest + (1 << exponent) - 1
+
+
+class Histogram:
+    """
+    A histogram of non-negative integers (e.g. nanoseconds or bytes)
+    with logarithmic buckets, like an HDR histogram.
+    """
+
+    def __init__(self) -> None:
+        self.buckets = {}
+        self.count = 0
+        self.sum = 0
+        self.min = None
+        self.max = None
+
+    def record(self, value: int) -> None:
+        """
+        Records a value.
+        """
+        index = bucket_index(value)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.sum += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other: "Histogram") -> None:
+        """
+        Adds the values of another histogram to this histogram.
+        The other histogram may be recording in another thread at the same time.
+        """
+        # copying the dict is atomic, iterating over it is not
+        for index, count in other.buckets.copy().items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += other.count
+        self.sum += other.sum
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        if other.max is not None and (self.max is None or other.max > self.max):
+            self.max = other.max
+
+    @property
+    def mean(self) -> float:
+        """
+        Returns the mean of all values.
+        """
+        if self.count == 0:
+            return 0.0
+        return self.sum / self.count
+
+    def percentile(self, percent: float) -> int:
+        """
+        Returns the value below which the given percentage of values fall.
+        The result is the upper bound of the bucket, so it is at most 12.5% too high.
+        """
+        if self.count == 0:
+            return 0
+        rank = max(1, round(percent / 100 * self.count))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(bucket_bounds(index)[1], self.max)
+        return self.max
+
+    def cumulative_counts(self, bounds: tuple) -> list[int]:
+        """
+        Returns the number of values that are at most each of the bounds.
+        """
+        counts = [0] * len(bounds)
+        for index, count in self.buckets.items():
+            highest = bucket_bounds(index)[1]
+            for position, bound in enumerate(bounds):
+                if highest <= bound:
+                    counts[position] += count
+        return counts
+
+    def to_dict(self, scale: float = 1.0) -> dict:
+        """
+        Returns a summary of the histogram. All values are multiplied by scale.
+        """
+        return {
+            "count": self.count,
+            "sum": self.sum * scale,
+            "min": (self.min or 0) * scale,
+            "max": (self.max or 0) * scale,
+            "mean": self.mean * scale,
+            "p50": self.percentile(50) * scale,
+            "p90": self.percentile(90) * scale,
+            "p99": self.percentile(99) * scale,
+        }
+
+    def __repr__(self) -> str:
+        return f"Histogram(count={self.count}, mean={self.mean:.1f}, max={self.max})"
+
+
+class Shard:
+    """
+    The counters and histograms of a single thread.
+    """
+
+    def __init__(self) -> None:
+        self.counters = {}
+        self.histograms = {}
+
+
+class Instrumentation:
+    """
+    Collects counters and timing histograms.
+    Timings are recorded in nanoseconds and reported in seconds.
+
+    The X11 backend records:
+
+    * round_trips: number of requests that waited for a reply from the X server
+    * bytes: number of image bytes transferred from the X server
+    * geometry, property, transfer, copy and get_image: time histograms
+
+    You can record your own stages (e.g. conversion) with time().
+    """
+
+    # pylint: disable-next=redefined-builtin
+    def __init__(
+        self,
+        callback: Optional[Callable[[str], None]] = None,
+        format: str = "prometheus",
+        interval: float = 10.0
+    ) -> None:
+        self.callback = callback
+        self.format = format
+        self.interval = interval
+        self.shards = []
+        self._local = local()
+        self._lock = Lock()
+        self._next_export = monotonic() + interval
+
+    def shard(self) -> Shard:
+        """
+        Returns the shard of the current thread.
+        """
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = Shard()
+            # only taken once per thread
+            with self._lock:
+                self.shards.append(shard)
+        return shard
+
+    def count(self, name: str, value: int = 1) -> None:
+        """
+        Increments a counter.
+        """
+        counters = self.shard().counters
+        counters[name] = counters.get(name, 0) + value
+
+    def record(self, name: str, nanoseconds: int) -> None:
+        """
+        Records a duration in a histogram.
+        """
+        histograms = self.shard().histograms
+        histogram = histograms.get(name)
+        if histogram is None:
+            histogram = histograms[name] = Histogram()
+        histogram.record(nanoseconds)
+
+        if self.callback is not None and monotonic() >= self._next_export:
+            self._next_export = monotonic() + self.interval
+            self.callback(self.export(self.format))
+
+    @contextmanager
+    def time(self, name: str) -> Iterator[None]:
+        """
+        A context manager that records the time spent in its block.
+        """
+        start = perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.record(name, perf_counter_ns() - start)
+
+    def merged(self) -> Shard:
+        """
+        Returns a shard with the sum of all shards.
+        """
+        merged = Shard()
+        with self._lock:
+            shards = list(self.shards)
+        for shard in shards:
+            for name, value in shard.counters.copy().items():
+                merged.counters[name] = merged.counters.get(name, 0) + value
+            for name, histogram in shard.histograms.copy().items():
+                if name not in merged.histograms:
+                    merged.histograms[name] = Histogram()
+                merged.histograms[name].merge(histogram)
+        return merged
+
+    def reset(self) -> None:
+        """
+        Removes all recorded values.
+        """
+        with self._lock:
+            for shard in self.shards:
+                shard.counters.clear()
+                shard.histograms.clear()
+
+    def to_dict(self) -> dict:
+        """
+        Returns the counters and a summary (in seconds) of every histogram.
+        """
+        merged = self.merged()
+        return {
+            "counters": merged.counters,
+            "histograms": {
+                name: histogram.to_dict(1e-9)
+                for name, histogram in merged.histograms.items()
+            }
+        }
+
+    # pylint: disable-next=redefined-builtin
+    def export(self, format: str = "prometheus") -> str:
+        """
+        Returns the statistics in the Prometheus text format ("prometheus")
+        or in the OpenMetrics text format ("openmetrics").
+        """
+        if format not in ("prometheus", "openmetrics"):
+            raise ValueError(f"Invalid format '{format}'.")
+
+        merged = self.merged()
+        lines = []
+
+        for name, value in sorted(merged.counters.items()):
+            metric = f"dsi_{name}"
+            # OpenMetrics names the counter without the _total suffix of its sample
+            if format == "prometheus":
+                lines.append(f"# TYPE {metric}_total counter")
+            else:
+                lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}_total {value}")
+
+        for name, histogram in sorted(merged.histograms.items()):
+            metric = f"dsi_{name}_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            if format == "openmetrics":
+                lines.append(f"# UNIT {metric} seconds")
+            counts = histogram.cumulative_counts(
+                tuple(int(bound * 1e9) for bound in EXPORT_BOUNDS)
+            )
+            for bound, count in zip(EXPORT_BOUNDS, counts):
+                lines.append(f'{metric}_bucket{{le="{bound:g}"}} {count}')
+            lines.append(f'{metric}_bucket{{le="+Inf"}} {histogram.count}')
+            lines.append(f"{metric}_sum {histogram.sum * 1e-9:.9f}")
+            lines.append(f"{metric}_count {histogram.count}")
+
+        if format == "openmetrics":
+            lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def __repr__(self) -> str:
+        return f"Instrumentation(threads={len(self.shards)})"
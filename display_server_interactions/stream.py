@@ -0,0 +1,235 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+This module provides a stream that captures frames of a window at a fixed rate.
+"""
+
+# built-in modules
+from collections import deque
+from time import perf_counter, sleep, time
+from typing import Iterator, NamedTuple, Optional, TYPE_CHECKING
+from zlib import crc32
+
+# local modules
+from .image import Image
+from .box import Box
+
+if TYPE_CHECKING:
+    from .window import WindowBase
+
+
+class Frame(NamedTuple):
+    """
+    A captured frame.
+    The timestamp is the wall clock time (time.time()) at which the capture started.
+    """
+    index: int
+    timestamp: float
+    image: Image
+
+
+# rows per band of change_hashes()
+BAND_ROWS = 16
+# number of frames that the effective frame rate is measured over
+FPS_WINDOW = 32
+# weight of a new measurement in the moving average of the capture cost
+COST_SMOOTHING = 0.2
+
+
+def change_hashes(image: Image, rows: int = BAND_ROWS) -> list[int]:
+    """
+    Returns the CRC-32 of every band of rows of an image,
+    comparing the hashes of two frames tells if and where the content changed.
+    Only the pixels are hashed, not the padding at the end of the rows.
+    """
+    data = memoryview(image.data).cast("B")
+    if image.contiguous:
+        band = image.stride * rows
+        size = min(len(data), image.stride * image.height)
+        return [crc32(data[start:start + band]) for start in range(0, size, band)]
+
+    row_size = image.width * 4
+    hashes = []
+    for band_start in range(0, image.height, rows):
+        value = 0
+        for row in range(band_start, min(band_start + rows, image.height)):
+            start = row * image.stride
+            value = crc32(data[start:start + row_size], value)
+        hashes.append(value)
+    return hashes
+
+
+class CaptureStream:
+    """
+    Captures frames of a window at a fixed rate.
+    Iterate over the stream to get the frames.
+    If the capture falls behind the frame rate,
+    the missed frames are skipped and counted as dropped.
+    With skip_hidden, frames are not captured while the window is not visible
+    (unmapped, covered or off-screen), they are counted as skipped.
+
+    In adaptive mode, fps starts at the given rate and changes with the content:
+    it doubles (up to max_fps) after a frame that differs from the previous frame
+    and is multiplied by backoff (down to min_fps) after a frame that doesn't.
+    With cpu, the rate is also limited so that capturing takes at most
+    that fraction of the time, based on the measured cost of the captures.
+    """
+
+    # pylint: disable-next=too-many-arguments
+    def __init__(
+        self,
+        window: "WindowBase",
+        fps: float = 30.0,
+        geometry: Optional[Box] = None,
+        skip_hidden: bool = False,
+        adaptive: bool = False,
+        min_fps: float = 1.0,
+        max_fps: Optional[float] = None,
+        backoff: float = 0.8,
+        cpu: Optional[float] = None
+    ) -> None:
+        if fps <= 0:
+            raise ValueError(f"Invalid fps '{fps}'.")
+        if max_fps is not None and fps > max_fps:
+            raise ValueError(f"Invalid fps '{fps}', it is higher than max_fps '{max_fps}'.")
+        if adaptive and not 0 < min_fps <= (max_fps or fps):
+            raise ValueError(f"Invalid min_fps '{min_fps}'.")
+        if not 0 < backoff < 1:
+            raise ValueError(f"Invalid backoff '{backoff}'.")
+        self.window = window
+        # the current target frame rate, changes in adaptive mode
+        self.fps = fps
+        self.geometry = geometry
+        self.skip_hidden = skip_hidden
+        self.adaptive = adaptive
+        self.min_fps = min_fps
+        self.max_fps = fps if max_fps is None else max_fps
+        self.backoff = backoff
+        self.cpu = cpu
+        self.captured = 0
+        self.dropped = 0
+        self.skipped = 0
+        # frames that differed from the previous frame, only counted in adaptive mode
+        self.changed = 0
+        self._cost = None
+        self._hashes = None
+        self._timestamps = deque(maxlen=FPS_WINDOW)
+        self._stopped = False
+
+    @property
+    def effective_fps(self) -> float:
+        """
+        Returns the measured frame rate of the last frames.
+        """
+        timestamps = self._timestamps
+        if len(timestamps) < 2 or timestamps[-1] == timestamps[0]:
+            return 0.0
+        return (len(timestamps) - 1) / (timestamps[-1] - timestamps[0])
+
+    def _adapt(self, image: Image, start: float) -> None:
+        """
+        Changes the frame rate after a frame.
+        """
+        hashes = change_hashes(image)
+        changed = hashes != self._hashes
+        self._hashes = hashes
+
+        cost = perf_counter() - start
+        if self._cost is None:
+            self._cost = cost
+        else:
+            self._cost += COST_SMOOTHING * (cost - self._cost)
+
+        if changed:
+            self.changed += 1
+            fps = self.fps * 2
+        else:
+            fps = self.fps * self.backoff
+
+        limit = self.max_fps
+        if self.cpu is not None and self._cost > 0:
+            limit = min(limit, self.cpu / self._cost)
+        self.fps = max(self.min_fps, min(limit, fps))
+
+    def __iter__(self) -> Iterator[Frame]:
+        next_time = perf_counter()
+
+        while not self._stopped:
+            interval = 1 / self.fps
+            now = perf_counter()
+            if now < next_time:
+                sleep(next_time - now)
+            elif now - next_time >= interval:
+                # we are behind, skip the frames we missed
+                missed = int((now - next_time) / interval)
+                self.dropped += missed
+                next_time += missed * interval
+
+            if self.skip_hidden and not self.window.visible_region:
+                self.skipped += 1
+                next_time += interval
+                continue
+
+            timestamp = time()
+            start = perf_counter()
+            image = self.window.get_image(self.geometry)
+            if self._stopped:
+                break
+            self._timestamps.append(start)
+            if self.adaptive:
+                self._adapt(image, start)
+
+            frame = Frame(self.captured, timestamp, image)
+            self.captured += 1
+            # the rate of the next frame, it may have been changed by _adapt()
+            next_time += 1 / self.fps
+            yield frame
+
+    def dump(self, path: str, count: Optional[int] = None, duration: Optional[float] = None) -> int:
+        """
+        Writes the frames of the stream into a raw frame dump (see framedump)
+        until count frames were written, the duration has passed or the stream is stopped.
+        Returns the number of written frames.
+        """
+        # pylint: disable-next=import-outside-toplevel
+        from .framedump import FrameDumpWriter
+
+        end = None
+        if duration is not None:
+            end = perf_counter() + duration
+
+        writer = None
+        written = 0
+        try:
+            for frame in self:
+                if writer is None:
+                    writer = FrameDumpWriter(path, frame.image.width, frame.image.height)
+                writer.write_frame(frame)
+                written += 1
+                if count is not None and written >= count:
+                    break
+                if end is not None and perf_counter() >= end:
+                    break
+        finally:
+            if writer is not None:
+                writer.close()
+        return written
+
+    @property
+    def stopped(self) -> bool:
+        """
+        Returns True if the stream has been stopped.
+        """
+        return self._stopped
+
+    def stop(self) -> None:
+        """
+        Stops the stream.
+        The iteration ends after the frame that is currently being captured.
+        """
+        self._stopped = True
+
+    def __repr__(self) -> str:
+        # pylint: disable-next=line-too-long
+        return f"CaptureStream(fps={self.fps:g}, captured={self.captured}, dropped={self.dropped}, skipped={self.skipped})"
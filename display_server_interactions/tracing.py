@@ -0,0 +1,264 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+This module traces the calls into the native display server library.
+Every call is timed and counted per operation (e.g. get_all_windows)
+and classified as round-trip (waits for a reply of the server) or buffered.
+The trace can be saved in the Chrome trace event format (chrome://tracing, Perfetto).
+"""
+
+# built-in modules
+from contextlib import contextmanager
+from functools import wraps
+from json import dump
+from os import getpid
+from threading import Lock, get_ident, local
+from time import perf_counter_ns
+from typing import Callable, Iterator
+
+NO_OPERATION = "(no operation)"
+
+
+class OperationStats:
+    """
+    The calls made during an operation.
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.time = 0
+        self.round_trips = 0
+        self.buffered = 0
+        # function name -> [calls, nanoseconds]
+        self.functions = {}
+
+    def __repr__(self) -> str:
+        # pylint: disable-next=line-too-long
+        return f"OperationStats(count={self.count}, round_trips={self.round_trips}, buffered={self.buffered}, time={self.time / 1e6:.1f}ms)"
+
+
+class Tracer:
+    """
+    Traces calls into a native library.
+    A call is counted for every operation that is active in the calling thread.
+    """
+
+    def __init__(self, max_events: int = 1_000_000) -> None:
+        self.max_events = max_events
+        self.operations = {}
+        self.events = []
+        self.dropped_events = 0
+        self._local = local()
+        self._lock = Lock()
+        self._wrappers = {}
+        self._pid = getpid()
+
+    def _stack(self) -> list:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _stats(self, name: str) -> OperationStats:
+        stats = self.operations.get(name)
+        if stats is None:
+            stats = self.operations[name] = OperationStats()
+        return stats
+
+    def _event(self, name: str, category: str, start: int, end: int) -> None:
+        if len(self.events) >= self.max_events:
+            self.dropped_events += 1
+            return
+        self.events.append({
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": start / 1000,
+            "dur": (end - start) / 1000,
+            "pid": self._pid,
+            "tid": get_ident(),
+        })
+
+    @contextmanager
+    def operation(self, name: str) -> Iterator[None]:
+        """
+        A context manager that attributes all calls in its block to the operation.
+        """
+        stack = self._stack()
+        stack.append(name)
+        start = perf_counter_ns()
+        try:
+            yield
+        finally:
+            end = perf_counter_ns()
+            stack.pop()
+            with self._lock:
+                stats = self._stats(name)
+                stats.count += 1
+                stats.time += end - start
+                self._event(name, "operation", start, end)
+
+    def _record(self, name: str, round_trip: bool, start: int, end: int) -> None:
+        stack = self._stack()
+        with self._lock:
+            for operation in set(stack) if stack else (NO_OPERATION,):
+                stats = self._stats(operation)
+                if round_trip:
+                    stats.round_trips += 1
+                else:
+                    stats.buffered += 1
+                function = stats.functions.get(name)
+                if function is None:
+                    function = stats.functions[name] = [0, 0]
+                function[0] += 1
+                function[1] += end - start
+            self._event(name, "round-trip" if round_trip else "buffered", start, end)
+
+    def wrap(self, name: str, function: Callable, round_trip: bool) -> Callable:
+        """
+        Returns a wrapper of the function that traces its calls.
+        """
+        key = (name, id(function))
+        cached = self._wrappers.get(key)
+        if cached is not None:
+            return cached
+
+        @wraps(function)
+        def wrapper(*args):
+            start = perf_counter_ns()
+            try:
+                return function(*args)
+            finally:
+                self._record(name, round_trip, start, perf_counter_ns())
+
+        self._wrappers[key] = wrapper
+        return wrapper
+
+    def reset(self) -> None:
+        """
+        Removes all recorded calls and events.
+        """
+        with self._lock:
+            self.operations.clear()
+            self.events.clear()
+            self.dropped_events = 0
+
+    def report(self, functions: bool = False) -> str:
+        """
+        Returns a report with one line per operation, the slowest operations first.
+        e.g. "get_all_windows: 4,102 round-trips, 12 buffered calls, 380 ms (1 call)"
+        If functions is True, the calls of every function are listed below the operation.
+        """
+        with self._lock:
+            operations = sorted(
+                self.operations.items(),
+                key=lambda item: item[1].time,
+                reverse=True
+            )
+            lines = []
+            for name, stats in operations:
+                calls = "call" if stats.count == 1 else "calls"
+                lines.append(
+                    # pylint: disable-next=line-too-long
+                    f"{name}: {stats.round_trips:,} round-trips, {stats.buffered:,} buffered calls, {stats.time / 1e6:,.0f} ms ({stats.count:,} {calls})"
+                )
+                if functions:
+                    for function, (count, time) in sorted(
+                        stats.functions.items(),
+                        key=lambda item: item[1][1],
+                        reverse=True
+                    ):
+                        lines.append(f"    {function}: {count:,} calls, {time / 1e6:,.1f} ms")
+        return "\n".join(lines)
+
+    def chrome_trace(self) -> dict:
+        """
+        Returns the trace in the Chrome trace event format.
+        """
+        with self._lock:
+            return {
+                "traceEvents": list(self.events),
+                "displayTimeUnit": "ms",
+            }
+
+    def save(self, path: str) -> None:
+        """
+        Saves the trace as Chrome trace event JSON.
+        Open it with chrome://tracing or https://ui.perfetto.dev.
+        """
+        with open(path, "w", encoding="utf-8") as file:
+            dump(self.chrome_trace(), file)
+
+    def __repr__(self) -> str:
+        return f"Tracer(operations={len(self.operations)}, events={len(self.events)})"
+
+
+def traced_by(attribute: str) -> Callable:
+    """
+    Returns a decorator for methods of classes, whose attribute (e.g. "xlib") is a traced Library.
+    If tracing is enabled, the method runs as an operation of the Tracer,
+    so the native calls it makes are reported under its name.
+    """
+    def traced(method: Callable) -> Callable:
+        name = method.__name__
+
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            tracer = getattr(self, attribute).tracer
+            if tracer is None:
+                return method(self, *args, **kwargs)
+            with tracer.operation(name):
+                return method(self, *args, **kwargs)
+
+        return wrapper
+
+    return traced
+
+
+class TracingMixin:
+    """
+    Adds enable_tracing, disable_tracing and trace to a DSI.
+    The DSI returns the libraries to trace from _libraries(),
+    traced_attribute names the attribute whose tracer trace() uses.
+    """
+
+    traced_attribute = ""
+
+    def _libraries(self) -> list:
+        """
+        Returns the loaded libraries, whose calls are traced.
+        """
+        raise NotImplementedError
+
+    def enable_tracing(self, max_events: int = 1_000_000) -> Tracer:
+        """
+        Enables tracing of all calls into the native libraries and returns the Tracer.
+        Use Tracer.report() for a per-operation summary
+        and Tracer.save() to write a Chrome trace.
+        At most max_events calls are kept for the Chrome trace.
+        """
+        tracer = Tracer(max_events)
+        for library in self._libraries():
+            library.tracer = tracer
+        return tracer
+
+    def disable_tracing(self) -> None:
+        """
+        Disables tracing.
+        """
+        for library in self._libraries():
+            library.tracer = None
+
+    @contextmanager
+    def trace(self, name: str) -> Iterator[None]:
+        """
+        A context manager that reports the native calls in its block
+        as an operation with the given name, if tracing is enabled.
+        """
+        tracer = getattr(self, self.traced_attribute).tracer
+        if tracer is None:
+            yield
+            return
+        with tracer.operation(name):
+            yield
@@ -0,0 +1,387 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+This module provides a Wayland backend that captures the screen
+through the ScreenCast interface of xdg-desktop-portal and a PipeWire stream.
+
+The portal asks the user which monitors may be captured, when the first frame is requested.
+Wayland does not expose the windows of other clients,
+so get_all_windows() is empty and get_active_window() returns None.
+
+Needs jeepney (D-Bus) and PyGObject with the GStreamer PipeWire plugin (pipewiresrc).
+"""
+
+# built-in modules
+from ctypes import c_ubyte
+from os import close as close_fd
+from secrets import token_hex
+from typing import Optional, Union
+from weakref import finalize
+
+# local modules
+from .base import DSIBase
+from .window import WindowBase
+from .image import Image
+from .box import Box
+from .monitor import Monitor
+from .stream import CaptureStream
+
+PORTAL_BUS_NAME = "org.freedesktop.portal.Desktop"
+PORTAL_PATH = "/org/freedesktop/portal/desktop"
+SCREENCAST_INTERFACE = "org.freedesktop.portal.ScreenCast"
+REQUEST_INTERFACE = "org.freedesktop.portal.Request"
+SESSION_INTERFACE = "org.freedesktop.portal.Session"
+
+# https://flatpak.github.io/xdg-desktop-portal/docs/doc-org.freedesktop.portal.ScreenCast.html
+SOURCE_TYPE_MONITOR = 1
+SOURCE_TYPE_WINDOW = 2
+CURSOR_MODE_HIDDEN = 1
+CURSOR_MODE_EMBEDDED = 2
+
+# seconds to wait for the first frame of a stream
+FIRST_FRAME_TIMEOUT = 5.0
+
+
+class PortalError(Exception):
+    """
+    Raised if the portal denies or fails a request, e.g. if the user cancels the dialog.
+    """
+
+
+class ScreenCastPortal:
+    """
+    A ScreenCast session of xdg-desktop-portal.
+    """
+
+    def __init__(self) -> None:
+        try:
+            # pylint: disable=import-outside-toplevel
+            from jeepney import DBusAddress
+            from jeepney.io.blocking import open_dbus_connection
+            # pylint: enable=import-outside-toplevel
+        except ImportError as error:
+            raise ImportError("jeepney is required for the Wayland backend.") from error
+
+        self.connection = open_dbus_connection(bus="SESSION", enable_fds=True)
+        self.portal = DBusAddress(
+            PORTAL_PATH,
+            bus_name=PORTAL_BUS_NAME,
+            interface=SCREENCAST_INTERFACE
+        )
+        self.session_handle = None
+
+    def _request(self, method: str, signature: str, *args, options: dict) -> dict:
+        """
+        Calls a method of the portal that answers with a Response signal
+        and returns the results of the response.
+        """
+        # pylint: disable=import-outside-toplevel
+        from jeepney import MatchRule, new_method_call
+        from jeepney.bus_messages import message_bus
+        # pylint: enable=import-outside-toplevel
+
+        token = f"dsi_{token_hex(8)}"
+        options = dict(options, handle_token=("s", token))
+        sender = self.connection.unique_name[1:].replace(".", "_")
+        rule = MatchRule(
+            type="signal",
+            interface=REQUEST_INTERFACE,
+            member="Response",
+            path=f"{PORTAL_PATH}/request/{sender}/{token}"
+        )
+
+        # subscribe before calling, the response may be sent before the call returns
+        self.connection.send_and_get_reply(message_bus.AddMatch(rule))
+        with self.connection.filter(rule) as queue:
+            self.connection.send_and_get_reply(
+                new_method_call(self.portal, method, signature + "a{sv}", (*args, options))
+            )
+            response, results = self.connection.recv_until_filtered(queue).body
+
+        if response != 0:
+            raise PortalError(f"{method} failed (response {response}).")
+        return {name: value for name, (_, value) in results.items()}
+
+    def start(
+        self,
+        source_types: int = SOURCE_TYPE_MONITOR,
+        cursor_mode: int = CURSOR_MODE_EMBEDDED
+    ) -> list[tuple[int, Box]]:
+        """
+        Creates a session, lets the user select the sources and starts the session.
+        Returns the PipeWire node id and the geometry of every stream.
+        """
+        results = self._request(
+            "CreateSession", "",
+            options={"session_handle_token": ("s", f"dsi_{token_hex(8)}")}
+        )
+        self.session_handle = results["session_handle"]
+
+        self._request(
+            "SelectSources", "o", self.session_handle,
+            options={
+                "types": ("u", source_types),
+                "multiple": ("b", True),
+                "cursor_mode": ("u", cursor_mode),
+            }
+        )
+
+        results = self._request("Start", "os", self.session_handle, "", options={})
+
+        streams = []
+        for node_id, properties in results.get("streams", []):
+            properties = {name: value for name, (_, value) in properties.items()}
+            x, y = properties.get("position", (0, 0))
+            width, height = properties.get("size", (0, 0))
+            streams.append((node_id, Box(x, y, width, height)))
+        return streams
+
+    def open_pipewire_remote(self) -> int:
+        """
+        Returns a file descriptor of a PipeWire connection that can only see the session's streams.
+        """
+        # pylint: disable-next=import-outside-toplevel
+        from jeepney import new_method_call
+
+        reply = self.connection.send_and_get_reply(
+            new_method_call(
+                self.portal,
+                "OpenPipeWireRemote",
+                "oa{sv}",
+                (self.session_handle, {})
+            )
+        )
+        return reply.body[0].to_raw_fd()
+
+    def close(self) -> None:
+        """
+        Closes the session and the D-Bus connection.
+        """
+        # pylint: disable-next=import-outside-toplevel
+        from jeepney import DBusAddress, new_method_call
+
+        if self.session_handle is not None:
+            session = DBusAddress(
+                self.session_handle,
+                bus_name=PORTAL_BUS_NAME,
+                interface=SESSION_INTERFACE
+            )
+            self.connection.send(new_method_call(session, "Close"))
+            self.session_handle = None
+        self.connection.close()
+
+
+class MappedSample:
+    """
+    Keeps a GStreamer buffer mapped as long as an Image uses its memory.
+    """
+
+    def __init__(self, buffer, map_info) -> None:
+        # unmapped when the sample and all Images that use it are garbage collected
+        self._finalizer = finalize(self, buffer.unmap, map_info)
+
+
+class PipeWireStream:
+    """
+    Receives the frames of a PipeWire node with GStreamer (pipewiresrc ! appsink).
+    Only the newest frame is kept, older frames are dropped.
+    Screencasts only send a frame when the content changed,
+    so get_image() returns the last frame again if there is no new one.
+    """
+
+    def __init__(self, fd: int, node_id: int, geometry: Box) -> None:
+        try:
+            # pylint: disable=import-outside-toplevel
+            import gi
+            gi.require_version("Gst", "1.0")
+            from gi.repository import Gst
+            # pylint: enable=import-outside-toplevel
+        except (ImportError, ValueError) as error:
+            raise ImportError(
+                "PyGObject with GStreamer is required for the Wayland backend."
+            ) from error
+
+        Gst.init(None)
+        self.gst = Gst
+        self.node_id = node_id
+        self._geometry = geometry
+        self.image = None
+        self.pipeline = Gst.parse_launch(
+            f"pipewiresrc fd={fd} path={node_id} always-copy=false do-timestamp=true "
+            # the same pixel layout as X11 and Windows
+            "! videoconvert ! video/x-raw,format=BGRx "
+            "! appsink name=sink max-buffers=1 drop=true sync=false"
+        )
+        self.sink = self.pipeline.get_by_name("sink")
+        self.pipeline.set_state(Gst.State.PLAYING)
+
+    @property
+    def geometry(self) -> Box:
+        """
+        Returns the geometry of the stream in screen coordinates.
+        """
+        return self._geometry
+
+    def _pull(self, timeout: float) -> Optional[Image]:
+        sample = self.sink.emit("try-pull-sample", int(timeout * 1e9))
+        if sample is None:
+            return None
+
+        structure = sample.get_caps().get_structure(0)
+        width = structure.get_value("width")
+        height = structure.get_value("height")
+        if not self._geometry.width:
+            self._geometry = Box(self._geometry.x, self._geometry.y, width, height)
+
+        buffer = sample.get_buffer()
+        # a writable mapping can be wrapped without a copy
+        success, map_info = buffer.map(self.gst.MapFlags.READ | self.gst.MapFlags.WRITE)
+        if success:
+            data = (c_ubyte * map_info.size).from_buffer(map_info.data)
+            # keep the buffer mapped as long as the data is used
+            data.sample = MappedSample(buffer, map_info)
+            data = memoryview(data).cast("B")
+        else:
+            success, map_info = buffer.map(self.gst.MapFlags.READ)
+            if not success:
+                raise RuntimeError("Failed to map the frame.")
+            data = bytearray(map_info.data)
+            buffer.unmap(map_info)
+
+        return Image(data, width, height, len(data) // height)
+
+    def get_image(self, geometry: Optional[Box] = None) -> Image:
+        """
+        Returns the newest frame of the stream.
+        With the geometry parameter (in screen coordinates)
+        you can specify a sub-region that will be cropped out without a copy.
+        """
+        image = self._pull(0 if self.image is not None else FIRST_FRAME_TIMEOUT)
+        if image is not None:
+            self.image = image
+        elif self.image is None:
+            raise TimeoutError(f"PipeWire node {self.node_id} sent no frame.")
+
+        if geometry is None:
+            return self.image
+        return self.image.crop(Box(
+            geometry.x - self._geometry.x,
+            geometry.y - self._geometry.y,
+            geometry.width,
+            geometry.height
+        ))
+
+    def stop(self) -> None:
+        """
+        Stops the stream.
+        """
+        self.pipeline.set_state(self.gst.State.NULL)
+        self.image = None
+
+
+# Wayland doesn't expose the windows of other clients, so there are no window events
+# pylint: disable-next=abstract-method
+class DSI(DSIBase):
+    """
+    Main DSI class of the Wayland backend
+    """
+
+    def __init__(
+        self,
+        source_types: int = SOURCE_TYPE_MONITOR,
+        cursor_mode: int = CURSOR_MODE_EMBEDDED
+    ) -> None:
+        self.source_types = source_types
+        self.cursor_mode = cursor_mode
+        self.portal = ScreenCastPortal()
+        self._streams = None
+        self._fd = None
+
+    @property
+    def streams(self) -> list[PipeWireStream]:
+        """
+        Returns the streams of the ScreenCast session.
+        The session is started on first use, which asks the user for permission.
+        """
+        if self._streams is None:
+            nodes = self.portal.start(self.source_types, self.cursor_mode)
+            self._fd = self.portal.open_pipewire_remote()
+            self._streams = [
+                PipeWireStream(self._fd, node_id, geometry)
+                for node_id, geometry in nodes
+            ]
+        return self._streams
+
+    def get_active_window(self) -> Optional[WindowBase]:
+        """
+        Wayland does not expose the windows of other clients, so this returns None.
+        """
+        return None
+
+    def get_all_windows(self) -> list:
+        """
+        Wayland does not expose the windows of other clients, so this returns an empty list.
+        """
+        return []
+
+    def get_monitors(self) -> list:
+        return [
+            Monitor(f"pipewire-{stream.node_id}", index == 0, stream.geometry)
+            for index, stream in enumerate(self.streams)
+        ]
+
+    def get_screen_geometry(self) -> Box:
+        geometries = [stream.geometry for stream in self.streams]
+        left = min(geometry.x for geometry in geometries)
+        top = min(geometry.y for geometry in geometries)
+        right = max(geometry.x + geometry.width for geometry in geometries)
+        bottom = max(geometry.y + geometry.height for geometry in geometries)
+        return Box(left, top, right - left, bottom - top)
+
+    def _stream_of(self, geometry: Box) -> PipeWireStream:
+        for stream in self.streams:
+            source = stream.geometry
+            if (
+                source.x <= geometry.x
+                and source.y <= geometry.y
+                and geometry.x + geometry.width <= source.x + source.width
+                and geometry.y + geometry.height <= source.y + source.height
+            ):
+                return stream
+        raise ValueError(f"{geometry} is not inside of a single stream.")
+
+    def capture_screen(self, geometry: Box) -> Image:
+        """
+        Returns an Image of a region of the screen, the region must be inside of one monitor.
+        The Image is backed by the memory of the PipeWire buffer if it can be mapped writable,
+        nothing is copied.
+        """
+        return self._stream_of(geometry).get_image(geometry)
+
+    def stream(
+        self,
+        fps: float = 30.0,
+        monitor: Optional[Union[Monitor, int]] = None
+    ) -> CaptureStream:
+        """
+        Returns a CaptureStream of a monitor (the first monitor by default).
+        The monitor can be a Monitor or its index in get_monitors().
+        """
+        if monitor is None:
+            monitor = 0
+        if isinstance(monitor, int):
+            return CaptureStream(self.streams[monitor], fps)
+        return CaptureStream(self._stream_of(monitor.geometry), fps)
+
+    def close(self) -> None:
+        """
+        Stops the streams and closes the ScreenCast session.
+        """
+        for stream in self._streams or ():
+            stream.stop()
+        self._streams = None
+        if self._fd is not None:
+            close_fd(self._fd)
+            self._fd = None
+        self.portal.close()
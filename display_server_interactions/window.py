@@ -7,18 +7,34 @@ This module provides a class for interacting with windows
 
 # built-in modules
 from abc import ABCMeta, abstractmethod
-from typing import Optional
+from typing import NamedTuple, Optional
 
 # local modules
 from .image import Image
 from .buttons import MouseButtons
 from .box import Box
+from .region import Region
+from .stream import CaptureStream
+from .recorder import Recorder
+
+
+class FrameExtents(NamedTuple):
+    """
+    The widths of the frame that the window manager draws around a window.
+    """
+    left: int
+    right: int
+    top: int
+    bottom: int
 
 
 class WindowBase(metaclass=ABCMeta):
     """
     An abstract base class that defines the interface for interacting with a window.
     """
+
+    __slots__ = ()
+
     @property
     @abstractmethod
     def name(self) -> str:
@@ -50,6 +66,38 @@ class WindowBase(metaclass=ABCMeta):
         Returns: tuple: (x, y, width, height)
         """
 
+    @property
+    def absolute_geometry(self) -> Box:
+        """
+        Returns the geometry of the window in screen coordinates.
+        """
+        return self.geometry
+
+    @property
+    def frame_extents(self) -> Optional[FrameExtents]:
+        """
+        Returns the extents of the window manager's frame around the window.
+        Returns None if the window has no frame.
+        """
+        return None
+
+    @property
+    def visible_region(self) -> Region:
+        """
+        Returns the part of the window (in screen coordinates)
+        that is not covered by other windows, empty if the window is not visible.
+        """
+        if not self.mapped:
+            return Region()
+        return Region([self.absolute_geometry])
+
+    @property
+    def mapped(self) -> bool:
+        """
+        Returns True if the window is mapped (shown).
+        """
+        return True
+
     @abstractmethod
     def get_image(self, geometry: Optional[Box] = None) -> Image:
         # pylint: disable=line-too-long
@@ -86,6 +134,46 @@ class WindowBase(metaclass=ABCMeta):
         On some windows/applications you need to move the pointer with warp_pointer() first.
         """
 
+    def stream(
+        self,
+        fps: float = 30.0,
+        geometry: Optional[Box] = None,
+        skip_hidden: bool = False,
+        **options
+    ) -> CaptureStream:
+        """
+        Returns a CaptureStream that captures the window at the given frame rate.
+        With skip_hidden, no frames are captured while the window is not visible.
+        The options are passed to the CaptureStream,
+        e.g. adaptive=True, min_fps and max_fps to adapt the rate to the content.
+        """
+        return CaptureStream(self, fps, geometry, skip_hidden, **options)
+
+    # pylint: disable-next=too-many-arguments
+    def record(
+        self,
+        path: str,
+        fps: float = 30.0,
+        codec: str = "libx264",
+        geometry: Optional[Box] = None,
+        backend: str = "ffmpeg",
+        duration: Optional[float] = None
+    ) -> Recorder:
+        """
+        Starts recording the window into a video file and returns the Recorder.
+        Call stop() on the Recorder to finish the recording and get its statistics.
+        The backend can be "ffmpeg" (a local ffmpeg process) or "pyav".
+        """
+        return Recorder(
+            self,
+            path,
+            fps=fps,
+            codec=codec,
+            geometry=geometry,
+            backend=backend,
+            duration=duration
+        ).start()
+
     def __repr__(self) -> str:
         # pylint: disable=line-too-long
         name = self.name
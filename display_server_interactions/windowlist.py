@@ -0,0 +1,54 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+This module provides a list of windows that only stores their ids.
+"""
+
+# built-in modules
+from array import array
+from collections.abc import Sequence
+from typing import Callable, Iterator, Union, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .window import WindowBase
+
+
+class WindowList(Sequence):
+    """
+    A read-only list of windows, that stores the window ids (XIDs or HWNDs) in an array.
+    The Window objects are only created when they are accessed,
+    so enumerating thousands of windows allocates a single array.
+    """
+
+    __slots__ = ("ids", "factory")
+
+    def __init__(self, ids: array, factory: Callable[[int], "WindowBase"]) -> None:
+        self.ids = ids
+        # creates the Window of an id
+        self.factory = factory
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union["WindowBase", "WindowList"]:
+        if isinstance(index, slice):
+            return WindowList(self.ids[index], self.factory)
+        return self.factory(self.ids[index])
+
+    def __iter__(self) -> Iterator["WindowBase"]:
+        factory = self.factory
+        for window_id in self.ids:
+            yield factory(window_id)
+
+    def __contains__(self, window) -> bool:
+        """
+        Accepts a window id or a Window.
+        """
+        if not isinstance(window, int):
+            # linux and xcb windows have an xid, windows windows a window handle
+            window = getattr(window, "xid", getattr(window, "window", None))
+        return window in self.ids
+
+    def __repr__(self) -> str:
+        return f"WindowList(windows={len(self.ids)})"
@@ -6,6 +6,7 @@ All Windows specific DSI functions
 """
 
 # built-in modules
+from array import array
 from typing import Optional
 from ctypes import (
     windll,
@@ -18,9 +19,13 @@ from ctypes.wintypes import (
     DWORD,
     BOOL,
     HWND,
-    LPARAM
+    HDC,
+    HMONITOR,
+    LPARAM,
+    WCHAR
 )
 from ctypes import (
+    POINTER,
     byref,
     create_unicode_buffer,
     sizeof
@@ -32,6 +37,8 @@ from .window import WindowBase
 from .image import Image
 from .buttons import MouseButtons
 from .box import Box
+from .monitor import Monitor
+from .windowlist import WindowList
 
 user32 = windll.user32
 gdi32 = windll.gdi32
@@ -44,6 +51,15 @@ SRCCOPY = 0x00CC0020
 WM_CHAR = 0x0102
 WM_KEYDOWN = 0x0100
 WM_KEYUP = 0x0101
+
+# https://learn.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-getsystemmetrics
+SM_XVIRTUALSCREEN = 76
+SM_YVIRTUALSCREEN = 77
+SM_CXVIRTUALSCREEN = 78
+SM_CYVIRTUALSCREEN = 79
+
+# https://learn.microsoft.com/en-us/windows/win32/api/winuser/ns-winuser-monitorinfo
+MONITORINFOF_PRIMARY = 1
 # pylint: disable=too-few-public-methods
 
 # https://learn.microsoft.com/de-de/windows/win32/inputdev/virtual-key-codes
@@ -219,14 +235,78 @@ class RECT(Structure):
         ("bottom", c_long)
     ]
 
+
+class MONITORINFOEXW(Structure):
+    """
+    https://learn.microsoft.com/en-us/windows/win32/api/winuser/ns-winuser-monitorinfoexw
+    """
+    _fields_ = [
+        ("cbSize", DWORD),
+        ("rcMonitor", RECT),
+        ("rcWork", RECT),
+        ("dwFlags", DWORD),
+        ("szDevice", WCHAR * 32)
+    ]
+
 # pylint: enable=too-few-public-methods
 
 
+def get_image(window, geometry: Box) -> Image:
+    """
+    Returns an Image of a region of a window.
+    The geometry is relative to the window.
+    With window None the region is taken from the screen.
+    """
+    wdc = user32.GetDC(window)
+
+    # adjust the bitmap size
+    data_bitmap = gdi32.CreateCompatibleBitmap(
+        wdc,
+        geometry.width,
+        geometry.height
+    )
+
+    # get the window image data
+    dc_object = gdi32.CreateCompatibleDC(None)
+    gdi32.SelectObject(dc_object, data_bitmap)
+    gdi32.BitBlt(
+        dc_object,
+        0,
+        0,
+        geometry.width,
+        geometry.height,
+        wdc,
+        geometry.x,
+        geometry.y,
+        SRCCOPY
+    )
+
+    # convert the raw data into a format opencv can read
+    signed_ints_array = create_string_buffer(
+        geometry.width * geometry.height * 4
+    )
+    gdi32.GetBitmapBits(
+        data_bitmap,
+        geometry.width * geometry.height * 4,
+        signed_ints_array
+    )
+    img = Image(signed_ints_array, geometry.width, geometry.height)
+
+    # free resources
+    gdi32.DeleteObject(data_bitmap)
+    gdi32.DeleteDC(dc_object)
+    user32.ReleaseDC(window, wdc)
+
+    return img
+
+
 class Window(WindowBase):
     """
     An class for interacting with a window on Windows.
     """
 
+    __slots__ = ("window",)
+
     def __init__(self, window) -> None:
         self.window = window
 
@@ -264,51 +344,24 @@ class Window(WindowBase):
             height=rect.bottom - rect.top
         )
 
+    @property
+    def mapped(self) -> bool:
+        return bool(user32.IsWindowVisible(self.window))
+
     def get_image(self, geometry: Optional[Box] = None):
         if geometry is None:
             geometry = self.geometry
 
-        wdc = user32.GetDC(self.window)
-
-        # adjust the bitmap size
-        data_bitmap = gdi32.CreateCompatibleBitmap(
-            wdc,
-            geometry.width,
-            geometry.height
-        )
-
-        # get the window image data
-        dc_object = gdi32.CreateCompatibleDC(None)
-        gdi32.SelectObject(dc_object, data_bitmap)
-        gdi32.BitBlt(
-            dc_object,
-            0,
-            0,
-            geometry.width,
-            geometry.height,
-            wdc,
-            geometry.x - self.geometry.x,
-            geometry.y - self.geometry.y,
-            SRCCOPY
-        )
-
-        # convert the raw data into a format opencv can read
-        signed_ints_array = create_string_buffer(
-            geometry.width * geometry.height * 4
-        )
-        gdi32.GetBitmapBits(
-            data_bitmap,
-            geometry.width * geometry.height * 4,
-            signed_ints_array
+        window_geometry = self.geometry
+        return get_image(
+            self.window,
+            Box(
+                geometry.x - window_geometry.x,
+                geometry.y - window_geometry.y,
+                geometry.width,
+                geometry.height
+            )
         )
-        img = Image(signed_ints_array, geometry.width, geometry.height)
-
-        # free resources
-        gdi32.DeleteObject(data_bitmap)
-        gdi32.DeleteDC(dc_object)
-        user32.ReleaseDC(self.window, wdc)
-
-        return img
 
     def send_chr(self, character: chr) -> None:
         vk = vk_map.get(character.lower())
@@ -408,6 +461,8 @@ class Window(WindowBase):
             raise ValueError(f"Invalid button code '{button}'.")
 
 
+# on, off and events of DSIBase raise NotImplementedError on Windows
+# pylint: disable-next=abstract-method
 class DSI(DSIBase):
     """
     Main DSI class
@@ -420,14 +475,50 @@ class DSI(DSIBase):
         # GetDesktopWindow
         return Window(user32.GetForegroundWindow())
 
-    def get_all_windows(self) -> list[WindowBase]:
-        windows = []
+    def get_all_windows(self) -> WindowList:
+        # array "Q" can hold a HWND
+        hwnds = array("Q")
 
         @WINFUNCTYPE(BOOL, HWND, LPARAM)
         def callback(hwnd, _unused):
-            windows.append(Window(hwnd))
+            hwnds.append(hwnd)
             return True
 
         user32.EnumWindows(callback)
 
-        return windows
+        return WindowList(hwnds, Window)
+
+    def get_monitors(self) -> list[Monitor]:
+        monitors = []
+
+        @WINFUNCTYPE(BOOL, HMONITOR, HDC, POINTER(RECT), LPARAM)
+        def callback(hmonitor, _hdc, _rect, _unused):
+            info = MONITORINFOEXW()
+            info.cbSize = sizeof(MONITORINFOEXW)
+            user32.GetMonitorInfoW(hmonitor, byref(info))
+            monitors.append(Monitor(
+                info.szDevice,
+                bool(info.dwFlags & MONITORINFOF_PRIMARY),
+                Box(
+                    x=info.rcMonitor.left,
+                    y=info.rcMonitor.top,
+                    width=info.rcMonitor.right - info.rcMonitor.left,
+                    height=info.rcMonitor.bottom - info.rcMonitor.top
+                )
+            ))
+            return True
+
+        user32.EnumDisplayMonitors(None, None, callback, 0)
+
+        return monitors
+
+    def get_screen_geometry(self) -> Box:
+        return Box(
+            x=user32.GetSystemMetrics(SM_XVIRTUALSCREEN),
+            y=user32.GetSystemMetrics(SM_YVIRTUALSCREEN),
+            width=user32.GetSystemMetrics(SM_CXVIRTUALSCREEN),
+            height=user32.GetSystemMetrics(SM_CYVIRTUALSCREEN)
+        )
+
+    def capture_screen(self, geometry: Box) -> Image:
+        return get_image(None, geometry)
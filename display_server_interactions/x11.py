@@ -0,0 +1,855 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+The Xlib structures, constants and the bindings of Xlib and its extensions,
+that the X11 backend uses.
+"""
+
+# built-in modules
+from typing import Optional
+from logging import getLogger, CRITICAL, Logger
+from weakref import finalize
+from ctypes.util import find_library
+from ctypes import cdll
+from ctypes import (
+    POINTER,
+    c_char_p,
+    c_int,
+    c_long,
+    c_ubyte,
+    c_ulong,
+    Structure,
+    c_int32,
+    c_uint,
+    c_void_p,
+    c_uint32,
+    Union,
+    CFUNCTYPE
+)
+
+# local modules
+from .window import FrameExtents
+from .tracing import Tracer
+
+# Setup Xlib Structures
+
+# pylint: disable=too-few-public-methods
+
+PLAINMASK = 0x00FFFFFF
+ZPIXMAP = 2
+
+
+class Display(Structure):
+    """
+    https://tronche.com/gui/x/xlib/display/opening.html#Display\n
+    /usr/include/X11/Xlib.h: 487
+    """
+
+
+class XImage(Structure):
+    """
+    https://tronche.com/gui/x/xlib/graphics/images.html#XImage\n
+    /usr/include/X11/Xlib.h: 360-394
+    """
+
+    _fields_ = [
+        ('width', c_int),
+        ('height', c_int),
+        ('xoffset', c_int),
+        ('format', c_int),
+        ('data', c_void_p),
+        ('byte_order', c_int),
+        ('bitmap_unit', c_int),
+        ('bitmap_bit_order', c_int),
+        ('bitmap_pad', c_int),
+        ('depth', c_int),
+        ('bytes_per_line', c_int),
+        ('bits_per_pixel', c_int),
+        ('red_mask', c_ulong),
+        ('green_mask', c_ulong),
+        ('blue_mask', c_ulong)
+    ]
+
+
+class XWindowAttributes(Structure):
+    """
+    https://tronche.com/gui/x/xlib/window-information/XGetWindowAttributes.html\n
+    /usr/include/X11/Xlib.h: 308-334
+    """
+
+    _fields_ = [
+        ("x", c_int32),
+        ("y", c_int32),
+        ("width", c_int32),
+        ("height", c_int32),
+        ("border_width", c_int32),
+        ("depth", c_int32),
+        ("visual", c_ulong),
+        ("root", c_ulong),
+        ("class", c_int32),
+        ("bit_gravity", c_int32),
+        ("win_gravity", c_int32),
+        ("backing_store", c_int32),
+        ("backing_planes", c_ulong),
+        ("backing_pixel", c_ulong),
+        ("save_under", c_int32),
+        ("colourmap", c_ulong),
+        ("mapinstalled", c_uint32),
+        ("map_state", c_uint32),
+        ("all_event_masks", c_ulong),
+        ("your_event_mask", c_ulong),
+        ("do_not_propagate_mask", c_ulong),
+        ("override_redirect", c_int32),
+        ("screen", c_ulong)
+    ]
+
+
+class XShmSegmentInfo(Structure):
+    """
+    https://www.x.org/releases/current/doc/xextproto/shm.html\n
+    /usr/include/X11/extensions/XShm.h: 85-90
+    """
+
+    _fields_ = [
+        ("shmseg", c_ulong),  # ShmSeg (XID)
+        ("shmid", c_int),
+        ("shmaddr", c_void_p),
+        ("readOnly", c_int),
+    ]
+
+
+class XRRMonitorInfo(Structure):
+    """
+    https://www.x.org/releases/current/doc/randrproto/randrproto.txt\n
+    /usr/include/X11/extensions/Xrandr.h: 572-584
+    """
+
+    _fields_ = [
+        ("name", c_ulong),  # Atom
+        ("primary", c_int),
+        ("automatic", c_int),
+        ("noutput", c_int),
+        ("x", c_int),
+        ("y", c_int),
+        ("width", c_int),
+        ("height", c_int),
+        ("mwidth", c_int),
+        ("mheight", c_int),
+        ("outputs", POINTER(c_ulong)),  # RROutput (XID)
+    ]
+
+
+class NetFrameExtents(Structure):
+    """
+    https://specifications.freedesktop.org/wm-spec/latest/ar01s05.html#id-1.6.18\n
+    The value of _NET_FRAME_EXTENTS, CARDINAL[4] is returned as longs by XGetWindowProperty.
+    """
+
+    _fields_ = [
+        ("left", c_long),
+        ("right", c_long),
+        ("top", c_long),
+        ("bottom", c_long),
+    ]
+
+    @property
+    def value(self) -> FrameExtents:
+        """
+        Returns the extents, like the value of a simple ctypes type.
+        """
+        return FrameExtents(self.left, self.right, self.top, self.bottom)
+
+
+class XKeyEvent(Structure):
+    """
+    https://tronche.com/gui/x/xlib/events/keyboard-pointer/keyboard-pointer.html#XKeyEvent\n
+    /usr/include/X11/Xlib.h: 557-571
+    """
+
+    _fields_ = [
+        ('type', c_int),
+        ('serial', c_ulong),
+        ('send_event', c_int),
+        ('display', POINTER(Display)),
+        ('window', c_ulong),  # Window / XID
+        ('root', c_ulong),  # Window / XID
+        ('subwindow', c_ulong),  # Window / XID
+        ('time', c_ulong),  # Time
+        ('x', c_int),
+        ('y', c_int),
+        ('x_root', c_int),
+        ('y_root', c_int),
+        ('state', c_uint),
+        ('keycode', c_uint),
+        ('same_screen', c_int),
+    ]
+
+
+class XButtonEvent(Structure):
+    """
+    https://tronche.com/gui/x/xlib/events/keyboard-pointer/keyboard-pointer.html#XButtonEvent\n
+    /usr/include/X11/Xlib.h: 575-589
+    """
+
+    _fields_ = [
+        ('type', c_int),
+        ('serial', c_ulong),
+        ('send_event', c_int),
+        ('display', POINTER(Display)),
+        ('window', c_ulong),  # Window (XID)
+        ('root', c_ulong),  # Window (XID)
+        ('subwindow', c_ulong),  # Window (XID)
+        ('time', c_ulong),  # Time
+        ('x', c_int),
+        ('y', c_int),
+        ('x_root', c_int),
+        ('y_root', c_int),
+        ('state', c_uint),
+        ('button', c_uint),
+        ('same_screen', c_int),
+    ]
+
+
+class XAnyEvent(Structure):
+    """
+    https://tronche.com/gui/x/xlib/events/structures.html\n
+    /usr/include/X11/Xlib.h: 965-971
+    """
+
+    _fields_ = [
+        ('type', c_int),
+        ('serial', c_ulong),
+        ('send_event', c_int),
+        ('display', POINTER(Display)),
+        ('window', c_ulong),  # Window (XID)
+    ]
+
+
+class XCreateWindowEvent(Structure):
+    """
+    https://tronche.com/gui/x/xlib/events/window-state-change/create.html\n
+    /usr/include/X11/Xlib.h: 765-776
+    """
+
+    _fields_ = [
+        ('type', c_int),
+        ('serial', c_ulong),
+        ('send_event', c_int),
+        ('display', POINTER(Display)),
+        ('parent', c_ulong),  # Window (XID)
+        ('window', c_ulong),  # Window (XID)
+        ('x', c_int),
+        ('y', c_int),
+        ('width', c_int),
+        ('height', c_int),
+        ('border_width', c_int),
+        ('override_redirect', c_int),
+    ]
+
+
+class XDestroyWindowEvent(Structure):
+    """
+    https://tronche.com/gui/x/xlib/events/window-state-change/destroy.html\n
+    /usr/include/X11/Xlib.h: 778-784
+    """
+
+    _fields_ = [
+        ('type', c_int),
+        ('serial', c_ulong),
+        ('send_event', c_int),
+        ('display', POINTER(Display)),
+        ('event', c_ulong),  # Window (XID)
+        ('window', c_ulong),  # Window (XID)
+    ]
+
+
+class XMapEvent(Structure):
+    """
+    https://tronche.com/gui/x/xlib/events/window-state-change/map.html\n
+    /usr/include/X11/Xlib.h: 795-802
+    """
+
+    _fields_ = [
+        ('type', c_int),
+        ('serial', c_ulong),
+        ('send_event', c_int),
+        ('display', POINTER(Display)),
+        ('event', c_ulong),  # Window (XID)
+        ('window', c_ulong),  # Window (XID)
+        ('override_redirect', c_int),
+    ]
+
+
+class XUnmapEvent(Structure):
+    """
+    https://tronche.com/gui/x/xlib/events/window-state-change/unmap.html\n
+    /usr/include/X11/Xlib.h: 786-793
+    """
+
+    _fields_ = [
+        ('type', c_int),
+        ('serial', c_ulong),
+        ('send_event', c_int),
+        ('display', POINTER(Display)),
+        ('event', c_ulong),  # Window (XID)
+        ('window', c_ulong),  # Window (XID)
+        ('from_configure', c_int),
+    ]
+
+
+class XVisibilityEvent(Structure):
+    """
+    https://tronche.com/gui/x/xlib/events/window-state-change/visibility.html\n
+    /usr/include/X11/Xlib.h: 749-755
+    """
+
+    _fields_ = [
+        ('type', c_int),
+        ('serial', c_ulong),
+        ('send_event', c_int),
+        ('display', POINTER(Display)),
+        ('window', c_ulong),  # Window (XID)
+        ('state', c_int),
+    ]
+
+
+class XConfigureEvent(Structure):
+    """
+    https://tronche.com/gui/x/xlib/events/window-state-change/configure.html\n
+    /usr/include/X11/Xlib.h: 820-832
+    """
+
+    _fields_ = [
+        ('type', c_int),
+        ('serial', c_ulong),
+        ('send_event', c_int),
+        ('display', POINTER(Display)),
+        ('event', c_ulong),  # Window (XID)
+        ('window', c_ulong),  # Window (XID)
+        ('x', c_int),
+        ('y', c_int),
+        ('width', c_int),
+        ('height', c_int),
+        ('border_width', c_int),
+        ('above', c_ulong),  # Window (XID)
+        ('override_redirect', c_int),
+    ]
+
+
+class XPropertyEvent(Structure):
+    """
+    https://tronche.com/gui/x/xlib/events/client-communication/property.html\n
+    /usr/include/X11/Xlib.h: 870-878
+    """
+
+    _fields_ = [
+        ('type', c_int),
+        ('serial', c_ulong),
+        ('send_event', c_int),
+        ('display', POINTER(Display)),
+        ('window', c_ulong),  # Window (XID)
+        ('atom', c_ulong),  # Atom
+        ('time', c_ulong),  # Time
+        ('state', c_int),
+    ]
+
+
+class XEvent(Union):
+    """
+    https://tronche.com/gui/x/xlib/events/structures.html#XEvent\n
+    /usr/include/X11/Xlib.h: 973-1009
+    """
+    _fields_ = [
+        ('type', c_int),
+        ('xany', XAnyEvent),
+        ('xkey', XKeyEvent),
+        ('xbutton', XButtonEvent),
+        ('xcreatewindow', XCreateWindowEvent),
+        ('xdestroywindow', XDestroyWindowEvent),
+        ('xmap', XMapEvent),
+        ('xunmap', XUnmapEvent),
+        ('xvisibility', XVisibilityEvent),
+        ('xconfigure', XConfigureEvent),
+        ('xproperty', XPropertyEvent),
+        ('pad', c_long*24),
+    ]
+
+
+class XErrorEvent(Structure):
+    """
+    https://tronche.com/gui/x/xlib/event-handling/protocol-errors/default-handlers.html#XErrorEvent\n
+    /usr/include/X11/Xlib.h: 924-932
+    """
+
+    def __repr__(self) -> str:
+        # pylint: disable-next=line-too-long
+        return f"XErrorEvent(type={self.type}, serial={self.serial}, error_code={self.error_code}, request_code={self.request_code}, minor_code={self.minor_code})"
+
+    _fields_ = [
+        ("type", c_int),
+        ("display", POINTER(Display)),
+        ("serial", c_ulong),
+        ("error_code", c_ubyte),
+        ("request_code", c_ubyte),
+        ("minor_code", c_ubyte),
+        ("resourceid", c_void_p),
+    ]
+
+
+# the logger keeps the name of the module that get_logger() was defined in
+logger = getLogger(f"{__package__}.linux")
+logger.setLevel(CRITICAL)
+
+
+@CFUNCTYPE(c_int, POINTER(Display), POINTER(XErrorEvent))
+def error_handler(_, event):
+    """
+    A C function that handles X11 errors.
+    """
+    logger.error("%s", event.contents)
+    return 0
+
+
+def get_logger() -> Logger:
+    """
+    Returns a logger that is responsible for logging XErrorEvents.
+    The logger is set to CRITICAL. So it will not log anything.
+    To make it log something, set the log level at least to ERROR.
+    You can archive this with "logger.setLevel(logging.ERROR)".
+    """
+    return logger
+
+# Setup Xlib Variables
+
+
+class Masks:
+    """
+    https://tronche.com/gui/x/xlib/events/mask.html\n
+    /usr/include/X11/X.h: 150-175
+    """
+    NoEventMask = 0
+    KeyPressMask = 1
+    KeyReleaseMask = 2
+    ButtonPressMask = 4
+    ButtonReleaseMask = 8
+    EnterWindowMask = 16
+    LeaveWindowMask = 32
+    PointerMotionMask = 64
+    PointerMotionHintMask = 128
+    Button1MotionMask = 256
+    Button2MotionMask = 512
+    Button3MotionMask = 1024
+    Button4MotionMask = 2048
+    Button5MotionMask = 4096
+    ButtonMotionMask = 8192
+    KeymapStateMask = 16384
+    ExposureMask = 32768
+    VisibilityChangeMask = 65536
+    StructureNotifyMask = 131072
+    ResizeRedirectMask = 262144
+    SubstructureNotifyMask = 524288
+    SubstructureRedirectMask = 1048576
+    FocusChangeMask = 2097152
+    PropertyChangeMask = 4194304
+    ColormapChangeMask = 8388608
+    OwnerGrabButtonMask = 16777216
+
+
+class EventTypes:
+    """
+    https://tronche.com/gui/x/xlib/events/types.html\n
+    /usr/include/X11/X.h: 181-215
+    """
+    KeyPress = 2
+    KeyRelease = 3
+    ButtonPress = 4
+    ButtonRelease = 5
+    MotionNotify = 6
+    EnterNotify = 7
+    LeaveNotify = 8
+    FocusIn = 9
+    FocusOut = 10
+    KeymapNotify = 11
+    Expose = 12
+    GraphicsExpose = 13
+    NoExpose = 14
+    VisibilityNotify = 15
+    CreateNotify = 16
+    DestroyNotify = 17
+    UnmapNotify = 18
+    MapNotify = 19
+    MapRequest = 20
+    ReparentNotify = 21
+    ConfigureNotify = 22
+    ConfigureRequest = 23
+    GravityNotify = 24
+    ResizeRequest = 25
+    CirculateNotify = 26
+    CirculateRequest = 27
+    PropertyNotify = 28
+    SelectionClear = 29
+    SelectionRequest = 30
+    SelectionNotify = 31
+    ColormapNotify = 32
+    ClientMessage = 33
+    MappingNotify = 34
+    GenericEvent = 35
+    LASTEvent = 36
+
+
+class MapStates:
+    """
+    map_state of XWindowAttributes\n
+    /usr/include/X11/X.h
+    """
+    IsUnmapped = 0
+    IsUnviewable = 1
+    IsViewable = 2
+
+
+class CompositeRedirectModes:
+    """
+    The update modes of XCompositeRedirectWindow\n
+    /usr/include/X11/extensions/Xcomposite.h
+    """
+    CompositeRedirectAutomatic = 0
+    CompositeRedirectManual = 1
+
+
+class KeyMasks:
+    """
+    https://tronche.com/gui/x/xlib/events/keyboard-pointer/keyboard-pointer.html\n
+    /usr/include/X11/X.h: 221-228
+    """
+    ShiftMask = 1
+    LockMask = 2
+    ControlMask = 4
+    Mod1Mask = 8
+    Mod2Mask = 16
+    Mod3Mask = 32
+    Mod4Mask = 64
+    Mod5Mask = 128
+
+
+class Library:
+    """
+    Base class for the bindings of a native library.
+    Every function in "functions" is resolved on first use, its argtypes and restype are declared
+    and it is stored in a slot, so later calls cost no more than a plain attribute lookup.
+    If tracer is set to a Tracer, the slots hold traced wrappers instead.
+    """
+
+    __slots__ = ("library", "_tracer", "__weakref__")
+
+    # the name of the library for find_library
+    name = ""
+    # function name -> (argtypes, restype), None keeps the default of ctypes
+    functions = {}
+    # functions that wait for a reply of the X server,
+    # all other functions only queue a request or don't talk to the server at all
+    round_trips = frozenset()
+
+    def __init__(self):
+        path = find_library(self.name)
+        if not path:
+            raise FileNotFoundError(f"{self.name} library not found!")
+        self.library = cdll.LoadLibrary(path)
+        self._tracer = None
+
+    def __getattr__(self, function_name: str):
+        # only called while the slot of the function is still empty
+        if function_name not in self.functions:
+            raise AttributeError(
+                f"'{type(self).__name__}' object has no attribute '{function_name}'"
+            )
+
+        function = getattr(self.library, function_name)
+        argtypes, restype = self.functions[function_name]
+        if argtypes is not None:
+            function.argtypes = argtypes
+        if restype is not None:
+            function.restype = restype
+        if self._tracer is not None:
+            function = self._tracer.wrap(
+                function_name,
+                function,
+                function_name in self.round_trips
+            )
+        setattr(self, function_name, function)
+        return function
+
+    @property
+    def tracer(self) -> Optional[Tracer]:
+        """
+        Returns the Tracer of the library, None if tracing is disabled.
+        """
+        return self._tracer
+
+    @tracer.setter
+    def tracer(self, tracer: Optional[Tracer]) -> None:
+        self._tracer = tracer
+        # empty the slots, the functions are bound again with the new tracer on their next use
+        for function_name in self.functions:
+            try:
+                delattr(self, function_name)
+            except AttributeError:
+                pass
+
+
+class Xlib(Library):
+    """
+    A class that provides access to Xlib functions.
+    """
+
+    name = "X11"
+    functions = {
+        "XInitThreads": ([], None),
+        "XSetErrorHandler": (None, None),
+        "XOpenDisplay": ([c_char_p], POINTER(Display)),
+        "XCloseDisplay": ([POINTER(Display)], None),
+        "XRootWindow": ([POINTER(Display), c_int], c_ulong),
+        "XGetImage": (
+            [
+                POINTER(Display),
+                c_ulong,  # Drawable (XID)
+                c_int,
+                c_int,
+                c_uint,
+                c_uint,
+                c_ulong,
+                c_int,
+            ],
+            POINTER(XImage)
+        ),
+        "XGetWindowAttributes": (
+            [
+                POINTER(Display),
+                c_ulong,  # Window (XID)
+                POINTER(XWindowAttributes)
+            ],
+            None
+        ),
+        "XGetWindowProperty": (
+            [
+                POINTER(Display),
+                c_ulong,  # Window
+                c_ulong,  # Atom
+                c_long,
+                c_long,
+                c_int,
+                c_ulong,  # Atom
+                POINTER(c_ulong),  # Atom
+                POINTER(c_int),
+                POINTER(c_ulong),
+                POINTER(c_ulong),
+                POINTER(POINTER(c_ubyte))
+            ],
+            None
+        ),
+        "XInternAtom": ([POINTER(Display), c_char_p, c_int], c_ulong),
+        "XFree": ([c_void_p], None),
+        "XDestroyImage": ([POINTER(XImage)], None),
+        "XWarpPointer": (
+            [
+                POINTER(Display),
+                c_ulong,
+                c_ulong,
+                c_int,
+                c_int,
+                c_uint,
+                c_uint,
+                c_int,
+                c_int
+            ],
+            None
+        ),
+        "XFlush": ([POINTER(Display)], None),
+        "XKeysymToKeycode": ([POINTER(Display), c_ulong], c_ubyte),
+        "XStringToKeysym": ([c_char_p], c_ulong),
+        "XSendEvent": ([POINTER(Display), c_ulong, c_int, c_long, c_void_p], None),
+        "XTranslateCoordinates": (
+            [
+                POINTER(Display),
+                c_ulong,  # Window src_w
+                c_ulong,  # Window dest_w
+                c_int,  # src_x
+                c_int,  # src_y
+                POINTER(c_int),  # dest_x_return
+                POINTER(c_int),  # dest_y_return
+                POINTER(c_ulong)  # Window *child_return
+            ],
+            None
+        ),
+        "XQueryTree": (
+            [
+                POINTER(Display),
+                c_ulong,
+                POINTER(c_ulong),
+                POINTER(c_ulong),
+                POINTER(POINTER(c_ulong)),
+                POINTER(c_uint)
+            ],
+            None
+        ),
+        "XSync": ([POINTER(Display), c_int], None),
+        "XDefaultVisual": ([POINTER(Display), c_int], c_void_p),
+        "XDefaultDepth": ([POINTER(Display), c_int], None),
+        "XGetAtomName": ([POINTER(Display), c_ulong], c_void_p),
+        "XFreePixmap": ([POINTER(Display), c_ulong], None),
+        "XSelectInput": ([POINTER(Display), c_ulong, c_long], None),
+        "XConnectionNumber": ([POINTER(Display)], None),
+        "XPending": ([POINTER(Display)], None),
+        "XNextEvent": ([POINTER(Display), POINTER(XEvent)], None),
+    }
+    round_trips = frozenset([
+        "XOpenDisplay",
+        "XTranslateCoordinates",
+        "XSync",
+        "XGetImage",
+        "XGetWindowAttributes",
+        "XGetWindowProperty",
+        "XGetAtomName",
+        "XInternAtom",
+        "XQueryTree",
+    ])
+
+    __slots__ = (
+        "display",
+        "root_window",
+        "stats",
+        "connections",
+        "_finalizer"
+    ) + tuple(functions)
+
+    # XInitThreads must be the first Xlib call of the process
+    threads_initialized = False
+
+    def __init__(self, connections: Optional["Connections"] = None):
+        # load libX11.so.6
+        super().__init__()
+
+        if not Xlib.threads_initialized:
+            self.XInitThreads()
+            Xlib.threads_initialized = True
+
+        self.XSetErrorHandler(error_handler)
+
+        # main
+        self.display = self.XOpenDisplay(None)
+        if not self.display:
+            raise ConnectionError("Can't open the X display.")
+        self.root_window = self.XRootWindow(self.display, 0)
+
+        # the Instrumentation of the DSI, None if it is disabled
+        self.stats = None
+        # the Connections this connection belongs to, None if it is used on its own
+        self.connections = connections
+        # the display is closed when the Xlib is garbage collected
+        self._finalizer = finalize(self, self.XCloseDisplay, self.display)
+
+    @property
+    def closed(self) -> bool:
+        """
+        Returns True if the display is closed.
+        """
+        return not self._finalizer.alive
+
+    def close(self) -> None:
+        """
+        Closes the display.
+        """
+        self._finalizer()
+
+
+class XShm(Library):
+    """
+    A class that provides access to the functions of the MIT-SHM extension (libXext).
+    """
+
+    name = "Xext"
+    functions = {
+        "XShmQueryExtension": ([POINTER(Display)], None),
+        "XShmCreateImage": (
+            [
+                POINTER(Display),
+                c_void_p,  # Visual *visual
+                c_uint,  # depth
+                c_int,  # format
+                c_void_p,  # char *data
+                POINTER(XShmSegmentInfo),
+                c_uint,  # width
+                c_uint  # height
+            ],
+            POINTER(XImage)
+        ),
+        "XShmAttach": ([POINTER(Display), POINTER(XShmSegmentInfo)], None),
+        "XShmDetach": ([POINTER(Display), POINTER(XShmSegmentInfo)], None),
+        "XShmGetImage": (
+            [
+                POINTER(Display),
+                c_ulong,  # Drawable (XID)
+                POINTER(XImage),
+                c_int,
+                c_int,
+                c_ulong  # plane_mask
+            ],
+            None
+        ),
+    }
+    round_trips = frozenset(["XShmQueryExtension", "XShmGetImage"])
+
+    __slots__ = tuple(functions)
+
+
+class XComposite(Library):
+    """
+    A class that provides access to the functions of the Composite extension (libXcomposite).
+    """
+
+    name = "Xcomposite"
+    functions = {
+        "XCompositeQueryExtension": ([POINTER(Display), POINTER(c_int), POINTER(c_int)], None),
+        "XCompositeRedirectWindow": ([POINTER(Display), c_ulong, c_int], None),
+        "XCompositeUnredirectWindow": ([POINTER(Display), c_ulong, c_int], None),
+        "XCompositeNameWindowPixmap": ([POINTER(Display), c_ulong], c_ulong),
+    }
+    round_trips = frozenset(["XCompositeQueryExtension"])
+
+    __slots__ = tuple(functions)
+
+
+class XRandR(Library):
+    """
+    A class that provides access to the functions of the RandR extension (libXrandr).
+    """
+
+    name = "Xrandr"
+    functions = {
+        "XRRGetMonitors": (
+            [
+                POINTER(Display),
+                c_ulong,  # Window (XID)
+                c_int,  # Bool get_active
+                POINTER(c_int)
+            ],
+            POINTER(XRRMonitorInfo)
+        ),
+        "XRRFreeMonitors": ([POINTER(XRRMonitorInfo)], None),
+    }
+    round_trips = frozenset(["XRRGetMonitors"])
+
+    __slots__ = tuple(functions)
+
+
+class X11Xcb(Library):
+    """
+    A class that provides access to the XCB connection of an Xlib display (libX11-xcb).
+    """
+
+    name = "X11-xcb"
+    functions = {
+        "XGetXCBConnection": ([POINTER(Display)], c_void_p),
+    }
+
+    __slots__ = tuple(functions)
@@ -0,0 +1,260 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+The capture of images through Xlib, MIT-SHM and the Composite extension.
+"""
+
+# built-in modules
+from typing import Optional
+from time import perf_counter_ns
+from ctypes import (
+    byref,
+    c_int,
+    c_ubyte
+)
+
+# local modules
+from .image import Image
+from .box import Box
+from .stats import Instrumentation
+from .shm import ShmCaptureBase, ShmSegmentBase
+from .x11 import (
+    CompositeRedirectModes,
+    MapStates,
+    PLAINMASK,
+    XComposite,
+    XShm,
+    XShmSegmentInfo,
+    XWindowAttributes,
+    Xlib,
+    ZPIXMAP
+)
+
+
+def get_image(xlib: Xlib, drawable: int, geometry: Box) -> Image:
+    """
+    https://tronche.com/gui/x/xlib/graphics/XGetImage.html\n
+    Returns an Image of a region of a drawable.
+    The geometry is relative to the drawable.
+    """
+    stats = xlib.stats
+    if stats is not None:
+        start = perf_counter_ns()
+
+    ximage = xlib.XGetImage(
+        xlib.display,  # Display
+        drawable,  # Drawable (Window XID)
+        geometry.x,  # x
+        geometry.y,  # y
+        geometry.width,  # width
+        geometry.height,  # height
+        PLAINMASK,  # plane_mask
+        ZPIXMAP  # format
+    )
+
+    if stats is not None:
+        transferred = perf_counter_ns()
+
+    stride = ximage.contents.bytes_per_line
+    # copy the data once, straight from the XImage into the bytearray
+    data = bytearray((c_ubyte * (stride * geometry.height)).from_address(ximage.contents.data))
+
+    # don't forget to free the memory or you will be fucked
+    xlib.XDestroyImage(ximage)
+
+    if stats is not None:
+        stats.record("transfer", transferred - start)
+        stats.record("copy", perf_counter_ns() - transferred)
+        stats.count("round_trips")
+        stats.count("bytes", len(data))
+
+    return Image(data, geometry.width, geometry.height, stride)
+
+
+def detach_shm_segment(xlib: Xlib, xshm: XShm, ximage, shminfo: XShmSegmentInfo) -> None:
+    """
+    Detaches a shared memory segment from the X server and destroys its XImage.
+    """
+    xshm.XShmDetach(xlib.display, byref(shminfo))
+    xlib.XSync(xlib.display, False)
+    # the data belongs to the segment, so XDestroyImage must not free it
+    ximage.contents.data = None
+    xlib.XDestroyImage(ximage)
+
+
+class ShmSegment(ShmSegmentBase):
+    """
+    A shared memory segment with an XImage, that the X server writes captured images into.
+    The segment is released when it and all Images that use it are garbage collected.
+    """
+
+    def __init__(self, xlib: Xlib, xshm: XShm, width: int, height: int) -> None:
+        self.shminfo = XShmSegmentInfo()
+
+        ximage = xshm.XShmCreateImage(
+            xlib.display,
+            xlib.XDefaultVisual(xlib.display, 0),
+            xlib.XDefaultDepth(xlib.display, 0),
+            ZPIXMAP,
+            None,
+            byref(self.shminfo),
+            width,
+            height
+        )
+        if not ximage:
+            raise RuntimeError("XShmCreateImage failed.")
+
+        try:
+            super().__init__(width, height, ximage.contents.bytes_per_line)
+        except OSError:
+            xlib.XDestroyImage(ximage)
+            raise
+
+        self.shminfo.shmid = self.shmid
+        self.shminfo.shmaddr = self.address
+        self.shminfo.readOnly = False
+        ximage.contents.data = self.address
+        self.ximage = ximage
+
+        xshm.XShmAttach(xlib.display, byref(self.shminfo))
+        xlib.XSync(xlib.display, False)
+        self._attached(detach_shm_segment, xlib, xshm, ximage, self.shminfo)
+
+
+class ShmCapture(ShmCaptureBase):
+    """
+    Captures images through the MIT-SHM extension of Xlib, see ShmCaptureBase.
+    Falls back to XGetImage if the extension is not available.
+    """
+
+    def __init__(self, xlib: Xlib) -> None:
+        super().__init__()
+        self.xlib = xlib
+        try:
+            self.xshm = XShm()
+        except FileNotFoundError:
+            self.xshm = None
+        self.available = bool(
+            self.xshm and self.xshm.XShmQueryExtension(xlib.display)
+        )
+
+    @property
+    def stats(self) -> Optional[Instrumentation]:
+        return self.xlib.stats
+
+    def _create_segment(self, width: int, height: int) -> ShmSegment:
+        return ShmSegment(self.xlib, self.xshm, width, height)
+
+    def _get_image_shm(self, drawable: int, geometry: Box, segment: ShmSegment) -> bool:
+        return bool(self.xshm.XShmGetImage(
+            self.xlib.display,
+            drawable,
+            segment.ximage,
+            geometry.x,
+            geometry.y,
+            PLAINMASK
+        ))
+
+    def _get_image(self, drawable: int, geometry: Box) -> Image:
+        return get_image(self.xlib, drawable, geometry)
+
+
+class CompositeCapture:
+    """
+    Captures windows from the off-screen pixmaps that the Composite extension renders them into,
+    so windows are captured correctly even if they are covered by other windows or off-screen,
+    without raising them.
+    A window is redirected on its first capture and its pixmap is reused
+    until the window is resized or unmapped.
+    """
+
+    def __init__(self, xlib: Xlib, shm: ShmCapture) -> None:
+        self.xlib = xlib
+        self.shm = shm
+        # XID -> (pixmap, width, height)
+        self.pixmaps = {}
+        try:
+            self.xcomposite = XComposite()
+        except FileNotFoundError:
+            self.xcomposite = None
+        event_base = c_int()
+        error_base = c_int()
+        self.available = bool(
+            self.xcomposite
+            and self.xcomposite.XCompositeQueryExtension(
+                xlib.display,
+                byref(event_base),
+                byref(error_base)
+            )
+        )
+
+    def pixmap(self, xid: int, width: int, height: int) -> int:
+        """
+        Returns the pixmap of a window, redirects the window if it is not yet redirected.
+        """
+        cached = self.pixmaps.get(xid)
+        if cached is not None:
+            if cached[1:] == (width, height):
+                return cached[0]
+            # a resized window gets a new pixmap
+            self.xlib.XFreePixmap(self.xlib.display, cached[0])
+        else:
+            self.xcomposite.XCompositeRedirectWindow(
+                self.xlib.display,
+                xid,
+                CompositeRedirectModes.CompositeRedirectAutomatic
+            )
+
+        pixmap = self.xcomposite.XCompositeNameWindowPixmap(self.xlib.display, xid)
+        self.pixmaps[xid] = (pixmap, width, height)
+        return pixmap
+
+    def forget(self, xid: int) -> None:
+        """
+        Frees the pixmap of a window and stops redirecting it.
+        """
+        cached = self.pixmaps.pop(xid, None)
+        if cached is not None:
+            self.xlib.XFreePixmap(self.xlib.display, cached[0])
+            self.xcomposite.XCompositeUnredirectWindow(
+                self.xlib.display,
+                xid,
+                CompositeRedirectModes.CompositeRedirectAutomatic
+            )
+
+    def capture(self, xid: int, geometry: Optional[Box] = None) -> Image:
+        """
+        Returns an Image of a window, or of a region of it if a geometry
+        (in the coordinates of Window.geometry) is given.
+        The Image is backed by shared memory, like the Images of ShmCapture.
+        """
+        xlib = self.xlib
+        gwa = XWindowAttributes()
+        xlib.XGetWindowAttributes(xlib.display, xid, byref(gwa))
+        if xlib.stats is not None:
+            xlib.stats.count("round_trips")
+
+        if gwa.map_state != MapStates.IsViewable:
+            # an unmapped window has no pixmap, it gets a new one when it is mapped again
+            self.forget(xid)
+            raise RuntimeError(f"Window {xid} is not mapped.")
+
+        if geometry is None:
+            region = Box(0, 0, gwa.width, gwa.height)
+        else:
+            region = Box(geometry.x - gwa.x, geometry.y - gwa.y, geometry.width, geometry.height)
+
+        pixmap = self.pixmap(xid, gwa.width, gwa.height)
+        if gwa.depth != xlib.XDefaultDepth(xlib.display, 0):
+            # the shared memory image has the default depth, e.g. not the 32 bits of ARGB windows
+            return get_image(xlib, pixmap, region)
+        return self.shm.capture(pixmap, region)
+
+    def release(self) -> None:
+        """
+        Frees all pixmaps and stops redirecting the windows.
+        """
+        for xid in list(self.pixmaps):
+            self.forget(xid)
+        self.xlib.XFlush(self.xlib.display)
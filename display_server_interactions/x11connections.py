@@ -0,0 +1,346 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+The per-thread X connections of the X11 backend.
+"""
+
+# built-in modules
+from typing import Callable, Optional
+from weakref import finalize
+from threading import Lock, local
+from functools import partial
+
+# local modules
+from .stats import Instrumentation
+from .tracing import Tracer
+from .x11 import X11Xcb, Xlib
+from .x11capture import CompositeCapture, ShmCapture
+
+
+# pylint: disable-next=too-few-public-methods
+class ThreadSentinel:
+    """
+    Lives in the thread-local storage of a thread, it is garbage collected when the thread ends.
+    """
+
+    __slots__ = ("__weakref__",)
+
+
+class Connections:
+    """
+    Opens an X connection (Xlib) for every thread that uses it,
+    so windows can be used from many threads without sharing a Display and without locks.
+    The connection of a thread is closed when the thread ends,
+    so thread pools and short-lived threads don't accumulate connections.
+    Images of MIT-SHM captures of a thread must not be used after the thread ended.
+    All connections are closed by close() or when the Connections are garbage collected.
+    """
+
+    def __init__(self) -> None:
+        self._local = local()
+        self._lock = Lock()
+        # [Xlib, ShmCapture, CompositeCapture] of every thread,
+        # the captures are created on first use
+        self._open = []
+        self._stats = None
+        self._tracer = None
+        # capture windows from their XComposite pixmaps
+        self.composite_enabled = False
+        # the EventDispatcher, created on first use
+        self._dispatcher = None
+        # the GeometryCache, created by enable_geometry_cache()
+        self._geometry_cache = None
+        try:
+            self._x11_xcb = X11Xcb()
+        except FileNotFoundError:
+            self._x11_xcb = None
+        self._finalizer = finalize(self, close_connections, self._open, self._lock)
+        # open the connection of this thread now, so errors are raised early
+        _ = self.xlib
+
+    @property
+    def xlib(self) -> "Xlib":
+        """
+        Returns the connection of the current thread.
+        """
+        xlib = getattr(self._local, "xlib", None)
+        if xlib is None:
+            if not self._finalizer.alive:
+                raise RuntimeError("The connections are closed.")
+            xlib = Xlib(self)
+            xlib.stats = self._stats
+            xlib.tracer = self._tracer
+            self._local.xlib = xlib
+            connection = [xlib, None, None]
+            # only taken once per thread
+            with self._lock:
+                self._open.append(connection)
+            # closes the connection when the thread ends and its thread-local storage is freed
+            sentinel = self._local.sentinel = ThreadSentinel()
+            finalize(sentinel, close_thread_connection, self._open, self._lock, connection)
+        return xlib
+
+    @property
+    def shm(self) -> "ShmCapture":
+        """
+        Returns the ShmCapture of the current thread.
+        """
+        shm = getattr(self._local, "shm", None)
+        if shm is None:
+            xlib = self.xlib
+            shm = self._local.shm = ShmCapture(xlib)
+            if shm.xshm is not None:
+                shm.xshm.tracer = self._tracer
+            with self._lock:
+                for connection in self._open:
+                    if connection[0] is xlib:
+                        connection[1] = shm
+        return shm
+
+    @property
+    def xcb(self):
+        """
+        Returns an Xcb of the XCB connection that underlies the display of the current thread,
+        None without libX11-xcb.
+        Xlib waits for the reply of every request, XCB can send many requests at once.
+        """
+        if self._x11_xcb is None:
+            return None
+
+        xlib = self.xlib
+        xcb = getattr(self._local, "xcb", None)
+        if xcb is None:
+            # pylint: disable-next=import-outside-toplevel
+            from .xcb import Xcb
+            xcb = self._local.xcb = Xcb(self._x11_xcb.XGetXCBConnection(xlib.display))
+        xcb.stats = xlib.stats
+        if xcb.tracer is not xlib.tracer:
+            xcb.tracer = xlib.tracer
+        # send the queued Xlib requests before XCB requests are sent on the same connection
+        xlib.XFlush(xlib.display)
+        return xcb
+
+    @property
+    def composite(self) -> Optional["CompositeCapture"]:
+        """
+        Returns the CompositeCapture of the current thread,
+        None if composite capture is disabled or not available.
+        """
+        if not self.composite_enabled:
+            return None
+        composite = getattr(self._local, "composite", None)
+        if composite is None:
+            xlib = self.xlib
+            composite = self._local.composite = CompositeCapture(xlib, self.shm)
+            if composite.xcomposite is not None:
+                composite.xcomposite.tracer = self._tracer
+            with self._lock:
+                for connection in self._open:
+                    if connection[0] is xlib:
+                        connection[2] = composite
+        if not composite.available:
+            return None
+        return composite
+
+    @property
+    def dispatcher(self):
+        """
+        Returns the EventDispatcher of the connections.
+        """
+        if self._dispatcher is None:
+            # pylint: disable=import-outside-toplevel
+            from .events import EventDispatcher
+            # linux imports this module
+            from .linux import Window
+            xlib = self.xlib
+            with self._lock:
+                if self._dispatcher is None:
+                    self._dispatcher = EventDispatcher(partial(Window, xlib=xlib))
+        return self._dispatcher
+
+    @property
+    def geometry_cache(self) -> Optional["GeometryCache"]:
+        """
+        Returns the GeometryCache of the connections, None if it is disabled.
+        """
+        return self._geometry_cache
+
+    def enable_geometry_cache(self) -> None:
+        """
+        Creates the GeometryCache, which starts the EventDispatcher.
+        """
+        dispatcher = self.dispatcher
+        with self._lock:
+            if self._geometry_cache is None:
+                self._geometry_cache = GeometryCache(dispatcher)
+
+    def disable_geometry_cache(self) -> None:
+        """
+        Drops the GeometryCache, the EventDispatcher keeps running for other subscribers.
+        """
+        with self._lock:
+            geometry_cache, self._geometry_cache = self._geometry_cache, None
+        if geometry_cache is not None:
+            geometry_cache.close()
+
+    def release_composite(self) -> None:
+        """
+        Frees the pixmaps and stops redirecting the windows of all threads.
+        """
+        for xlib, _, composite in self._connections():
+            if composite is not None and not xlib.closed:
+                composite.release()
+
+    def _connections(self) -> list:
+        with self._lock:
+            return [tuple(connection) for connection in self._open]
+
+    @property
+    def stats(self) -> Optional[Instrumentation]:
+        """
+        Returns the Instrumentation of all connections.
+        """
+        return self._stats
+
+    @stats.setter
+    def stats(self, stats: Optional[Instrumentation]) -> None:
+        self._stats = stats
+        for xlib, _, _ in self._connections():
+            xlib.stats = stats
+
+    @property
+    def tracer(self) -> Optional[Tracer]:
+        """
+        Returns the Tracer of all connections.
+        """
+        return self._tracer
+
+    @tracer.setter
+    def tracer(self, tracer: Optional[Tracer]) -> None:
+        self._tracer = tracer
+        for xlib, shm, composite in self._connections():
+            xlib.tracer = tracer
+            if shm is not None and shm.xshm is not None:
+                shm.xshm.tracer = tracer
+            if composite is not None and composite.xcomposite is not None:
+                composite.xcomposite.tracer = tracer
+
+    @property
+    def closed(self) -> bool:
+        """
+        Returns True if the connections are closed.
+        """
+        return not self._finalizer.alive
+
+    def close(self) -> None:
+        """
+        Stops the event dispatcher,
+        releases the shared memory and closes the connections of all threads.
+        Windows of the connections must not be used after this.
+        """
+        if self._dispatcher is not None:
+            self._dispatcher.stop()
+        self._finalizer()
+        # forget the closed connections of all threads
+        self._local = local()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._open)
+
+
+def close_connection(connection: list) -> None:
+    """
+    Releases the shared memory segments and closes the display of a connection.
+    The server frees the pixmaps and redirections of a display when it is closed.
+    """
+    xlib, shm, _ = connection
+    if shm is not None:
+        shm.release()
+    xlib.close()
+
+
+def close_connections(connections: list, lock: Lock) -> None:
+    """
+    Closes all connections.
+    """
+    with lock:
+        closing = list(connections)
+        connections.clear()
+    for connection in closing:
+        close_connection(connection)
+
+
+def close_thread_connection(connections: list, lock: Lock, connection: list) -> None:
+    """
+    Closes the connection of a thread that ended, unless all connections are already closed.
+    """
+    with lock:
+        for index, open_connection in enumerate(connections):
+            if open_connection is connection:
+                del connections[index]
+                break
+        else:
+            return
+    close_connection(connection)
+
+
+class GeometryCache:
+    """
+    Caches the absolute geometries, frame extents and visible regions of windows.
+    Moving, resizing or restacking a window also changes its children and the windows it covers,
+    so the whole cache is cleared by every configure, destroy, map, unmap and visibility event
+    of the EventDispatcher.
+    """
+
+    # marks a missing entry, None is a valid value
+    MISSING = object()
+    # the events that invalidate the cache
+    EVENT_TYPES = ("configure", "destroy", "map", "unmap", "visibility")
+
+    def __init__(self, dispatcher) -> None:
+        self._entries = {}
+        self._lock = Lock()
+        # incremented by every invalidation, so values that were requested
+        # before an invalidation are not stored after it
+        self._generation = 0
+        self._dispatcher = dispatcher
+        for event_type in self.EVENT_TYPES:
+            dispatcher.on(event_type, self.invalidate)
+
+    def close(self) -> None:
+        """
+        Unsubscribes the cache from the EventDispatcher and clears it.
+        """
+        for event_type in self.EVENT_TYPES:
+            self._dispatcher.off(event_type, self.invalidate)
+        self.invalidate()
+
+    def invalidate(self, _event=None) -> None:
+        """
+        Clears the cache.
+        """
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def get(self, key: tuple, compute: Callable):
+        """
+        Returns the cached value of the key, computes and stores it if it is missing.
+        """
+        with self._lock:
+            value = self._entries.get(key, self.MISSING)
+            generation = self._generation
+        if value is not self.MISSING:
+            return value
+
+        value = compute()
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = value
+        return value
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
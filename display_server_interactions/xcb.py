@@ -0,0 +1,1535 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+This module provides an X11 backend that uses XCB (libxcb) instead of Xlib.
+
+Every XCB request returns a cookie immediately and its reply is only waited for later,
+so many requests can be sent before the first reply is read.
+The backend uses this to pipeline the requests of window enumeration and property reads,
+which need a round-trip per request with Xlib.
+"""
+
+# built-in modules
+from sys import byteorder
+from typing import Callable, Optional, Sequence
+from time import perf_counter_ns
+from weakref import finalize
+from functools import partial
+from array import array
+from ctypes.util import find_library
+from ctypes import cdll
+from ctypes import (
+    Structure,
+    POINTER,
+    byref,
+    cast,
+    addressof,
+    string_at,
+    c_char,
+    c_char_p,
+    c_int,
+    c_int16,
+    c_uint,
+    c_uint8,
+    c_uint16,
+    c_uint32,
+    c_ubyte,
+    c_ulong,
+    c_void_p,
+)
+
+# local modules
+from .base import DSIBase
+from .window import WindowBase, FrameExtents
+from .image import Image
+from .buttons import MouseButtons
+from .box import Box
+from .monitor import Monitor
+from .stats import Instrumentation
+from .tracing import TracingMixin, traced_by
+from .windowlist import WindowList
+from .snapshot import Snapshot
+from .region import Region
+from .shm import ShmCaptureBase, ShmSegmentBase
+from .x11 import (
+    Library,
+    EventTypes,
+    KeyMasks,
+    Masks,
+)
+
+# https://xcb.freedesktop.org/manual/group__XCB____API.html
+XCB_IMAGE_FORMAT_Z_PIXMAP = 2
+XCB_GET_PROPERTY_TYPE_ANY = 0
+XCB_ATOM_NONE = 0
+XCB_MAP_STATE_VIEWABLE = 2
+PLAINMASK = 0xFFFFFFFF
+
+# first keysym of the Unicode keysyms, /usr/include/X11/keysymdef.h
+UNICODE_KEYSYM = 0x01000000
+
+
+# pylint: disable=too-few-public-methods
+
+class Cookie(Structure):
+    """
+    xcb_*_cookie_t, they all have the same layout.
+    """
+    _fields_ = [("sequence", c_uint)]
+
+
+class Setup(Structure):
+    """
+    /usr/include/xcb/xproto.h: xcb_setup_t
+    """
+    _fields_ = [
+        ("status", c_uint8),
+        ("pad0", c_uint8),
+        ("protocol_major_version", c_uint16),
+        ("protocol_minor_version", c_uint16),
+        ("length", c_uint16),
+        ("release_number", c_uint32),
+        ("resource_id_base", c_uint32),
+        ("resource_id_mask", c_uint32),
+        ("motion_buffer_size", c_uint32),
+        ("vendor_len", c_uint16),
+        ("maximum_request_length", c_uint16),
+        ("roots_len", c_uint8),
+        ("pixmap_formats_len", c_uint8),
+        ("image_byte_order", c_uint8),
+        ("bitmap_format_bit_order", c_uint8),
+        ("bitmap_format_scanline_unit", c_uint8),
+        ("bitmap_format_scanline_pad", c_uint8),
+        ("min_keycode", c_uint8),
+        ("max_keycode", c_uint8),
+        ("pad1", c_uint8 * 4),
+    ]
+
+
+class Screen(Structure):
+    """
+    /usr/include/xcb/xproto.h: xcb_screen_t
+    """
+    _fields_ = [
+        ("root", c_uint32),
+        ("default_colormap", c_uint32),
+        ("white_pixel", c_uint32),
+        ("black_pixel", c_uint32),
+        ("current_input_masks", c_uint32),
+        ("width_in_pixels", c_uint16),
+        ("height_in_pixels", c_uint16),
+        ("width_in_millimeters", c_uint16),
+        ("height_in_millimeters", c_uint16),
+        ("min_installed_maps", c_uint16),
+        ("max_installed_maps", c_uint16),
+        ("root_visual", c_uint32),
+        ("backing_stores", c_uint8),
+        ("save_unders", c_uint8),
+        ("root_depth", c_uint8),
+        ("allowed_depths_len", c_uint8),
+    ]
+
+
+class ScreenIterator(Structure):
+    """
+    /usr/include/xcb/xproto.h: xcb_screen_iterator_t
+    """
+    _fields_ = [
+        ("data", POINTER(Screen)),
+        ("rem", c_int),
+        ("index", c_int),
+    ]
+
+
+class InternAtomReply(Structure):
+    """
+    /usr/include/xcb/xproto.h: xcb_intern_atom_reply_t
+    """
+    _fields_ = [
+        ("response_type", c_uint8),
+        ("pad0", c_uint8),
+        ("sequence", c_uint16),
+        ("length", c_uint32),
+        ("atom", c_uint32),
+    ]
+
+
+class GetGeometryReply(Structure):
+    """
+    /usr/include/xcb/xproto.h: xcb_get_geometry_reply_t
+    """
+    _fields_ = [
+        ("response_type", c_uint8),
+        ("depth", c_uint8),
+        ("sequence", c_uint16),
+        ("length", c_uint32),
+        ("root", c_uint32),
+        ("x", c_int16),
+        ("y", c_int16),
+        ("width", c_uint16),
+        ("height", c_uint16),
+        ("border_width", c_uint16),
+        ("pad0", c_uint8 * 2),
+    ]
+
+
+class QueryTreeReply(Structure):
+    """
+    /usr/include/xcb/xproto.h: xcb_query_tree_reply_t
+    """
+    _fields_ = [
+        ("response_type", c_uint8),
+        ("pad0", c_uint8),
+        ("sequence", c_uint16),
+        ("length", c_uint32),
+        ("root", c_uint32),
+        ("parent", c_uint32),
+        ("children_len", c_uint16),
+        ("pad1", c_uint8 * 14),
+    ]
+
+
+class TranslateCoordinatesReply(Structure):
+    """
+    /usr/include/xcb/xproto.h: xcb_translate_coordinates_reply_t
+    """
+    _fields_ = [
+        ("response_type", c_uint8),
+        ("same_screen", c_uint8),
+        ("sequence", c_uint16),
+        ("length", c_uint32),
+        ("child", c_uint32),
+        ("dst_x", c_int16),
+        ("dst_y", c_int16),
+    ]
+
+
+class GetWindowAttributesReply(Structure):
+    """
+    /usr/include/xcb/xproto.h: xcb_get_window_attributes_reply_t
+    """
+    _fields_ = [
+        ("response_type", c_uint8),
+        ("backing_store", c_uint8),
+        ("sequence", c_uint16),
+        ("length", c_uint32),
+        ("visual", c_uint32),
+        ("_class", c_uint16),
+        ("bit_gravity", c_uint8),
+        ("win_gravity", c_uint8),
+        ("backing_planes", c_uint32),
+        ("backing_pixel", c_uint32),
+        ("save_under", c_uint8),
+        ("map_is_installed", c_uint8),
+        ("map_state", c_uint8),
+        ("override_redirect", c_uint8),
+        ("colormap", c_uint32),
+        ("all_event_masks", c_uint32),
+        ("your_event_mask", c_uint32),
+        ("do_not_propagate_mask", c_uint16),
+        ("pad0", c_uint8 * 2),
+    ]
+
+
+class GetKeyboardMappingReply(Structure):
+    """
+    /usr/include/xcb/xproto.h: xcb_get_keyboard_mapping_reply_t
+    """
+    _fields_ = [
+        ("response_type", c_uint8),
+        ("keysyms_per_keycode", c_uint8),
+        ("sequence", c_uint16),
+        ("length", c_uint32),
+        ("pad0", c_uint8 * 24),
+    ]
+
+
+class QueryExtensionReply(Structure):
+    """
+    /usr/include/xcb/xproto.h: xcb_query_extension_reply_t
+    """
+    _fields_ = [
+        ("response_type", c_uint8),
+        ("pad0", c_uint8),
+        ("sequence", c_uint16),
+        ("length", c_uint32),
+        ("present", c_uint8),
+        ("major_opcode", c_uint8),
+        ("first_event", c_uint8),
+        ("first_error", c_uint8),
+    ]
+
+
+class ShmGetImageReply(Structure):
+    """
+    /usr/include/xcb/shm.h: xcb_shm_get_image_reply_t
+    """
+    _fields_ = [
+        ("response_type", c_uint8),
+        ("depth", c_uint8),
+        ("sequence", c_uint16),
+        ("length", c_uint32),
+        ("visual", c_uint32),
+        ("size", c_uint32),
+    ]
+
+
+class RandrMonitorInfo(Structure):
+    """
+    /usr/include/xcb/randr.h: xcb_randr_monitor_info_t
+    """
+    _fields_ = [
+        ("name", c_uint32),
+        ("primary", c_uint8),
+        ("automatic", c_uint8),
+        ("nOutput", c_uint16),
+        ("x", c_int16),
+        ("y", c_int16),
+        ("width", c_uint16),
+        ("height", c_uint16),
+        ("width_in_millimeters", c_uint32),
+        ("height_in_millimeters", c_uint32),
+    ]
+
+
+class RandrMonitorInfoIterator(Structure):
+    """
+    /usr/include/xcb/randr.h: xcb_randr_monitor_info_iterator_t
+    """
+    _fields_ = [
+        ("data", POINTER(RandrMonitorInfo)),
+        ("rem", c_int),
+        ("index", c_int),
+    ]
+
+
+class InputEvent(Structure):
+    """
+    /usr/include/xcb/xproto.h: xcb_key_press_event_t and xcb_button_press_event_t,
+    detail is the keycode or the button.
+    """
+    _fields_ = [
+        ("response_type", c_uint8),
+        ("detail", c_uint8),
+        ("sequence", c_uint16),
+        ("time", c_uint32),
+        ("root", c_uint32),
+        ("event", c_uint32),
+        ("child", c_uint32),
+        ("root_x", c_int16),
+        ("root_y", c_int16),
+        ("event_x", c_int16),
+        ("event_y", c_int16),
+        ("state", c_uint16),
+        ("same_screen", c_uint8),
+        ("pad0", c_uint8),
+    ]
+
+# pylint: enable=too-few-public-methods
+
+
+def reply_function(restype=c_void_p) -> tuple:
+    """
+    Returns the argtypes and restype of a xcb_*_reply function.
+    """
+    return ([c_void_p, Cookie, POINTER(c_void_p)], restype)
+
+
+class Xcb(Library):
+    """
+    A class that provides access to XCB functions and holds the connection.
+    """
+
+    name = "xcb"
+    functions = {
+        "xcb_connect": ([c_char_p, POINTER(c_int)], c_void_p),
+        "xcb_disconnect": ([c_void_p], None),
+        "xcb_connection_has_error": ([c_void_p], None),
+        "xcb_get_setup": ([c_void_p], POINTER(Setup)),
+        "xcb_setup_roots_iterator": ([POINTER(Setup)], ScreenIterator),
+        "xcb_screen_next": ([POINTER(ScreenIterator)], None),
+        "xcb_generate_id": ([c_void_p], c_uint32),
+        "xcb_get_extension_data": ([c_void_p, c_void_p], POINTER(QueryExtensionReply)),
+        "xcb_flush": ([c_void_p], None),
+        "xcb_poll_for_event": ([c_void_p], c_void_p),
+        "xcb_intern_atom": ([c_void_p, c_uint8, c_uint16, c_char_p], Cookie),
+        "xcb_intern_atom_reply": reply_function(POINTER(InternAtomReply)),
+        "xcb_get_atom_name": ([c_void_p, c_uint32], Cookie),
+        "xcb_get_atom_name_reply": reply_function(),
+        "xcb_get_atom_name_name": ([c_void_p], c_void_p),
+        "xcb_get_atom_name_name_length": ([c_void_p], None),
+        "xcb_get_property": (
+            [c_void_p, c_uint8, c_uint32, c_uint32, c_uint32, c_uint32, c_uint32],
+            Cookie
+        ),
+        "xcb_get_property_reply": reply_function(),
+        "xcb_get_property_value": ([c_void_p], c_void_p),
+        "xcb_get_property_value_length": ([c_void_p], None),
+        "xcb_query_tree": ([c_void_p, c_uint32], Cookie),
+        "xcb_query_tree_reply": reply_function(),
+        "xcb_query_tree_children": ([c_void_p], POINTER(c_uint32)),
+        "xcb_query_tree_children_length": ([c_void_p], None),
+        "xcb_get_geometry": ([c_void_p, c_uint32], Cookie),
+        "xcb_get_geometry_reply": reply_function(POINTER(GetGeometryReply)),
+        "xcb_translate_coordinates": ([c_void_p, c_uint32, c_uint32, c_int16, c_int16], Cookie),
+        "xcb_translate_coordinates_reply": reply_function(POINTER(TranslateCoordinatesReply)),
+        "xcb_get_window_attributes": ([c_void_p, c_uint32], Cookie),
+        "xcb_get_window_attributes_reply": reply_function(POINTER(GetWindowAttributesReply)),
+        "xcb_get_image": (
+            [
+                c_void_p,
+                c_uint8,  # format
+                c_uint32,  # drawable
+                c_int16,  # x
+                c_int16,  # y
+                c_uint16,  # width
+                c_uint16,  # height
+                c_uint32  # plane_mask
+            ],
+            Cookie
+        ),
+        "xcb_get_image_reply": reply_function(),
+        "xcb_get_image_data": ([c_void_p], c_void_p),
+        "xcb_get_image_data_length": ([c_void_p], None),
+        "xcb_get_keyboard_mapping": ([c_void_p, c_uint8, c_uint8], Cookie),
+        "xcb_get_keyboard_mapping_reply": reply_function(POINTER(GetKeyboardMappingReply)),
+        "xcb_get_keyboard_mapping_keysyms": ([c_void_p], POINTER(c_uint32)),
+        "xcb_get_keyboard_mapping_keysyms_length": ([c_void_p], None),
+        "xcb_send_event": ([c_void_p, c_uint8, c_uint32, c_uint32, c_void_p], Cookie),
+        "xcb_warp_pointer": (
+            [
+                c_void_p,
+                c_uint32,  # src_window
+                c_uint32,  # dst_window
+                c_int16,  # src_x
+                c_int16,  # src_y
+                c_uint16,  # src_width
+                c_uint16,  # src_height
+                c_int16,  # dst_x
+                c_int16  # dst_y
+            ],
+            Cookie
+        ),
+    }
+    round_trips = frozenset(
+        function_name for function_name in functions if function_name.endswith("_reply")
+    )
+
+    __slots__ = (
+        "libc",
+        "connection",
+        "setup",
+        "screen",
+        "root_window",
+        "stats",
+        "_atoms",
+        "_keycodes",
+        "_finalizer"
+    ) + tuple(functions)
+
+    def __init__(self, connection: Optional[int] = None):
+        """
+        Connects to the X server,
+        or wraps an existing connection (xcb_connection_t *) of screen 0 without owning it.
+        """
+        # load libxcb.so.1
+        super().__init__()
+
+        self.libc = cdll.LoadLibrary(find_library("c"))
+        self.libc.free.argtypes = [c_void_p]
+
+        screen_number = c_int()
+        if connection is None:
+            self.connection = self.xcb_connect(None, byref(screen_number))
+            if self.xcb_connection_has_error(self.connection):
+                self.xcb_disconnect(self.connection)
+                raise ConnectionError("Can't connect to the X server.")
+        else:
+            self.connection = connection
+
+        self.setup = self.xcb_get_setup(self.connection).contents
+        screens = self.xcb_setup_roots_iterator(self.setup)
+        for _ in range(screen_number.value):
+            self.xcb_screen_next(byref(screens))
+        self.screen = screens.data.contents
+        self.root_window = self.screen.root
+
+        # the Instrumentation of the DSI, None if it is disabled
+        self.stats = None
+        # atom name -> atom
+        self._atoms = {}
+        # keysym -> keycode
+        self._keycodes = None
+        # the connection is closed when the Xcb is garbage collected,
+        # a wrapped connection is closed by its owner
+        self._finalizer = None
+        if connection is None:
+            self._finalizer = finalize(self, self.xcb_disconnect, self.connection)
+
+    def close(self) -> None:
+        """
+        Closes the connection, if it was opened by this Xcb.
+        """
+        if self._finalizer is not None:
+            self._finalizer()
+
+    def reply(self, function: Callable, cookie: Cookie):
+        """
+        Waits for the reply of a request and returns it, None if the request failed.
+        The reply must be freed with free().
+        """
+        error = c_void_p()
+        reply = function(self.connection, cookie, byref(error))
+        if error:
+            # don't forget to free the memory or you will be fucked
+            self.libc.free(error)
+        return reply
+
+    def free(self, reply) -> None:
+        """
+        Frees a reply.
+        """
+        self.libc.free(reply)
+
+    def flush(self) -> None:
+        """
+        Sends all queued requests
+        and drops the events and errors of requests without a reply.
+        """
+        self.xcb_flush(self.connection)
+        event = self.xcb_poll_for_event(self.connection)
+        while event:
+            self.libc.free(event)
+            event = self.xcb_poll_for_event(self.connection)
+
+    def sync(self) -> None:
+        """
+        Waits until the X server has processed all requests.
+        """
+        reply = self.reply(
+            self.xcb_get_geometry_reply,
+            self.xcb_get_geometry(self.connection, self.root_window)
+        )
+        if reply:
+            self.free(reply)
+
+    def atoms(self, names: list[str]) -> list[int]:
+        """
+        Returns the atoms of the names, with one round-trip for all uncached names.
+        """
+        missing = [name for name in dict.fromkeys(names) if name not in self._atoms]
+        cookies = [
+            self.xcb_intern_atom(self.connection, False, len(encoded), encoded)
+            for encoded in (name.encode("utf-8") for name in missing)
+        ]
+        for name, cookie in zip(missing, cookies):
+            reply = self.reply(self.xcb_intern_atom_reply, cookie)
+            if reply:
+                self._atoms[name] = reply.contents.atom
+                self.free(reply)
+            else:
+                self._atoms[name] = XCB_ATOM_NONE
+        return [self._atoms[name] for name in names]
+
+    def atom(self, name: str) -> int:
+        """
+        Returns the atom of a name.
+        """
+        atom = self._atoms.get(name)
+        if atom is None:
+            atom = self.atoms([name])[0]
+        return atom
+
+    def keycode(self, keysym: int) -> int:
+        """
+        Returns the keycode of a keysym, 0 if no key produces it.
+        The keyboard mapping is read on first use.
+        """
+        if self._keycodes is None:
+            self._keycodes = {}
+            first = self.setup.min_keycode
+            count = self.setup.max_keycode - first + 1
+            reply = self.reply(
+                self.xcb_get_keyboard_mapping_reply,
+                self.xcb_get_keyboard_mapping(self.connection, first, count)
+            )
+            if reply:
+                per_keycode = reply.contents.keysyms_per_keycode
+                keysyms = self.xcb_get_keyboard_mapping_keysyms(reply)
+                for index in range(self.xcb_get_keyboard_mapping_keysyms_length(reply)):
+                    # the first keycode wins, like XKeysymToKeycode
+                    self._keycodes.setdefault(keysyms[index], first + index // per_keycode)
+                self.free(reply)
+            self._keycodes.pop(0, None)
+        return self._keycodes.get(keysym, 0)
+
+    def extension_present(self, extension_id: c_void_p) -> bool:
+        """
+        Returns True if the X server supports the extension.
+        Requests of a missing extension would close the connection.
+        """
+        data = self.xcb_get_extension_data(self.connection, extension_id)
+        return bool(data) and bool(data.contents.present)
+
+
+class XcbShm(Library):
+    """
+    A class that provides access to the functions of the MIT-SHM extension (libxcb-shm).
+    """
+
+    name = "xcb-shm"
+    functions = {
+        "xcb_shm_attach": ([c_void_p, c_uint32, c_uint32, c_uint8], Cookie),
+        "xcb_shm_detach": ([c_void_p, c_uint32], Cookie),
+        "xcb_shm_get_image": (
+            [
+                c_void_p,
+                c_uint32,  # drawable
+                c_int16,  # x
+                c_int16,  # y
+                c_uint16,  # width
+                c_uint16,  # height
+                c_uint32,  # plane_mask
+                c_uint8,  # format
+                c_uint32,  # shmseg
+                c_uint32  # offset
+            ],
+            Cookie
+        ),
+        "xcb_shm_get_image_reply": reply_function(POINTER(ShmGetImageReply)),
+    }
+    round_trips = frozenset(["xcb_shm_get_image_reply"])
+
+    __slots__ = tuple(functions)
+
+    @property
+    def extension_id(self) -> int:
+        """
+        Returns the address of xcb_shm_id.
+        """
+        return addressof(c_char.in_dll(self.library, "xcb_shm_id"))
+
+
+class XcbRandR(Library):
+    """
+    A class that provides access to the functions of the RandR extension (libxcb-randr).
+    """
+
+    name = "xcb-randr"
+    functions = {
+        "xcb_randr_get_monitors": ([c_void_p, c_uint32, c_uint8], Cookie),
+        "xcb_randr_get_monitors_reply": reply_function(),
+        "xcb_randr_get_monitors_monitors_iterator": ([c_void_p], RandrMonitorInfoIterator),
+        "xcb_randr_monitor_info_next": ([POINTER(RandrMonitorInfoIterator)], None),
+    }
+    round_trips = frozenset(["xcb_randr_get_monitors_reply"])
+
+    __slots__ = tuple(functions)
+
+    @property
+    def extension_id(self) -> int:
+        """
+        Returns the address of xcb_randr_id.
+        """
+        return addressof(c_char.in_dll(self.library, "xcb_randr_id"))
+
+
+class X11Keysyms(Library):
+    """
+    A class that provides access to the keysym table of Xlib (libX11),
+    it doesn't need a display, so no Xlib connection is opened.
+    """
+
+    name = "X11"
+    functions = {
+        "XStringToKeysym": ([c_char_p], c_ulong),
+    }
+
+    __slots__ = tuple(functions)
+
+
+_keysyms = []
+
+
+def string_to_keysym(name: str) -> int:
+    """
+    Returns the keysym of a keysym name (e.g. "Return"), like the Xlib backend resolves them.
+    Raises ValueError if the name is not a keysym.
+    """
+    if not _keysyms:
+        _keysyms.append(X11Keysyms())
+    keysym = _keysyms[0].XStringToKeysym(name.encode("utf-8"))
+    if not keysym:
+        raise ValueError(f"Invalid keysym name '{name}'.")
+    return keysym
+
+
+# runs methods of classes with an xcb attribute as operations of the Tracer
+traced = traced_by("xcb")
+
+
+def get_image(xcb: Xcb, drawable: int, geometry: Box) -> Image:
+    """
+    Returns an Image of a region of a drawable.
+    """
+    stats = xcb.stats
+    if stats is not None:
+        start = perf_counter_ns()
+
+    reply = xcb.reply(
+        xcb.xcb_get_image_reply,
+        xcb.xcb_get_image(
+            xcb.connection,
+            XCB_IMAGE_FORMAT_Z_PIXMAP,
+            drawable,
+            geometry.x,
+            geometry.y,
+            geometry.width,
+            geometry.height,
+            PLAINMASK
+        )
+    )
+    if not reply:
+        raise RuntimeError("xcb_get_image failed.")
+
+    if stats is not None:
+        transferred = perf_counter_ns()
+
+    length = xcb.xcb_get_image_data_length(reply)
+    # copy the data once, straight from the reply into the bytearray
+    data = bytearray((c_ubyte * length).from_address(xcb.xcb_get_image_data(reply)))
+
+    # don't forget to free the memory or you will be fucked
+    xcb.free(reply)
+
+    if stats is not None:
+        stats.record("transfer", transferred - start)
+        stats.record("copy", perf_counter_ns() - transferred)
+        stats.count("round_trips")
+        stats.count("bytes", length)
+
+    return Image(data, geometry.width, geometry.height, length // geometry.height)
+
+
+def detach_shm_segment(xcb: Xcb, xshm: XcbShm, seg: int) -> None:
+    """
+    Detaches a shared memory segment from the X server.
+    """
+    xshm.xcb_shm_detach(xcb.connection, seg)
+    xcb.flush()
+
+
+class ShmSegment(ShmSegmentBase):
+    """
+    A shared memory segment, that the X server writes captured images into.
+    The segment is released when it and all Images that use it are garbage collected.
+    """
+
+    def __init__(self, xcb: Xcb, xshm: XcbShm, width: int, height: int) -> None:
+        # ZPixmap images of depth 24 and 32 have 4 bytes per pixel
+        super().__init__(width, height, width * 4)
+
+        self.seg = xcb.xcb_generate_id(xcb.connection)
+        xshm.xcb_shm_attach(xcb.connection, self.seg, self.shmid, False)
+        # the X server has to attach before the segment is marked for removal
+        xcb.sync()
+        self._attached(detach_shm_segment, xcb, xshm, self.seg)
+
+
+class ShmCapture(ShmCaptureBase):
+    """
+    Captures images through the MIT-SHM extension of XCB, see ShmCaptureBase.
+    All threads share the connection, but every thread captures into its own segment.
+    Falls back to xcb_get_image if the extension is not available.
+    """
+
+    def __init__(self, xcb: Xcb) -> None:
+        super().__init__()
+        self.xcb = xcb
+        try:
+            self.xshm = XcbShm()
+        except FileNotFoundError:
+            self.xshm = None
+        self.available = bool(
+            self.xshm and xcb.extension_present(self.xshm.extension_id)
+        )
+
+    @property
+    def stats(self) -> Optional[Instrumentation]:
+        return self.xcb.stats
+
+    def _create_segment(self, width: int, height: int) -> ShmSegment:
+        return ShmSegment(self.xcb, self.xshm, width, height)
+
+    def _get_image_shm(self, drawable: int, geometry: Box, segment: ShmSegment) -> bool:
+        reply = self.xcb.reply(
+            self.xshm.xcb_shm_get_image_reply,
+            self.xshm.xcb_shm_get_image(
+                self.xcb.connection,
+                drawable,
+                geometry.x,
+                geometry.y,
+                geometry.width,
+                geometry.height,
+                PLAINMASK,
+                XCB_IMAGE_FORMAT_Z_PIXMAP,
+                segment.seg,
+                0
+            )
+        )
+        if not reply:
+            return False
+        self.xcb.free(reply)
+        return True
+
+    def _get_image(self, drawable: int, geometry: Box) -> Image:
+        return get_image(self.xcb, drawable, geometry)
+
+
+def get_window_properties(xcb: Xcb, xids: Sequence[int], property_name: str) -> list:
+    """
+    Returns the raw value (bytes) and format of a property of every window,
+    None for windows without the property.
+    All requests are sent before the first reply is read.
+    """
+    stats = xcb.stats
+    if stats is not None:
+        start = perf_counter_ns()
+
+    atom = xcb.atom(property_name)
+    cookies = [
+        xcb.xcb_get_property(
+            xcb.connection,
+            False,
+            xid,
+            atom,
+            XCB_GET_PROPERTY_TYPE_ANY,
+            0,
+            1000
+        )
+        for xid in xids
+    ]
+
+    values = []
+    for cookie in cookies:
+        reply = xcb.reply(xcb.xcb_get_property_reply, cookie)
+        if not reply:
+            values.append(None)
+            continue
+        length = xcb.xcb_get_property_value_length(reply)
+        if length:
+            values.append(string_at(xcb.xcb_get_property_value(reply), length))
+        else:
+            values.append(None)
+        # don't forget to free the memory or you will be fucked
+        xcb.free(reply)
+
+    if stats is not None:
+        stats.record("property", perf_counter_ns() - start)
+        stats.count("round_trips")
+
+    return values
+
+
+def decode_name(value: Optional[bytes]) -> Optional[str]:
+    """
+    Decodes the value of _NET_WM_NAME.
+    """
+    if value:
+        return value.decode("utf-8", "replace")
+    return None
+
+
+def decode_cardinal(value: Optional[bytes]) -> Optional[int]:
+    """
+    Decodes the first value of a CARDINAL or WINDOW property.
+    """
+    if value and len(value) >= 4:
+        # XCB replies are in the byte order of the client
+        return int.from_bytes(value[:4], byteorder)
+    return None
+
+
+class Window(WindowBase):
+    """
+    An class for interacting with a window on X11 through XCB.
+    """
+
+    __slots__ = ("xid", "xcb")
+
+    def __init__(self, xid: int, xcb: Xcb) -> None:
+        self.xid = xid
+        self.xcb = xcb
+
+    @property
+    @traced
+    def name(self) -> str:
+        return decode_name(get_window_properties(self.xcb, [self.xid], "_NET_WM_NAME")[0])
+
+    @property
+    @traced
+    def pid(self) -> int:
+        return decode_cardinal(get_window_properties(self.xcb, [self.xid], "_NET_WM_PID")[0])
+
+    @property
+    @traced
+    def active(self) -> bool:
+        return self.xid == get_active_window_xid(self.xcb)
+
+    @property
+    @traced
+    def geometry(self) -> Box:
+        stats = self.xcb.stats
+        if stats is not None:
+            start = perf_counter_ns()
+
+        reply = self.xcb.reply(
+            self.xcb.xcb_get_geometry_reply,
+            self.xcb.xcb_get_geometry(self.xcb.connection, self.xid)
+        )
+        if not reply:
+            raise RuntimeError(f"xcb_get_geometry failed for window {self.xid}.")
+        geometry = reply.contents
+        box = Box(
+            x=geometry.x,
+            y=geometry.y,
+            width=geometry.width,
+            height=geometry.height
+        )
+        self.xcb.free(reply)
+
+        if stats is not None:
+            stats.record("geometry", perf_counter_ns() - start)
+            stats.count("round_trips")
+
+        return box
+
+    @property
+    @traced
+    def absolute_geometry(self) -> Box:
+        """
+        Returns the geometry of the window in screen coordinates,
+        both requests are sent before the first reply is read.
+        """
+        geometry = get_absolute_geometries(self.xcb, [self.xid])[0]
+        if geometry is None:
+            raise RuntimeError(f"xcb_translate_coordinates failed for window {self.xid}.")
+        return geometry
+
+    @property
+    @traced
+    def visible_region(self) -> Region:
+        """
+        Returns the part of the window (in screen coordinates) that is on the screen
+        and not covered by other top-level windows, see get_layout().
+        """
+        return get_layout(self.xcb, [self.xid])[1][0]
+
+    @property
+    @traced
+    def frame_extents(self) -> Optional[FrameExtents]:
+        value = get_window_properties(self.xcb, [self.xid], "_NET_FRAME_EXTENTS")[0]
+        if value is None or len(value) < 16:
+            return None
+        return FrameExtents(*array("I", value[:16]))
+
+    @property
+    @traced
+    def mapped(self) -> bool:
+        reply = self.xcb.reply(
+            self.xcb.xcb_get_window_attributes_reply,
+            self.xcb.xcb_get_window_attributes(self.xcb.connection, self.xid)
+        )
+        if not reply:
+            return False
+        mapped = reply.contents.map_state == XCB_MAP_STATE_VIEWABLE
+        self.xcb.free(reply)
+        return mapped
+
+    @traced
+    def get_image(self, geometry: Optional[Box] = None) -> Image:
+        stats = self.xcb.stats
+        if stats is not None:
+            with stats.time("get_image"):
+                return self._get_image(geometry)
+        return self._get_image(geometry)
+
+    def _get_image(self, geometry: Optional[Box] = None) -> Image:
+        if geometry is None:
+            geometry = self.geometry
+
+        window_geometry = self.geometry
+        return get_image(
+            self.xcb,
+            self.xid,
+            Box(
+                geometry.x - window_geometry.x,
+                geometry.y - window_geometry.y,
+                geometry.width,
+                geometry.height
+            )
+        )
+
+    def _send_event(self, event: InputEvent, mask: int) -> None:
+        self.xcb.xcb_send_event(self.xcb.connection, True, self.xid, mask, byref(event))
+
+    @traced
+    def send_chr(self, character: chr) -> None:
+        """Send a character to the window
+
+        Args:
+            char (str): The character to send, or a keysym name like "Return"
+        """
+        if len(character) > 1:
+            # a keysym name like "Return" or "BackSpace"
+            keysym = string_to_keysym(character)
+        else:
+            codepoint = ord(character)
+            # Latin-1 keysyms are the codepoints, all other characters have Unicode keysyms
+            keysym = codepoint if codepoint < 0x100 else UNICODE_KEYSYM | codepoint
+
+        event = InputEvent(
+            response_type=EventTypes.KeyPress,
+            detail=self.xcb.keycode(keysym),
+            root=self.xid,
+            event=self.xid,
+            state=KeyMasks.ShiftMask if character.isupper() else 0
+        )
+        self._send_event(event, Masks.KeyPressMask)
+
+        # flush or events will run delayed cus thai'r only sent when the buffer is full
+        self.xcb.flush()
+
+    @traced
+    def send_str(self, string: str) -> None:
+        """Send a string to the window
+
+        Args:
+            str (str): The string to send
+        """
+        for character in string:
+            self.send_chr(character)
+
+    @traced
+    def warp_pointer(self, x: int, y: int, geometry: Optional[Box] = None) -> None:
+        if geometry is None:
+            geometry = self.geometry
+
+        self.xcb.xcb_warp_pointer(
+            self.xcb.connection,
+            self.xid,  # src_window
+            self.xid,  # dst_window
+            geometry.x,
+            geometry.y,
+            geometry.width,
+            geometry.height,
+            x,
+            y
+        )
+
+        # flush or events will run delayed cus thai'r only sent when the buffer is full
+        self.xcb.flush()
+
+    @traced
+    def send_mouse_click(self, x: int, y: int, button: MouseButtons = MouseButtons.LEFT) -> None:
+        # pylint: disable=line-too-long
+        """
+        Send a mouse click to the window at the given coordinates without moving the pointer.
+        Some applications may not respond to the click so it is recommended to also move the pointer with `warp_pointer`.
+        """
+        # pylint: enable=line-too-long
+        event = InputEvent(
+            response_type=EventTypes.ButtonPress,
+            detail=button,
+            root=self.xid,
+            event=self.xid,
+            event_x=x,
+            event_y=y
+        )
+        self._send_event(event, Masks.ButtonPressMask)
+
+        event.response_type = EventTypes.ButtonRelease
+        self._send_event(event, Masks.ButtonReleaseMask)
+
+        # both events are sent with a single flush
+        self.xcb.flush()
+
+
+def get_active_window_xid(xcb: Xcb) -> int:
+    """
+    Returns the XID of the active window.
+    """
+    return decode_cardinal(
+        get_window_properties(xcb, [xcb.root_window], "_NET_ACTIVE_WINDOW")[0]
+    )
+
+
+def get_children(xcb: Xcb, xids: array) -> array:
+    """
+    Returns the children of all windows.
+    All requests are sent before the first reply is read,
+    so a level of the window tree costs a single round-trip.
+    """
+    cookies = [xcb.xcb_query_tree(xcb.connection, xid) for xid in xids]
+
+    # array "I" has the size of xcb_window_t
+    children = array("I")
+    for cookie in cookies:
+        reply = xcb.reply(xcb.xcb_query_tree_reply, cookie)
+        if not reply:
+            # the window was destroyed in the meantime
+            continue
+        length = xcb.xcb_query_tree_children_length(reply)
+        # copy the XIDs in one shot
+        children.frombytes(string_at(xcb.xcb_query_tree_children(reply), length * 4))
+        # don't forget to free the memory or you will be fucked
+        xcb.free(reply)
+
+    if xcb.stats is not None:
+        xcb.stats.count("round_trips")
+
+    return children
+
+
+def get_all_xids(xcb: Xcb) -> array:
+    """
+    Get all window XIDs, level by level of the window tree.
+    """
+    xids = array("I")
+    level = get_children(xcb, array("I", [xcb.root_window]))
+    while level:
+        xids += level
+        level = get_children(xcb, level)
+    return xids
+
+
+def get_snapshot(xcb: Xcb, xids: Optional[Sequence[int]] = None) -> Snapshot:
+    """
+    Returns a Snapshot of the windows (all windows by default).
+    The name, pid, geometry and attribute requests of all windows
+    and the active window request are sent before the first reply is read,
+    so the whole snapshot costs a single round-trip after the enumeration.
+    """
+    stats = xcb.stats
+    if stats is not None:
+        start = perf_counter_ns()
+
+    if xids is None:
+        xids = get_all_xids(xcb)
+    connection = xcb.connection
+    name_atom, pid_atom, active_atom = xcb.atoms(
+        ["_NET_WM_NAME", "_NET_WM_PID", "_NET_ACTIVE_WINDOW"]
+    )
+
+    def get_property(xid: int, atom: int) -> Cookie:
+        return xcb.xcb_get_property(
+            connection,
+            False,
+            xid,
+            atom,
+            XCB_GET_PROPERTY_TYPE_ANY,
+            0,
+            1000
+        )
+
+    active_cookie = get_property(xcb.root_window, active_atom)
+    cookies = [
+        (
+            get_property(xid, name_atom),
+            get_property(xid, pid_atom),
+            xcb.xcb_get_geometry(connection, xid),
+            xcb.xcb_get_window_attributes(connection, xid)
+        )
+        for xid in xids
+    ]
+
+    def read_property(cookie: Cookie) -> Optional[bytes]:
+        reply = xcb.reply(xcb.xcb_get_property_reply, cookie)
+        if not reply:
+            return None
+        length = xcb.xcb_get_property_value_length(reply)
+        value = string_at(xcb.xcb_get_property_value(reply), length) if length else None
+        # don't forget to free the memory or you will be fucked
+        xcb.free(reply)
+        return value
+
+    active = decode_cardinal(read_property(active_cookie))
+    names = []
+    pids = []
+    geometries = []
+    mapped = []
+    for name_cookie, pid_cookie, geometry_cookie, attributes_cookie in cookies:
+        names.append(decode_name(read_property(name_cookie)))
+        pids.append(decode_cardinal(read_property(pid_cookie)))
+
+        reply = xcb.reply(xcb.xcb_get_geometry_reply, geometry_cookie)
+        if reply:
+            geometry = reply.contents
+            geometries.append((geometry.x, geometry.y, geometry.width, geometry.height))
+            xcb.free(reply)
+        else:
+            # the window was destroyed during the snapshot
+            geometries.append((0, 0, 0, 0))
+
+        reply = xcb.reply(xcb.xcb_get_window_attributes_reply, attributes_cookie)
+        if reply:
+            mapped.append(reply.contents.map_state == XCB_MAP_STATE_VIEWABLE)
+            xcb.free(reply)
+        else:
+            mapped.append(False)
+
+    if stats is not None:
+        stats.record("snapshot", perf_counter_ns() - start)
+        stats.count("round_trips")
+
+    return Snapshot.from_rows(xids, names, pids, geometries, active, mapped)
+
+
+def get_parents(xcb: Xcb, xids: Sequence[int]) -> list:
+    """
+    Returns the parent of every window, None for destroyed windows.
+    All requests are sent before the first reply is read.
+    """
+    cookies = [xcb.xcb_query_tree(xcb.connection, xid) for xid in xids]
+    parents = []
+    for cookie in cookies:
+        reply = xcb.reply(xcb.xcb_query_tree_reply, cookie)
+        if not reply:
+            parents.append(None)
+            continue
+        parents.append(cast(reply, POINTER(QueryTreeReply)).contents.parent)
+        # don't forget to free the memory or you will be fucked
+        xcb.free(reply)
+
+    if xcb.stats is not None:
+        xcb.stats.count("round_trips")
+
+    return parents
+
+
+def get_absolute_geometries(xcb: Xcb, xids: Sequence[int]) -> list:
+    """
+    Returns the geometry (inside of the border) of every window in screen coordinates,
+    None for destroyed windows.
+    All requests are sent before the first reply is read.
+    """
+    cookies = [
+        (
+            xcb.xcb_translate_coordinates(xcb.connection, xid, xcb.root_window, 0, 0),
+            xcb.xcb_get_geometry(xcb.connection, xid)
+        )
+        for xid in xids
+    ]
+
+    geometries = []
+    for translate_cookie, geometry_cookie in cookies:
+        translated = xcb.reply(xcb.xcb_translate_coordinates_reply, translate_cookie)
+        reply = xcb.reply(xcb.xcb_get_geometry_reply, geometry_cookie)
+        if translated and reply:
+            geometries.append(Box(
+                translated.contents.dst_x,
+                translated.contents.dst_y,
+                reply.contents.width,
+                reply.contents.height
+            ))
+        else:
+            geometries.append(None)
+        # don't forget to free the memory or you will be fucked
+        for used in (translated, reply):
+            if used:
+                xcb.free(used)
+
+    if xcb.stats is not None:
+        xcb.stats.count("round_trips")
+
+    return geometries
+
+
+def get_layout(xcb: Xcb, xids: Sequence[int]) -> tuple[list, list]:
+    """
+    Returns the absolute geometry (inside of the border) and the visible Region of every window.
+    The geometry is None for destroyed windows.
+    The visible region is the part of the window on the screen,
+    that is not covered by top-level windows above its own top-level window.
+    The requests of each step are pipelined, so this costs a few round-trips for all windows:
+    one for the stacking order, one for the geometries and one per level of the window tree.
+    """
+    connection = xcb.connection
+    root = xcb.root_window
+
+    # the children of the root are in stacking order, from the bottom to the top
+    toplevels = get_children(xcb, array("I", [root]))
+    toplevel_cookies = [
+        (
+            xcb.xcb_get_geometry(connection, xid),
+            xcb.xcb_get_window_attributes(connection, xid)
+        )
+        for xid in toplevels
+    ]
+    window_cookies = [
+        (
+            xcb.xcb_translate_coordinates(connection, xid, root, 0, 0),
+            xcb.xcb_get_geometry(connection, xid),
+            xcb.xcb_get_window_attributes(connection, xid)
+        )
+        for xid in xids
+    ]
+
+    def read_viewable(cookie: Cookie) -> bool:
+        reply = xcb.reply(xcb.xcb_get_window_attributes_reply, cookie)
+        if not reply:
+            return False
+        viewable = reply.contents.map_state == XCB_MAP_STATE_VIEWABLE
+        xcb.free(reply)
+        return viewable
+
+    # the outer box (with the border) of every viewable top-level window
+    toplevel_boxes = []
+    for geometry_cookie, attributes_cookie in toplevel_cookies:
+        reply = xcb.reply(xcb.xcb_get_geometry_reply, geometry_cookie)
+        box = None
+        if reply:
+            geometry = reply.contents
+            border = 2 * geometry.border_width
+            box = Box(geometry.x, geometry.y, geometry.width + border, geometry.height + border)
+            xcb.free(reply)
+        toplevel_boxes.append(box if read_viewable(attributes_cookie) else None)
+
+    geometries = []
+    viewable = []
+    for translate_cookie, geometry_cookie, attributes_cookie in window_cookies:
+        translated = xcb.reply(xcb.xcb_translate_coordinates_reply, translate_cookie)
+        reply = xcb.reply(xcb.xcb_get_geometry_reply, geometry_cookie)
+        if translated and reply:
+            geometries.append(Box(
+                translated.contents.dst_x,
+                translated.contents.dst_y,
+                reply.contents.width,
+                reply.contents.height
+            ))
+        else:
+            geometries.append(None)
+        for used in (translated, reply):
+            if used:
+                xcb.free(used)
+        viewable.append(read_viewable(attributes_cookie))
+
+    if xcb.stats is not None:
+        xcb.stats.count("round_trips", 2)
+
+    # walk up the window tree until the top-level window of every window is known
+    stacking = {xid: index for index, xid in enumerate(toplevels)}
+    ancestors = list(xids)
+    pending = [index for index, xid in enumerate(xids) if xid not in stacking]
+    while pending:
+        parents = get_parents(xcb, [ancestors[index] for index in pending])
+        unresolved = []
+        for index, parent in zip(pending, parents):
+            if not parent or parent == root:
+                # destroyed, or the window is above the top-level windows (e.g. the root)
+                ancestors[index] = None
+                continue
+            ancestors[index] = parent
+            if parent not in stacking:
+                unresolved.append(index)
+        pending = unresolved
+
+    screen = Region([get_screen_geometry(xcb)])
+    regions = []
+    for geometry, is_viewable, ancestor in zip(geometries, viewable, ancestors):
+        if geometry is None or not is_viewable or ancestor is None:
+            regions.append(Region())
+            continue
+        region = screen.intersect(geometry)
+        for box in toplevel_boxes[stacking[ancestor] + 1:]:
+            if box is not None and region:
+                region = region.subtract(box)
+        regions.append(region)
+
+    return geometries, regions
+
+
+def get_screen_geometry(xcb: Xcb) -> Box:
+    """
+    Returns the geometry of the root window.
+    """
+    reply = xcb.reply(
+        xcb.xcb_get_geometry_reply,
+        xcb.xcb_get_geometry(xcb.connection, xcb.root_window)
+    )
+    if not reply:
+        return Box(0, 0, xcb.screen.width_in_pixels, xcb.screen.height_in_pixels)
+    box = Box(x=0, y=0, width=reply.contents.width, height=reply.contents.height)
+    xcb.free(reply)
+    return box
+
+
+def get_monitors(xcb: Xcb, xrandr: Optional[XcbRandR]) -> list:
+    """
+    https://www.x.org/releases/current/doc/randrproto/randrproto.txt\n
+    Uses RRGetMonitors to get the active monitors, the names of all monitors are read at once.
+    Without RandR the whole screen is returned as the only monitor.
+    """
+    reply = None
+    if xrandr is not None and xcb.extension_present(xrandr.extension_id):
+        reply = xcb.reply(
+            xrandr.xcb_randr_get_monitors_reply,
+            xrandr.xcb_randr_get_monitors(xcb.connection, xcb.root_window, True)
+        )
+
+    if not reply:
+        return [Monitor("screen", True, get_screen_geometry(xcb))]
+
+    infos = []
+    iterator = xrandr.xcb_randr_get_monitors_monitors_iterator(reply)
+    while iterator.rem:
+        info = iterator.data.contents
+        infos.append((
+            info.name,
+            bool(info.primary),
+            Box(x=info.x, y=info.y, width=info.width, height=info.height)
+        ))
+        xrandr.xcb_randr_monitor_info_next(byref(iterator))
+
+    # don't forget to free the memory or you will be fucked
+    xcb.free(reply)
+
+    cookies = [xcb.xcb_get_atom_name(xcb.connection, atom) for atom, _, _ in infos]
+
+    monitors = []
+    for index, ((_, primary, geometry), cookie) in enumerate(zip(infos, cookies)):
+        name_reply = xcb.reply(xcb.xcb_get_atom_name_reply, cookie)
+        if name_reply:
+            name = string_at(
+                xcb.xcb_get_atom_name_name(name_reply),
+                xcb.xcb_get_atom_name_name_length(name_reply)
+            ).decode("utf-8")
+            xcb.free(name_reply)
+        else:
+            name = str(index)
+        monitors.append(Monitor(name, primary, geometry))
+
+    return monitors
+
+
+# window events are only implemented by the Xlib backend
+# pylint: disable-next=abstract-method
+class DSI(TracingMixin, DSIBase):
+    """
+    Main DSI class of the XCB backend
+    Only the *_reply functions of XCB wait for the X server,
+    so they are the round-trips of the Tracer report.
+    """
+
+    traced_attribute = "xcb"
+
+    def __init__(self):
+        self.xcb = Xcb()
+        self.shm = ShmCapture(self.xcb)
+        try:
+            self.xrandr = XcbRandR()
+        except FileNotFoundError:
+            self.xrandr = None
+
+    @traced
+    def get_active_window(self) -> WindowBase:
+        return Window(get_active_window_xid(self.xcb), self.xcb)
+
+    @traced
+    def get_all_windows(self) -> WindowList:
+        return WindowList(get_all_xids(self.xcb), partial(Window, xcb=self.xcb))
+
+    @traced
+    def get_window_by_pid(self, pid: int) -> WindowBase:
+        """
+        Get window by pid.
+        Returns None if no window found.
+        The pids of all windows are read at once.
+        """
+        xids = get_all_xids(self.xcb)
+        for xid, value in zip(xids, get_window_properties(self.xcb, xids, "_NET_WM_PID")):
+            if decode_cardinal(value) == pid:
+                return Window(xid, self.xcb)
+        return None
+
+    @traced
+    def get_window_by_name(self, name: str) -> WindowBase:
+        """
+        Get a window by name.
+        Returns None if no window with that name is found.
+        The names of all windows are read at once.
+        """
+        xids = get_all_xids(self.xcb)
+        for xid, value in zip(xids, get_window_properties(self.xcb, xids, "_NET_WM_NAME")):
+            window_name = decode_name(value)
+            if window_name is not None and name in window_name:
+                return Window(xid, self.xcb)
+        return None
+
+    @traced
+    def snapshot(self) -> Snapshot:
+        """
+        Returns a Snapshot of all windows.
+        The properties of all windows are requested at once, see get_snapshot().
+        """
+        return get_snapshot(self.xcb)
+
+    @traced
+    def capture_windows(self, windows: Sequence[WindowBase]) -> list:
+        """
+        Returns an Image of every window, None for destroyed and invisible windows.
+        The visible windows are cut out of a single capture of the screen,
+        only partially covered windows are captured one by one, see get_layout().
+        """
+        geometries, regions = get_layout(self.xcb, [window.xid for window in windows])
+        return self._capture_windows(windows, geometries, regions)
+
+    @traced
+    def get_monitors(self) -> list:
+        return get_monitors(self.xcb, self.xrandr)
+
+    def get_screen_geometry(self) -> Box:
+        return get_screen_geometry(self.xcb)
+
+    @traced
+    def capture_screen(self, geometry: Box) -> Image:
+        """
+        Returns an Image of a region of the screen.
+        If the MIT-SHM extension is available, the Image is backed by shared memory
+        that is reused by the next capture with the same size, nothing is copied.
+        Use Image.copy() to keep the Image.
+        """
+        return self.shm.capture(self.xcb.root_window, geometry)
+
+    # pylint: disable-next=redefined-builtin
+    def enable_stats(
+        self,
+        callback: Optional[Callable[[str], None]] = None,
+        format: str = "prometheus",
+        interval: float = 10.0
+    ) -> Instrumentation:
+        self.xcb.stats = super().enable_stats(callback, format, interval)
+        return self.xcb.stats
+
+    def disable_stats(self) -> None:
+        super().disable_stats()
+        self.xcb.stats = None
+
+    def _libraries(self) -> list:
+        """
+        Returns the loaded libraries.
+        """
+        return [
+            library
+            for library in (self.xcb, self.shm.xshm, self.xrandr)
+            if library is not None
+        ]
+
+    def close(self) -> None:
+        """
+        Releases the shared memory segments and closes the connection.
+        XCB connections are thread-safe, so all threads share one connection.
+        """
+        self.shm.release()
+        self.xcb.close()
@@ -42,6 +42,11 @@ def benchmark_DSI(**args) -> np.ndarray:
     return benchmark(function=func, **args)
 
 
+def benchmark_DSI_screen(**args) -> np.ndarray:
+    def func(): return np.array(dsi.get_screen_image(region=_geo))
+    return benchmark(function=func, **args)
+
+
 def benchmark_PIL(**args) -> np.ndarray:
     import PIL.ImageGrab
 
@@ -63,6 +68,7 @@ def benchmark_MSS(**args) -> np.ndarray:
 def main() -> None:
     to_benchmark = {
         "DSI": benchmark_DSI,
+        "DSI screen": benchmark_DSI_screen,
         "MSS": benchmark_MSS,
         "PIL": benchmark_PIL,
     }
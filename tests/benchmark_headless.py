@@ -0,0 +1,339 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+A headless benchmark of DSI.
+It starts its own Xvfb (or Xephyr inside the current display with --xephyr),
+creates synthetic windows and writes the results as JSON,
+so the results of different commits can be compared with --compare.
+
+Needs Xvfb (or Xephyr), but no window manager, numpy, cv2, mss or PIL.
+"""
+
+# built-in modules
+from argparse import ArgumentParser
+from ctypes import POINTER, c_char_p, c_int, c_long, c_uint, c_ulong, c_void_p, cast
+from json import dump, load
+from os import close, environ, getpid, pipe, read
+from platform import python_version
+from random import randrange
+from statistics import mean, median
+from subprocess import DEVNULL, Popen, run
+from sys import exit as sys_exit
+from time import perf_counter, time
+from tracemalloc import get_traced_memory, start as start_tracemalloc, stop as stop_tracemalloc
+
+try:
+    from rich import print
+except ImportError:
+    pass
+
+PROP_MODE_REPLACE = 0
+XA_CARDINAL = 6
+XA_WINDOW = 33
+
+
+def start_server(width: int, height: int, xephyr: bool) -> tuple:
+    """
+    Starts Xvfb or Xephyr and returns the process and the display name.
+    """
+    read_fd, write_fd = pipe()
+    command = [
+        "Xephyr" if xephyr else "Xvfb",
+        "-displayfd", str(write_fd),
+        "-screen", f"{width}x{height}x24" if not xephyr else f"{width}x{height}",
+        "-nolisten", "tcp",
+    ]
+    process = Popen(command, pass_fds=(write_fd,), stdout=DEVNULL, stderr=DEVNULL)
+    close(write_fd)
+
+    number = b""
+    while not number.endswith(b"\n"):
+        chunk = read(read_fd, 16)
+        if not chunk:
+            close(read_fd)
+            raise RuntimeError(f"{command[0]} failed to start.")
+        number += chunk
+    close(read_fd)
+
+    return process, f":{number.decode().strip()}"
+
+
+class WindowFactory:
+    """
+    Creates plain colored windows with a name and a pid.
+    """
+
+    def __init__(self, xlib) -> None:
+        # pylint: disable-next=import-outside-toplevel
+        from display_server_interactions.x11 import Display
+
+        self.xlib = xlib
+        self.lib = xlib.library
+        self.lib.XCreateSimpleWindow.argtypes = [
+            POINTER(Display), c_ulong, c_int, c_int, c_uint, c_uint, c_uint, c_ulong, c_ulong
+        ]
+        self.lib.XCreateSimpleWindow.restype = c_ulong
+        self.lib.XMapWindow.argtypes = [POINTER(Display), c_ulong]
+        self.lib.XDestroyWindow.argtypes = [POINTER(Display), c_ulong]
+        self.lib.XChangeProperty.argtypes = [
+            POINTER(Display), c_ulong, c_ulong, c_ulong, c_int, c_int, c_void_p, c_int
+        ]
+        self.utf8_string = self.atom("UTF8_STRING")
+        self.windows = []
+
+    def atom(self, name: str) -> int:
+        return self.xlib.XInternAtom(self.xlib.display, c_char_p(name.encode()), False)
+
+    def set_cardinal(self, window: int, name: str, value: int, property_type: int) -> None:
+        data = (c_long * 1)(value)
+        self.lib.XChangeProperty(
+            self.xlib.display, window, self.atom(name), property_type,
+            32, PROP_MODE_REPLACE, cast(data, c_void_p), 1
+        )
+
+    def create(self, name: str, width: int, height: int) -> int:
+        window = self.lib.XCreateSimpleWindow(
+            self.xlib.display, self.xlib.root_window,
+            0, 0, width, height, 0, 0, randrange(0xFFFFFF)
+        )
+        encoded = name.encode("utf-8")
+        self.lib.XChangeProperty(
+            self.xlib.display, window, self.atom("_NET_WM_NAME"), self.utf8_string,
+            8, PROP_MODE_REPLACE, cast(c_char_p(encoded), c_void_p), len(encoded)
+        )
+        self.set_cardinal(window, "_NET_WM_PID", getpid(), XA_CARDINAL)
+        self.lib.XMapWindow(self.xlib.display, window)
+        self.windows.append(window)
+        return window
+
+    def activate(self, window: int) -> None:
+        self.set_cardinal(self.xlib.root_window, "_NET_ACTIVE_WINDOW", window, XA_WINDOW)
+
+    def sync(self) -> None:
+        self.xlib.XSync(self.xlib.display, False)
+
+    def destroy_all(self) -> None:
+        for window in self.windows:
+            self.lib.XDestroyWindow(self.xlib.display, window)
+        self.windows.clear()
+        self.sync()
+
+
+def summarize(samples: list) -> dict:
+    return {
+        "mean": mean(samples),
+        "median": median(samples),
+        "min": min(samples),
+        "max": max(samples),
+        "samples": len(samples),
+    }
+
+
+def time_calls(function, times: int) -> list:
+    samples = []
+    for _ in range(times):
+        start = perf_counter()
+        function()
+        samples.append(perf_counter() - start)
+    return samples
+
+
+def fps(samples: list) -> dict:
+    result = summarize([1 / sample for sample in samples])
+    result["mean"] = len(samples) / sum(samples)
+    return result
+
+
+def benchmark_capture(dsi, factory, sizes: list, frames: int) -> dict:
+    # pylint: disable=import-outside-toplevel
+    from display_server_interactions.box import Box
+    from display_server_interactions.linux import Window
+    # pylint: enable=import-outside-toplevel
+
+    results = {}
+    for width, height in sizes:
+        xid = factory.create(f"capture {width}x{height}", width, height)
+        factory.sync()
+        window = Window(xid, dsi.xlib)
+        geometry = window.geometry
+
+        print(f"Capture {width}x{height}")
+        results[f"get_image {width}x{height}"] = fps(
+            time_calls(lambda: window.get_image(geometry), frames)
+        )
+        region = Box(0, 0, width, height)
+        results[f"get_screen_image {width}x{height}"] = fps(
+            time_calls(lambda: dsi.get_screen_image(region=region), frames)
+        )
+        factory.destroy_all()
+    return results
+
+
+def benchmark_enumeration(dsi, factory, counts: list, times: int) -> dict:
+    results = {}
+    for count in counts:
+        start = len(factory.windows)
+        for index in range(count - start):
+            factory.create(f"window {start + index}", 64, 64)
+        factory.sync()
+
+        print(f"Enumerate {count} windows")
+        results[f"get_all_windows {count}"] = summarize(
+            time_calls(dsi.get_all_windows, times)
+        )
+        last = f"window {count - 1}"
+        results[f"get_window_by_name {count}"] = summarize(
+            time_calls(lambda: dsi.get_window_by_name(last), max(1, times // 10))
+        )
+    factory.destroy_all()
+    return results
+
+
+def benchmark_input(dsi, factory, events: int) -> dict:
+    xid = factory.create("input", 320, 240)
+    factory.activate(xid)
+    factory.sync()
+    window = dsi.get_active_window()
+
+    print("Input")
+    results = {}
+    start = perf_counter()
+    for _ in range(events):
+        window.send_chr("a")
+    results["send_chr events/s"] = events / (perf_counter() - start)
+
+    start = perf_counter()
+    for _ in range(events):
+        window.send_mouse_click(10, 10)
+    results["send_mouse_click clicks/s"] = events / (perf_counter() - start)
+
+    factory.destroy_all()
+    return results
+
+
+def benchmark_memory(dsi, factory, sizes: list) -> dict:
+    # pylint: disable-next=import-outside-toplevel
+    from display_server_interactions.linux import Window
+
+    results = {}
+    for width, height in sizes:
+        xid = factory.create(f"memory {width}x{height}", width, height)
+        factory.sync()
+        window = Window(xid, dsi.xlib)
+        geometry = window.geometry
+        window.get_image(geometry)
+
+        start_tracemalloc()
+        image = window.get_image(geometry)
+        current, peak = get_traced_memory()
+        stop_tracemalloc()
+        del image
+
+        results[f"memory {width}x{height}"] = {
+            "frame_bytes": width * height * 4,
+            "retained_bytes": current,
+            "peak_bytes": peak,
+        }
+        factory.destroy_all()
+    return results
+
+
+def git_commit() -> str:
+    result = run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=False)
+    return result.stdout.strip() or None
+
+
+def compare(results: dict, path: str, threshold: float) -> bool:
+    """
+    Prints the change of every mean compared to an older result file.
+    Returns False if a mean got worse by more than threshold percent.
+    """
+    with open(path, encoding="utf-8") as file:
+        old = load(file)
+
+    ok = True
+    print(f"Compared to {old.get('commit')}:")
+    for group, metrics in results["benchmarks"].items():
+        for name, value in metrics.items():
+            old_value = old["benchmarks"].get(group, {}).get(name)
+            if old_value is None:
+                continue
+            if isinstance(value, dict):
+                if "mean" not in value:
+                    continue
+                value, old_value = value["mean"], old_value["mean"]
+            change = (value - old_value) / old_value * 100
+            # fps and throughput are better when higher, latencies when lower
+            higher_is_better = group in ("capture", "input")
+            worse = -change if higher_is_better else change
+            marker = ""
+            if worse > threshold:
+                marker = " REGRESSION"
+                ok = False
+            print(f"\t{name}: {old_value:.6g} -> {value:.6g} ({change:+.1f}%){marker}")
+    return ok
+
+
+def parse_sizes(sizes: str) -> list:
+    return [tuple(int(part) for part in size.split("x")) for size in sizes.split(",")]
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Headless DSI benchmark")
+    parser.add_argument("--xephyr", action="store_true", help="use Xephyr instead of Xvfb")
+    parser.add_argument("--screen", default="3840x2160", help="screen size of the X server")
+    parser.add_argument("--sizes", default="320x240,1280x720,1920x1080")
+    parser.add_argument("--counts", default="10,100,1000", help="window counts to enumerate")
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--events", type=int, default=1000)
+    parser.add_argument("--output", default="benchmark.json")
+    parser.add_argument("--compare", help="result file of an older run")
+    parser.add_argument("--threshold", type=float, default=10.0, help="regression in percent")
+    args = parser.parse_args()
+
+    width, height = parse_sizes(args.screen)[0]
+    process, display = start_server(width, height, args.xephyr)
+    environ["DISPLAY"] = display
+    environ["XDG_SESSION_TYPE"] = "x11"
+
+    try:
+        # pylint: disable=import-outside-toplevel
+        from display_server_interactions import DSI
+        from display_server_interactions.x11 import Xlib
+        # pylint: enable=import-outside-toplevel
+
+        with DSI() as dsi:
+            factory = WindowFactory(Xlib())
+            sizes = parse_sizes(args.sizes)
+            counts = [int(count) for count in args.counts.split(",")]
+
+            results = {
+                "commit": git_commit(),
+                "time": time(),
+                "python": python_version(),
+                "server": "Xephyr" if args.xephyr else "Xvfb",
+                "screen": args.screen,
+                "benchmarks": {
+                    "capture": benchmark_capture(dsi, factory, sizes, args.frames),
+                    "enumeration": benchmark_enumeration(dsi, factory, counts, 20),
+                    "input": benchmark_input(dsi, factory, args.events),
+                    "memory": benchmark_memory(dsi, factory, sizes),
+                }
+            }
+    finally:
+        process.terminate()
+        process.wait()
+
+    with open(args.output, "w", encoding="utf-8") as file:
+        dump(results, file, indent=4)
+    print(f"Results written to {args.output}")
+
+    if args.compare and not compare(results, args.compare, args.threshold):
+        sys_exit(1)
+
+    print("Done.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+# built-in modules
+from timeit import repeat
+
+try:
+    from rich import print
+except ImportError:
+    pass
+
+from display_server_interactions.x11 import Xlib
+
+# the Xlib functions that are looked up per frame and per keystroke
+CAPTURE_LOOP = ("XGetWindowAttributes", "XGetWindowAttributes", "XGetImage", "XDestroyImage")
+INPUT_LOOP = ("XStringToKeysym", "XKeysymToKeycode", "XSendEvent", "XFlush")
+
+
+class ProxyXlib:
+    """
+    The Xlib wrapper before the function table,
+    every attribute access goes through __getattribute__.
+    """
+
+    def __init__(self, xlib: Xlib):
+        self.xlib = xlib.library
+        self.display = xlib.display
+        self.root_window = xlib.root_window
+        self.stats = None
+        self.tracer = None
+
+    def __getattribute__(self, __name: str):
+        if __name in ["xlib", "display", "root_window", "stats", "tracer"]:
+            return super().__getattribute__(__name)
+        return self.xlib.__getattribute__(__name)
+
+
+def per_call(statement: str, namespace: dict, number: int = 200_000) -> float:
+    """
+    Returns the best time per execution of the statement in nanoseconds.
+    """
+    return min(repeat(statement, globals=namespace, number=number, repeat=5)) / number * 1e9
+
+
+def lookups(names: tuple) -> str:
+    return "; ".join(f"xlib.{name}" for name in names)
+
+
+def main() -> None:
+    xlib = Xlib()
+    implementations = {
+        "before (__getattribute__)": ProxyXlib(xlib),
+        "after (function table)": xlib,
+    }
+
+    benchmarks = {
+        "lookup per frame": lookups(CAPTURE_LOOP),
+        "lookup per keystroke": lookups(INPUT_LOOP),
+        "XFree(None) call": "xlib.XFree(None)",
+    }
+
+    results = {}
+    for name, statement in benchmarks.items():
+        print(name)
+        for implementation, wrapper in implementations.items():
+            results[name, implementation] = per_call(statement, {"xlib": wrapper})
+            print(f"\t{implementation}: {results[name, implementation]:.1f} ns")
+        before, after = (results[name, implementation] for implementation in implementations)
+        print(f"\tspeedup: {before / after:.1f}x")
+        print()
+
+    print("Done.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+Checks the import time of DSI with python -X importtime against a budget.
+Exits with 1 if an import is over its budget or loads a module it should not load.
+"""
+
+# built-in modules
+from os import environ
+from subprocess import run
+from sys import executable, exit as sys_exit
+
+try:
+    from rich import print
+except ImportError:
+    pass
+
+RUNS = 5
+
+# statement, module to measure, budget in milliseconds, modules that must not be loaded
+BUDGETS = (
+    (
+        "import display_server_interactions",
+        "display_server_interactions", 10, ("ctypes",)
+    ),
+    (
+        "from display_server_interactions.box import Box",
+        "display_server_interactions.box", 15, ("ctypes",)
+    ),
+    (
+        "from display_server_interactions.client import DSIClient",
+        "display_server_interactions.client", 30, ("ctypes",)
+    ),
+    (
+        "import display_server_interactions.linux",
+        "display_server_interactions.linux", 150, ()
+    ),
+)
+
+
+def cumulative_time(statement: str, module: str) -> float:
+    """
+    Returns the cumulative import time of the module in milliseconds, the best of RUNS runs.
+    """
+    times = []
+    for _ in range(RUNS):
+        result = run(
+            [executable, "-X", "importtime", "-c", statement],
+            capture_output=True, text=True, check=True, env=environ
+        )
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:"):
+                continue
+            _, cumulative, name = line[len("import time:"):].split("|")
+            if name.strip() == module:
+                times.append(int(cumulative) / 1000)
+    if not times:
+        raise RuntimeError(f"{module} was not imported by '{statement}'")
+    return min(times)
+
+
+def loaded_modules(statement: str, modules: tuple) -> list:
+    """
+    Returns the modules that are loaded after running the statement.
+    """
+    result = run(
+        [executable, "-c", f"{statement}; import sys; print(' '.join(sys.modules))"],
+        capture_output=True, text=True, check=True, env=environ
+    )
+    loaded = result.stdout.split()
+    return [module for module in modules if module in loaded]
+
+
+def main() -> None:
+    ok = True
+    for statement, module, budget, forbidden in BUDGETS:
+        try:
+            time = cumulative_time(statement, module)
+        # e.g. no supported display server
+        except Exception as exception:  # pylint: disable=broad-except
+            print(f"{statement}: skipped ({exception.__class__.__name__})")
+            continue
+
+        status = "ok" if time <= budget else "OVER BUDGET"
+        print(f"{statement}: {time:.1f} ms (budget {budget} ms) {status}")
+        if time > budget:
+            ok = False
+
+        loaded = loaded_modules(statement, forbidden)
+        if loaded:
+            print(f"\tloads {', '.join(loaded)}")
+            ok = False
+
+    if not ok:
+        sys_exit(1)
+
+    print("Done.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+Checks that the CaptureScheduler keeps capturing windows whose frames cost more
+than one second of the budget and skips hidden windows,
+with fake windows, so it runs without a display server.
+Exits with 1 if the scheduler hangs, doesn't honor the budget or captures hidden windows.
+"""
+
+# built-in modules
+from sys import exit as sys_exit
+from threading import Thread
+from time import perf_counter, sleep
+
+from display_server_interactions.image import Image
+from display_server_interactions.scheduler import CaptureScheduler
+
+try:
+    from rich import print
+except ImportError:
+    pass
+
+TIMEOUT = 10
+
+
+class FakeWindow:
+    """
+    A window that returns black frames of a fixed size.
+    """
+
+    visible_region = True
+
+    def __init__(self, width: int, height: int, cost: float = 0.0) -> None:
+        self.width = width
+        self.height = height
+        # the seconds a capture takes
+        self.cost = cost
+
+    def get_image(self, _=None) -> Image:
+        sleep(self.cost)
+        return Image(bytearray(self.width * self.height * 4), self.width, self.height)
+
+
+def capture(scheduler: CaptureScheduler, count: int, frames: list) -> None:
+    for frame in scheduler:
+        frames.append(frame)
+        if len(frames) >= count:
+            scheduler.stop()
+
+
+def run(name: str, scheduler: CaptureScheduler, count: int, minimum: float) -> bool:
+    """
+    Captures count frames and checks that they took at least minimum seconds.
+    """
+    frames = []
+    start = perf_counter()
+    thread = Thread(target=capture, args=(scheduler, count, frames), daemon=True)
+    thread.start()
+    thread.join(TIMEOUT)
+    duration = perf_counter() - start
+
+    if thread.is_alive():
+        scheduler.stop()
+        print(f"{name}: hung after {len(frames)} frames")
+        return False
+    if duration < minimum:
+        print(f"{name}: {count} frames in {duration:.2f} s, expected at least {minimum} s")
+        return False
+    print(f"{name}: {count} frames in {duration:.2f} s ok")
+    return True
+
+
+def check(name: str, condition: bool) -> bool:
+    print(f"{name}: {'ok' if condition else 'failed'}")
+    return condition
+
+
+def main() -> None:
+    ok = True
+
+    # a 1000x1000 frame is 4 MB, twice the bytes per second
+    scheduler = CaptureScheduler(bytes_per_second=2_000_000)
+    scheduler.add(FakeWindow(1000, 1000), fps=30)
+    ok &= run("frame bigger than the bytes budget", scheduler, 3, 2 * 1.0)
+
+    scheduler = CaptureScheduler(bytes_per_second=2_000_000)
+    scheduler.add(FakeWindow(1000, 1000), fps=30, priority=1)
+    scheduler.add(FakeWindow(1000, 1000), fps=30)
+    ok &= run("two frames bigger than the bytes budget", scheduler, 3, 2 * 1.0)
+
+    # a capture takes 50 ms, more than the 20 ms of capture time per second
+    scheduler = CaptureScheduler(cpu=0.02)
+    scheduler.add(FakeWindow(100, 100, 0.05), fps=30)
+    ok &= run("capture costs more than the cpu budget", scheduler, 3, 2 * 2.0)
+
+    # hidden windows are skipped by default
+    hidden = FakeWindow(100, 100)
+    hidden.visible_region = False
+    scheduler = CaptureScheduler()
+    visible = scheduler.add(FakeWindow(100, 100), fps=30).window
+    skipped = scheduler.add(hidden, fps=30)
+    frames = []
+    capture(scheduler, 3, frames)
+    ok &= check(
+        "hidden window is skipped",
+        all(frame.window is visible for frame in frames) and skipped.skipped > 0
+    )
+
+    if not ok:
+        sys_exit(1)
+    print("Done.")
+
+
+if __name__ == "__main__":
+    main()
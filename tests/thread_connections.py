@@ -0,0 +1,117 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+Checks that the X connections of threads are closed when the threads end,
+with fake connections, so it runs without a display server.
+Exits with 1 if connections leak.
+"""
+
+# built-in modules
+from concurrent.futures import ThreadPoolExecutor
+from gc import collect
+from sys import exit as sys_exit
+from threading import Thread
+
+from display_server_interactions import x11connections
+
+try:
+    from rich import print
+except ImportError:
+    pass
+
+THREADS = 50
+
+
+class FakeXlib:
+    """
+    An X connection that only counts how often it is opened and closed.
+    """
+
+    opened = 0
+    closed_count = 0
+
+    def __init__(self, connections=None) -> None:
+        FakeXlib.opened += 1
+        self.connections = connections
+        self.stats = None
+        self.tracer = None
+        self.closed = False
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            FakeXlib.closed_count += 1
+
+
+class FakeShmCapture:
+    """
+    A ShmCapture that only counts how often it is released.
+    """
+
+    released = 0
+
+    def __init__(self, xlib: FakeXlib) -> None:
+        self.xlib = xlib
+        self.xshm = None
+
+    def release(self) -> None:
+        FakeShmCapture.released += 1
+
+
+class MissingX11Xcb:
+    def __init__(self) -> None:
+        raise FileNotFoundError
+
+
+def use(connections: x11connections.Connections) -> None:
+    _ = connections.xlib
+    _ = connections.shm
+
+
+def check(name: str, condition: bool) -> bool:
+    print(f"{name}: {'ok' if condition else 'failed'}")
+    return condition
+
+
+def main() -> None:
+    x11connections.Xlib = FakeXlib
+    x11connections.ShmCapture = FakeShmCapture
+    x11connections.X11Xcb = MissingX11Xcb
+
+    ok = True
+    connections = x11connections.Connections()
+    ok &= check("connection of the main thread", len(connections) == 1)
+
+    threads = [Thread(target=use, args=(connections,)) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    collect()
+    ok &= check(f"{THREADS} threads joined", len(connections) == 1)
+    ok &= check(
+        "their connections are closed",
+        FakeXlib.closed_count == THREADS and FakeShmCapture.released == THREADS
+    )
+
+    with ThreadPoolExecutor(8) as pool:
+        for future in [pool.submit(use, connections) for _ in range(THREADS)]:
+            future.result()
+        # the pool reuses its threads, it starts at most 8
+        ok &= check("pool threads keep their connections", 1 < len(connections) <= 9)
+    collect()
+    ok &= check("pool shut down", len(connections) == 1)
+
+    connections.close()
+    collect()
+    ok &= check("close() closes all", len(connections) == 0)
+    ok &= check("every connection closed once", FakeXlib.closed_count == FakeXlib.opened)
+
+    if not ok:
+        sys_exit(1)
+    print("Done.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+Checks the frame handling of the Wayland backend with stand-ins for GStreamer and the portal,
+so it runs without a Wayland session, PipeWire, jeepney or PyGObject.
+Exits with 1 if a check fails.
+"""
+
+# built-in modules
+from collections import deque
+from gc import collect
+from sys import exit as sys_exit
+
+from display_server_interactions.box import Box
+from display_server_interactions.wayland import DSI, PipeWireStream
+
+try:
+    from rich import print
+except ImportError:
+    pass
+
+
+class FakeGst:
+    """
+    The parts of Gst that PipeWireStream uses.
+    """
+
+    class MapFlags:
+        READ = 1
+        WRITE = 2
+
+    class State:
+        NULL = 1
+        PLAYING = 4
+
+
+class FakeMapInfo:
+    def __init__(self, data: bytearray) -> None:
+        self.data = data
+        self.size = len(data)
+
+
+class FakeBuffer:
+    """
+    A GstBuffer, writable mappings fail if the buffer is read-only.
+    """
+
+    def __init__(self, data: bytearray, writable: bool) -> None:
+        self.data = data
+        self.writable = writable
+        self.mapped = 0
+
+    def map(self, flags: int) -> tuple:
+        if flags & FakeGst.MapFlags.WRITE and not self.writable:
+            return False, None
+        self.mapped += 1
+        return True, FakeMapInfo(self.data)
+
+    def unmap(self, _) -> None:
+        self.mapped -= 1
+
+
+class FakeStructure:
+    def __init__(self, width: int, height: int) -> None:
+        self.values = {"width": width, "height": height}
+
+    def get_value(self, name: str) -> int:
+        return self.values[name]
+
+
+class FakeCaps:
+    def __init__(self, width: int, height: int) -> None:
+        self.structure = FakeStructure(width, height)
+
+    def get_structure(self, _) -> FakeStructure:
+        return self.structure
+
+
+class FakeSample:
+    def __init__(self, buffer: FakeBuffer, width: int, height: int) -> None:
+        self.buffer = buffer
+        self.caps = FakeCaps(width, height)
+
+    def get_caps(self) -> FakeCaps:
+        return self.caps
+
+    def get_buffer(self) -> FakeBuffer:
+        return self.buffer
+
+
+class FakeSink:
+    """
+    An appsink that returns the queued samples, None if there is none.
+    """
+
+    def __init__(self) -> None:
+        self.samples = deque()
+        self.timeouts = []
+
+    def push(self, width: int, height: int, value: int, writable: bool = True) -> FakeBuffer:
+        buffer = FakeBuffer(bytearray([value]) * (width * height * 4), writable)
+        self.samples.append(FakeSample(buffer, width, height))
+        return buffer
+
+    def emit(self, signal: str, timeout: int):
+        assert signal == "try-pull-sample"
+        self.timeouts.append(timeout)
+        return self.samples.popleft() if self.samples else None
+
+
+class FakePipeline:
+    def __init__(self) -> None:
+        self.state = FakeGst.State.PLAYING
+
+    def set_state(self, state: int) -> None:
+        self.state = state
+
+
+class FakePortal:
+    def __init__(self) -> None:
+        self.closed = False
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def fake_stream(node_id: int, geometry: Box) -> PipeWireStream:
+    """
+    Returns a PipeWireStream that pulls from a FakeSink instead of pipewiresrc.
+    """
+    stream = PipeWireStream.__new__(PipeWireStream)
+    stream.gst = FakeGst
+    stream.node_id = node_id
+    stream._geometry = geometry
+    stream.image = None
+    stream.pipeline = FakePipeline()
+    stream.sink = FakeSink()
+    return stream
+
+
+def fake_dsi(streams: list) -> DSI:
+    """
+    Returns a DSI whose session is already started with the streams.
+    """
+    dsi = DSI.__new__(DSI)
+    dsi.portal = FakePortal()
+    dsi._streams = streams
+    dsi._fd = None
+    return dsi
+
+
+def check(name: str, condition: bool) -> bool:
+    print(f"{name}: {'ok' if condition else 'failed'}")
+    return condition
+
+
+def check_pull() -> bool:
+    ok = True
+    stream = fake_stream(40, Box(0, 0, 0, 0))
+
+    try:
+        stream.get_image()
+        ok &= check("no first frame raises TimeoutError", False)
+    except TimeoutError:
+        ok &= check("no first frame raises TimeoutError", True)
+
+    # a writable mapping is wrapped without a copy and stays mapped while the image is used
+    buffer = stream.sink.push(4, 2, 1)
+    image = stream.get_image()
+    ok &= check("size of the caps", (image.width, image.height, image.stride) == (4, 2, 16))
+    ok &= check("geometry from the caps", stream.geometry == Box(0, 0, 4, 2))
+    buffer.data[0] = 9
+    ok &= check("writable mapping is not copied", image.data[0] == 9)
+    ok &= check("buffer is mapped while the image is used", buffer.mapped == 1)
+
+    # without a new sample the last frame is returned again, without waiting
+    ok &= check("last frame without a new one", stream.get_image() is image)
+    ok &= check("no wait after the first frame", stream.sink.timeouts[-1] == 0)
+
+    del image
+    stream.image = None
+    collect()
+    ok &= check("buffer is unmapped after the image", buffer.mapped == 0)
+
+    # a read-only buffer is copied and unmapped immediately
+    buffer = stream.sink.push(4, 2, 2, writable=False)
+    image = stream.get_image()
+    buffer.data[0] = 9
+    ok &= check("read-only mapping is copied", image.data[0] == 2 and buffer.mapped == 0)
+    return ok
+
+
+def check_crop() -> bool:
+    ok = True
+    # the second monitor, right of a 1920 pixels wide one
+    stream = fake_stream(41, Box(1920, 0, 8, 4))
+    data = stream.sink.push(8, 4, 0).data
+    # mark the pixel at (2, 1) of the stream
+    data[1 * 32 + 2 * 4] = 7
+
+    image = stream.get_image(Box(1922, 1, 2, 2))
+    ok &= check("crop size", (image.width, image.height) == (2, 2))
+    ok &= check("crop in screen coordinates", image.get_pixel(0, 0)[0] == 7)
+    try:
+        stream.get_image(Box(1926, 0, 4, 4))
+        ok &= check("crop outside of the stream raises ValueError", False)
+    except ValueError:
+        ok &= check("crop outside of the stream raises ValueError", True)
+    return ok
+
+
+def check_dsi() -> bool:
+    ok = True
+    left = fake_stream(40, Box(0, 0, 8, 4))
+    right = fake_stream(41, Box(8, 0, 8, 4))
+    left.sink.push(8, 4, 1)
+    right.sink.push(8, 4, 2)
+    dsi = fake_dsi([left, right])
+
+    ok &= check("no active window", dsi.get_active_window() is None)
+    ok &= check("screen geometry", dsi.get_screen_geometry() == Box(0, 0, 16, 4))
+    monitors = dsi.get_monitors()
+    ok &= check("monitors", [monitor.primary for monitor in monitors] == [True, False])
+    ok &= check(
+        "capture_screen picks the stream",
+        dsi.capture_screen(Box(9, 1, 2, 2)).get_pixel(0, 0)[0] == 2
+    )
+    try:
+        dsi.capture_screen(Box(6, 0, 4, 4))
+        ok &= check("region across two streams raises ValueError", False)
+    except ValueError:
+        ok &= check("region across two streams raises ValueError", True)
+
+    # stream() captures a monitor through its PipeWireStream
+    frames = []
+    stream = dsi.stream(fps=100, monitor=monitors[1])
+    for frame in stream:
+        frames.append(frame)
+        if len(frames) == 3:
+            stream.stop()
+    ok &= check("stream of a monitor", [frame.image.data[0] for frame in frames] == [2, 2, 2])
+
+    dsi.close()
+    ok &= check(
+        "close stops the streams",
+        dsi.portal.closed and right.pipeline.state == FakeGst.State.NULL and right.image is None
+    )
+    return ok
+
+
+def main() -> None:
+    ok = check_pull()
+    ok &= check_crop()
+    ok &= check_dsi()
+    if not ok:
+        sys_exit(1)
+    print("Done.")
+
+
+if __name__ == "__main__":
+    main()